@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from typing import Optional
+from datetime import datetime
+import app.admin.analytics.store as store
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+@router.get("/")
+async def get_analytics(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+):
+    """Conversation metrics from the hourly rollups, last 24 hours by default"""
+    return await store.get_analytics(start_date, end_date)
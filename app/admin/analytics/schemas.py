@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Dict, List
+from pydantic import BaseModel
+
+
+class ApiStats(BaseModel):
+    calls: int = 0
+    failures: int = 0
+    success_rate: float = 0.0
+    avg_latency_ms: float = 0.0
+
+
+class AnalyticsBucket(BaseModel):
+    bucket: datetime
+    turns: int = 0
+    threads: int = 0
+    fallbacks: int = 0
+
+
+class AnalyticsResponse(BaseModel):
+    start_date: datetime
+    end_date: datetime
+    turns: int = 0
+    # conversations started in the range
+    threads: int = 0
+    fallbacks: int = 0
+    fallback_rate: float = 0.0
+    turns_per_thread: float = 0.0
+    intents: Dict[str, int] = {}
+    # turns by NLU confidence, in bins of 0.1
+    confidence_histogram: List[int] = []
+    api: Dict[str, ApiStats] = {}
+    buckets: List[AnalyticsBucket] = []
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, UTC
+from typing import Any, Callable, Dict, Optional
+from pymongo import UpdateOne
+from app.database import database
+from .schemas import AnalyticsBucket, AnalyticsResponse, ApiStats
+
+logger = logging.getLogger(__name__)
+
+analytics_collection = database.get_collection("analytics")
+
+CONFIDENCE_BINS = 10
+
+
+def bucket_start(date: datetime) -> datetime:
+    """
+    Start of the hourly bucket of a date
+    """
+    return date.replace(minute=0, second=0, microsecond=0)
+
+
+def _field(key: str) -> str:
+    # MongoDB field names can't contain dots or start with $
+    return key.replace(".", "_").replace("$", "_")
+
+
+class AnalyticsRecorder:
+    """
+    Conversation counters rolled up into one small document per hour.
+
+    Turns and API calls only update counters in process, a background task
+    adds them to the bucket documents with $inc upserts, so the database
+    sees one write per bucket per flush. Counters of a failed flush are
+    kept for the next one.
+    """
+
+    def __init__(
+        self, collection, clock: Callable[[], datetime] = lambda: datetime.now(UTC)
+    ):
+        self.collection = collection
+        self.clock = clock
+        # bucket -> dotted field path -> increment
+        self.pending: Dict[datetime, Dict[str, float]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        self.flushes = 0
+        self.flush_failures = 0
+
+    def _add(self, counters: Dict[str, float]):
+        bucket = self.pending[bucket_start(self.clock())]
+        for key, value in counters.items():
+            bucket[key] += value
+
+    def record_turn(
+        self,
+        intent_id: Optional[str],
+        fallback: bool,
+        confidence: Optional[float] = None,
+        new_thread: bool = False,
+    ):
+        counters = {"turns": 1, f"intents.{_field(intent_id or 'none')}": 1}
+        if fallback:
+            counters["fallbacks"] = 1
+        if new_thread:
+            counters["threads"] = 1
+        if confidence is not None:
+            index = int(confidence * CONFIDENCE_BINS)
+            index = min(max(index, 0), CONFIDENCE_BINS - 1)
+            counters[f"confidence.{index}"] = 1
+        self._add(counters)
+
+    def record_api_call(self, intent_id: str, success: bool, latency: float):
+        key = f"api.{_field(intent_id)}"
+        counters = {f"{key}.calls": 1, f"{key}.latency_ms": latency * 1000}
+        if not success:
+            counters[f"{key}.failures"] = 1
+        self._add(counters)
+
+    async def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, defaultdict(lambda: defaultdict(int))
+        try:
+            await self.collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"bucket": bucket}, {"$inc": dict(counters)}, upsert=True
+                    )
+                    for bucket, counters in pending.items()
+                ],
+                ordered=False,
+            )
+            self.flushes += 1
+        except Exception as e:
+            logger.warning(f"Failed to flush analytics: {e}")
+            self.flush_failures += 1
+            for bucket, counters in pending.items():
+                for key, value in counters.items():
+                    self.pending[bucket][key] += value
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "pending_buckets": len(self.pending),
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+        }
+
+
+analytics_recorder = AnalyticsRecorder(analytics_collection)
+
+
+async def run_analytics_flusher(interval: float):
+    """
+    Flush the analytics counters every interval seconds until cancelled,
+    then flush what's left.
+    """
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await analytics_recorder.flush()
+    finally:
+        await analytics_recorder.flush()
+
+
+def _sum(total: Dict, document: Dict):
+    for key, value in document.items():
+        if isinstance(value, dict):
+            _sum(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[key] = total.get(key, 0) + value
+
+
+async def get_analytics(
+    start_date: Optional[datetime] = None, end_date: Optional[datetime] = None
+) -> AnalyticsResponse:
+    """
+    Sum the hourly buckets in the date range, the last 24 hours by default
+    """
+    end_date = end_date or datetime.now(UTC)
+    start_date = start_date or end_date - timedelta(days=1)
+
+    total: Dict = {}
+    buckets = []
+    async for document in analytics_collection.find(
+        {"bucket": {"$gte": bucket_start(start_date), "$lte": end_date}},
+        {"_id": 0},
+        sort=[("bucket", 1)],
+    ):
+        _sum(total, document)
+        buckets.append(
+            AnalyticsBucket(
+                bucket=document["bucket"],
+                turns=document.get("turns", 0),
+                threads=document.get("threads", 0),
+                fallbacks=document.get("fallbacks", 0),
+            )
+        )
+
+    turns = total.get("turns", 0)
+    threads = total.get("threads", 0)
+    fallbacks = total.get("fallbacks", 0)
+    confidence = total.get("confidence", {})
+    api = {}
+    for intent_id, stats in total.get("api", {}).items():
+        calls = stats.get("calls", 0)
+        failures = stats.get("failures", 0)
+        api[intent_id] = ApiStats(
+            calls=calls,
+            failures=failures,
+            success_rate=(calls - failures) / calls if calls else 0.0,
+            avg_latency_ms=stats.get("latency_ms", 0) / calls if calls else 0.0,
+        )
+
+    return AnalyticsResponse(
+        start_date=start_date,
+        end_date=end_date,
+        turns=turns,
+        threads=threads,
+        fallbacks=fallbacks,
+        fallback_rate=fallbacks / turns if turns else 0.0,
+        turns_per_thread=turns / threads if threads else 0.0,
+        intents=total.get("intents", {}),
+        confidence_histogram=[
+            confidence.get(str(index), 0) for index in range(CONFIDENCE_BINS)
+        ],
+        api=api,
+        buckets=buckets,
+    )
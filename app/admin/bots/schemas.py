@@ -20,12 +20,19 @@ class LLMSettings(BaseModel):
     model_name: str = "llama2:13b-chat"
     max_tokens: int = 4096
     temperature: float = 0.7
+    # render only the top-K retrieved candidate intents into the prompt, 0 disables
+    retrieval_top_k: int = 0
+    # stream completions and stop once the intent is resolved if it has no entities
+    streaming: bool = False
+    # number of utterances packed into one prompt for bulk classification
+    batch_size: int = 10
 
 
 class NLUConfiguration(BaseModel):
     """Configuration for Natural Language Understanding"""
 
-    pipeline_type: str = "traditional"  # Either 'traditional' or 'llm'
+    # Either 'traditional', 'llm' or 'hybrid' (traditional first, LLM fallback)
+    pipeline_type: str = "traditional"
     traditional_settings: TraditionalNLUSettings = TraditionalNLUSettings()
     llm_settings: LLMSettings = LLMSettings()
 
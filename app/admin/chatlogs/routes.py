@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional
 from datetime import datetime
 import app.admin.chatlogs.store as store
@@ -12,15 +13,41 @@ async def list_chatlogs(
     limit: int = 10,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
 ):
-    """Get paginated chat conversation history with optional date filtering"""
-    return await store.list_chatlogs(page, limit, start_date, end_date)
+    """Get paginated chat conversation history with optional date filtering.
+    Pass the returned `next` as cursor to get the following page."""
+    try:
+        return await store.list_chatlogs(page, limit, start_date, end_date, cursor)
+    except store.InvalidCursorException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/export")
+async def export_chatlogs(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+):
+    """Stream every turn of the conversations as NDJSON"""
+    return StreamingResponse(
+        store.export_chatlogs(start_date, end_date),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=chatlogs.ndjson"},
+    )
 
 
 @router.get("/{thread_id}")
-async def get_chat_thread(thread_id: str):
-    """Get complete conversation history for a specific thread"""
-    conversation = await store.get_chat_thread(thread_id)
+async def get_chat_thread(
+    thread_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    """Get the conversation history of a thread, oldest first.
+    Pass the returned `next` as cursor to get the following page."""
+    try:
+        conversation = await store.get_chat_thread(thread_id, limit, cursor)
+    except store.InvalidCursorException as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not conversation:
         return {"error": "Conversation not found"}
 
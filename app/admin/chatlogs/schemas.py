@@ -11,6 +11,10 @@ class ChatMessage(BaseModel):
 class ChatThreadInfo(BaseModel):
     thread_id: str
     date: datetime
+    first_date: Optional[datetime] = None
+    turn_count: int = 0
+    last_intent: Optional[str] = None
+    fallback_count: int = 0
 
 
 class BotNessage(BaseModel):
@@ -29,3 +33,12 @@ class ChatLogResponse(BaseModel):
     page: int
     limit: int
     conversations: List[ChatThreadInfo]
+    # cursor of the next page, None on the last page
+    next: Optional[str] = None
+
+
+class ChatThreadResponse(BaseModel):
+    thread_id: str
+    messages: List[ChatLog]
+    # cursor of the next page, None on the last page
+    next: Optional[str] = None
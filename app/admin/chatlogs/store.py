@@ -1,10 +1,55 @@
-from typing import List, Optional
+import base64
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, Optional, Tuple
 from datetime import datetime
+import orjson
 from app.database import client
-from .schemas import ChatLog, ChatLogResponse, ChatThreadInfo
+from app.bot.memory.archiver import MongoHistoryArchiver, decode_chunk
+from app.bot.memory.delta import HistoryDecoder
+from .schemas import ChatLog, ChatLogResponse, ChatThreadInfo, ChatThreadResponse
 
 # Initialize MongoDB collection
 collection = client["chatbot"]["state"]
+# maintained by the memory saver on every turn
+summary_collection = client["chatbot"]["thread_summary"]
+archiver = MongoHistoryArchiver(client["chatbot"])
+
+# documents fetched per round trip when reading a thread or exporting
+BATCH_SIZE = 500
+
+
+class InvalidCursorException(Exception):
+    pass
+
+
+def encode_cursor(date: datetime, key: str) -> str:
+    """
+    Opaque token for the position after (date, key)
+    """
+    return base64.urlsafe_b64encode(
+        orjson.dumps({"d": date.isoformat(), "k": key})
+    ).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        position = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(position["d"]), position["k"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursorException("Invalid cursor")
+
+
+def _date_filter(
+    field: str, start_date: Optional[datetime], end_date: Optional[datetime]
+) -> Dict:
+    query = {}
+    if start_date or end_date:
+        query[field] = {}
+        if start_date:
+            query[field]["$gte"] = start_date
+        if end_date:
+            query[field]["$lte"] = end_date
+    return query
 
 
 async def list_chatlogs(
@@ -12,72 +57,179 @@ async def list_chatlogs(
     limit: int = 10,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
 ) -> ChatLogResponse:
+    """
+    Threads by their last turn, newest first. Pages are either fetched by
+    number or, without skipping over the previous pages, after a cursor
+    returned as `next`.
+    """
+    # threads are listed by their last turn, archived ones included
+    query = _date_filter("last_date", start_date, end_date)
+    total = await summary_collection.count_documents(query)
+
     skip = (page - 1) * limit
+    if cursor:
+        last_date, thread_id = decode_cursor(cursor)
+        query = {
+            "$and": [
+                query,
+                {
+                    "$or": [
+                        {"last_date": {"$lt": last_date}},
+                        {"last_date": last_date, "thread_id": {"$lt": thread_id}},
+                    ]
+                },
+            ]
+        }
+        skip = 0
 
-    # Build query filter
-    query = {}
-    if start_date or end_date:
-        query["date"] = {}
-        if start_date:
-            query["date"]["$gte"] = start_date
-        if end_date:
-            query["date"]["$lte"] = end_date
+    documents = (
+        await summary_collection.find(query, {"_id": 0})
+        .sort([("last_date", -1), ("thread_id", -1)])
+        .skip(skip)
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
 
-    # Get total count of unique threads for pagination
-    pipeline = [
-        {"$match": query},
-        {"$group": {"_id": "$thread_id"}},
-        {"$count": "total"},
-    ]
-    result = await collection.aggregate(pipeline).to_list(1)
-    total = result[0]["total"] if result else 0
-
-    # Get paginated results grouped by thread_id with latest date
-    pipeline = [
-        {"$match": query},
-        {"$sort": {"date": -1}},
-        {
-            "$group": {
-                "_id": "$thread_id",
-                "thread_id": {"$first": "$thread_id"},
-                "date": {"$first": "$date"},
-            }
-        },
-        {"$sort": {"date": -1}},
-        {"$skip": skip},
-        {"$limit": limit},
+    conversations = [
+        ChatThreadInfo(
+            thread_id=doc["thread_id"],
+            date=doc["last_date"],
+            first_date=doc.get("first_date"),
+            turn_count=doc.get("turn_count", 0),
+            last_intent=doc.get("last_intent"),
+            fallback_count=doc.get("fallback_count", 0),
+        )
+        for doc in documents[:limit]
     ]
+    next_cursor = None
+    if len(documents) > limit:
+        last = conversations[-1]
+        next_cursor = encode_cursor(last.date, last.thread_id)
+
+    return ChatLogResponse(
+        total=total,
+        page=page,
+        limit=limit,
+        conversations=conversations,
+        next=next_cursor,
+    )
+
 
-    conversations = []
-    async for doc in collection.aggregate(pipeline):
-        conversations.append(
-            ChatThreadInfo(thread_id=doc["thread_id"], date=doc["date"])
+def _position(document: Dict) -> Tuple[datetime, str]:
+    return document["date"], str(document["_id"])
+
+
+async def iter_chat_thread(
+    thread_id: str, after: Optional[Tuple[datetime, str]] = None
+) -> AsyncIterator[Dict]:
+    """
+    Turns of a thread after the given (date, id) position, oldest first,
+    read in batches. The history is delta encoded, so reading starts at
+    the last snapshot before the position. Archived turns are read when
+    the position is in cold storage.
+    """
+    decoder = HistoryDecoder()
+    live_query = {"thread_id": thread_id}
+
+    read_archive = True
+    if after is not None:
+        last_chunk = await archiver.archive_collection.find_one(
+            {"thread_id": thread_id}, {"last_date": 1}, sort=[("seq", -1)]
         )
+        if last_chunk is None or after[0] > last_chunk["last_date"]:
+            snapshot = await collection.find_one(
+                {
+                    "thread_id": thread_id,
+                    "date": {"$lte": after[0]},
+                    "delta": {"$exists": False},
+                },
+                {"date": 1},
+                sort=[("date", -1), ("_id", -1)],
+            )
+            if snapshot is not None:
+                live_query["date"] = {"$gte": snapshot["date"]}
+                read_archive = False
 
-    return ChatLogResponse(
-        total=total, page=page, limit=limit, conversations=conversations
+    if read_archive:
+        async for chunk in archiver.archive_collection.find(
+            {"thread_id": thread_id}, sort=[("seq", 1)]
+        ):
+            for document in decode_chunk(chunk["data"]):
+                document = decoder.decode(document)
+                if after is None or _position(document) > after:
+                    yield document
+
+    async for document in collection.find(
+        live_query, sort=[("date", 1), ("_id", 1)], batch_size=BATCH_SIZE
+    ):
+        document = decoder.decode(document)
+        if after is None or _position(document) > after:
+            yield document
+
+
+def _chat_log(document: Dict) -> ChatLog:
+    return ChatLog(
+        user_message=document["user_message"],
+        bot_message=document["bot_message"],
+        date=document["date"],
+        context=document.get("context", {}),
     )
 
 
-async def get_chat_thread(thread_id: str) -> List[ChatLog]:
-    """Get complete conversation history for a specific thread"""
+async def get_chat_thread(
+    thread_id: str, limit: int = 100, cursor: Optional[str] = None
+) -> Optional[ChatThreadResponse]:
+    """Get a page of the conversation history of a thread, oldest first"""
 
-    cursor = collection.find({"thread_id": thread_id}).sort("date", 1)
-    messages = await cursor.to_list(length=None)
+    after = decode_cursor(cursor) if cursor else None
+    documents = []
+    async with aclosing(iter_chat_thread(thread_id, after)) as turns:
+        async for document in turns:
+            documents.append(document)
+            if len(documents) > limit:
+                break
 
-    if not messages:
+    if not documents and after is None:
         return None
 
-    chat_logs = []
-    for msg in messages:
-        chat_logs.append(
-            ChatLog(
-                user_message=msg["user_message"],
-                bot_message=msg["bot_message"],
-                date=msg["date"],
-                context=msg.get("context", {}),
-            )
-        )
+    next_cursor = None
+    if len(documents) > limit:
+        next_cursor = encode_cursor(*_position(documents[limit - 1]))
 
-    return chat_logs
+    return ChatThreadResponse(
+        thread_id=thread_id,
+        messages=[_chat_log(document) for document in documents[:limit]],
+        next=next_cursor,
+    )
+
+
+async def export_chatlogs(
+    start_date: Optional[datetime] = None, end_date: Optional[datetime] = None
+) -> AsyncIterator[bytes]:
+    """
+    Every turn of the threads last active in the date range as NDJSON,
+    thread by thread. Reads in batches, memory use doesn't grow with the
+    size of the export.
+    """
+    threads = summary_collection.find(
+        _date_filter("last_date", start_date, end_date),
+        {"_id": 0, "thread_id": 1},
+        sort=[("last_date", -1), ("thread_id", -1)],
+        batch_size=BATCH_SIZE,
+    )
+    async for thread in threads:
+        async for document in iter_chat_thread(thread["thread_id"]):
+            yield orjson.dumps(
+                {
+                    "thread_id": thread["thread_id"],
+                    "date": document["date"],
+                    "user_message": document.get("user_message"),
+                    "bot_message": document.get("bot_message"),
+                    "context": document.get("context"),
+                    "intent": document.get("intent"),
+                },
+                default=str,
+                option=orjson.OPT_APPEND_NEWLINE,
+            )
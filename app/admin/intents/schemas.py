@@ -37,6 +37,11 @@ class ApiDetails(BaseModel):
     headers: List[Dict[str, str]] = []
     isJson: bool = False
     jsonData: str = "{}"
+    # response cache for idempotent (GET) calls
+    cacheEnabled: bool = False
+    cacheTtl: int = 60
+    cacheStaleTtl: int = 0
+    cacheMaxSize: int = 128
 
     def get_headers(self) -> Dict[str, str]:
         headers = {}
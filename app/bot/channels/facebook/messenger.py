@@ -2,11 +2,11 @@ import hashlib
 import hmac
 import logging
 from typing import Dict, Any, List
-import aiohttp
 from fastapi import HTTPException
 
 from app.bot.dialogue_manager.models import UserMessage
 from app.bot.dialogue_manager.dialogue_manager import DialogueManager
+from app.bot.dialogue_manager.http_client import http_client_manager
 
 logger = logging.getLogger(__name__)
 
@@ -25,17 +25,17 @@ class FacebookSender:
 
         params = {"access_token": self.access_token}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                FACEBOOK_API_URL, json=payload, params=params
-            ) as response:
-                if response.status != 200:
-                    error_data = await response.json()
-                    logger.error(f"Error sending message to Facebook: {error_data}")
-                    raise HTTPException(
-                        status_code=500, detail="Failed to send message to Facebook"
-                    )
-                return await response.json()
+        session = await http_client_manager.get_session()
+        async with session.post(
+            FACEBOOK_API_URL, json=payload, params=params
+        ) as response:
+            if response.status != 200:
+                error_data = await response.json()
+                logger.error(f"Error sending message to Facebook: {error_data}")
+                raise HTTPException(
+                    status_code=500, detail="Failed to send message to Facebook"
+                )
+            return await response.json()
 
     def format_bot_response(self, bot_message: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Format bot response into Facebook message format."""
@@ -71,7 +71,10 @@ class FacebookReceiver:
     ) -> None:
         """Process a message through the dialogue manager and send response."""
         user_message = UserMessage(
-            thread_id=sender_id, text=message_text, context=context or {}
+            thread_id=sender_id,
+            text=message_text,
+            context=context or {},
+            channel="facebook",
         )
         new_state = await self.dialogue_manager.process(user_message)
 
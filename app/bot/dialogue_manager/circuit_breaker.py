@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("circuit_breaker")
+
+
+class CircuitOpenException(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker with a bulkhead for a downstream host.
+
+    - closed: calls go through, consecutive failures are counted.
+    - open: calls fail fast until recovery_timeout has passed.
+    - half_open: a limited number of probe calls are let through,
+      a success closes the circuit and a failure opens it again.
+
+    The bulkhead limits concurrent calls so that a slow host can't
+    tie up every request coroutine. Errors for which is_failure returns
+    False (e.g. a 4xx response) are raised without counting as a failure,
+    the host did answer.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30,
+        half_open_max_calls: int = 1,
+        max_concurrency: int = 10,
+        bulkhead_timeout: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        is_failure: Callable[[Exception], bool] = lambda error: True,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.max_concurrency = max_concurrency
+        self.bulkhead_timeout = bulkhead_timeout
+        self.clock = clock
+        self.is_failure = is_failure
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.half_open_calls = 0
+        self.in_flight = 0
+        self.rejected = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def allow_request(self) -> bool:
+        if self.state == self.OPEN:
+            if self.clock() - self.opened_at < self.recovery_timeout:
+                return False
+            logger.info(f"Circuit half-open for {self.name}")
+            self.state = self.HALF_OPEN
+            self.half_open_calls = 0
+
+        if self.state == self.HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                return False
+            self.half_open_calls += 1
+        return True
+
+    def record_success(self):
+        if self.state == self.HALF_OPEN:
+            logger.info(f"Circuit closed for {self.name}")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit opened for {self.name}")
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+
+    @asynccontextmanager
+    async def guard(self):
+        """
+        Run a call through the breaker and the bulkhead.
+        Raises CircuitOpenException instead of calling a failing host.
+        """
+        if not self.allow_request():
+            self.rejected += 1
+            raise CircuitOpenException(f"Circuit open for {self.name}")
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.bulkhead_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            if self.state == self.HALF_OPEN:
+                self.half_open_calls -= 1
+            raise CircuitOpenException(f"Too many concurrent calls to {self.name}")
+
+        self.in_flight += 1
+        try:
+            yield
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # a cancelled probe is neither a success nor a failure,
+            # free its slot for the next probe
+            if self.state == self.HALF_OPEN:
+                self.half_open_calls -= 1
+            raise
+        else:
+            self.record_success()
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "retry_in": (
+                max(0.0, self.recovery_timeout - (self.clock() - self.opened_at))
+                if self.state == self.OPEN
+                else None
+            ),
+        }
+
+
+class CircuitBreakerRegistry:
+    """
+    Lazily creates one circuit breaker per downstream host.
+    """
+
+    def __init__(self, **breaker_settings):
+        self.breaker_settings = breaker_settings
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **self.breaker_settings)
+            self.breakers[name] = breaker
+        return breaker
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.get_status() for name, breaker in self.breakers.items()}
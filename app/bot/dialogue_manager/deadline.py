@@ -0,0 +1,39 @@
+import time
+from typing import Callable, Optional
+from app.config import app_config
+
+
+class Deadline:
+    """
+    Time budget of a single request. Each stage asks for its timeout
+    so that the reply is always sent within the channel's SLA.
+    """
+
+    def __init__(self, budget: float, clock: Callable[[], float] = time.monotonic):
+        self.budget = budget
+        self.clock = clock
+        self.expires_at = clock() + budget
+
+    @classmethod
+    def for_channel(cls, channel: str) -> "Deadline":
+        budget = app_config.REQUEST_DEADLINES.get(
+            channel, app_config.DEFAULT_REQUEST_DEADLINE
+        )
+        return cls(budget)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self.clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None, reserve: float = 0.0) -> float:
+        """
+        Timeout for the next stage, keeping `reserve` seconds
+        of the budget for the stages after it.
+        """
+        timeout = max(0.0, self.remaining() - reserve)
+        if cap is not None:
+            timeout = min(timeout, cap)
+        return timeout
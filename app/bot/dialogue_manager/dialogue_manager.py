@@ -1,29 +1,30 @@
+import asyncio
 import json
 import logging
+import time
 from typing import Dict, List, Optional, Tuple
-from jinja2 import Template
 from app.admin.bots.store import get_bot
 from app.admin.intents.store import list_intents
+from app.admin.analytics.store import AnalyticsRecorder, analytics_recorder
 from app.bot.memory import MemorySaver
+from app.bot.memory.context_policy import ContextPolicy
+from app.bot.memory.factory import get_memory_saver
 from app.bot.memory.models import State
 from app.bot.nlu.pipeline import NLUPipeline
 from app.bot.nlu.pipeline_utils import get_pipeline
-from app.bot.dialogue_manager.utils import SilentUndefined, split_sentence
+from app.bot.dialogue_manager.utils import ResponseTemplate, split_sentence
 from app.bot.dialogue_manager.models import (
     IntentModel,
     ParameterModel,
     UserMessage,
 )
 from app.bot.dialogue_manager.http_client import call_api, APICallExcetion
+from app.bot.dialogue_manager.response_cache import APIResponseCache
+from app.bot.dialogue_manager.deadline import Deadline
+from app.bot.dialogue_manager.dispatcher import thread_dispatcher
+from app.metrics import register_metrics
 from app.config import app_config
 
-# Import appropriate memory saver based on configuration
-if app_config.USE_POSTGRESQL:
-    from app.bot.memory.memory_saver_postgres import MemorySaverPostgreSQL as MemorySaverImpl
-else:
-    from app.bot.memory.memory_saver_mongo import MemorySaverMongo as MemorySaverImpl
-    from app.database import client
-
 logger = logging.getLogger("dialogue_manager")
 
 
@@ -39,12 +40,31 @@ class DialogueManager:
         nlu_pipeline: NLUPipeline,
         fallback_intent_id: str,
         intent_confidence_threshold: float,
+        context_policy: Optional[ContextPolicy] = None,
+        analytics: Optional[AnalyticsRecorder] = None,
     ):
         self.memory_saver = memory_saver
+        self.context_policy = context_policy or ContextPolicy.from_config()
+        self.analytics = analytics
         self.nlu_pipeline = nlu_pipeline
         self.intents = {
             intent.intent_id: intent for intent in intents
         }  # Map for faster lookup
+        self.templates = {
+            intent.intent_id: self._compile_templates(intent) for intent in intents
+        }  # Compiled once, rendered on every turn
+        self.api_caches = {
+            intent.intent_id: APIResponseCache(
+                ttl=intent.api_details.cache_ttl,
+                stale_ttl=intent.api_details.cache_stale_ttl,
+                max_size=intent.api_details.cache_max_size,
+            )
+            for intent in intents
+            if intent.api_details and intent.api_details.cache_enabled
+        }
+        # state saves that outlived their request deadline, by thread
+        self._pending_saves: Dict[str, asyncio.Future] = {}
+        register_metrics("api_response_cache", self._get_api_cache_metrics)
         self.fallback_intent_id = fallback_intent_id
         self.confidence_threshold = intent_confidence_threshold
 
@@ -70,11 +90,8 @@ class DialogueManager:
             bot.nlu_config.traditional_settings.intent_detection_threshold
         )
 
-        # Initialize appropriate memory saver
-        if app_config.USE_POSTGRESQL:
-            memory_saver = MemorySaverImpl()
-        else:
-            memory_saver = MemorySaverImpl(client)
+        # Memory saver is shared across reloads, so is its state cache
+        memory_saver = get_memory_saver()
 
         return cls(
             memory_saver,
@@ -82,8 +99,15 @@ class DialogueManager:
             nlu_pipeline,
             fallback_intent_id,
             confidence_threshold,
+            analytics=analytics_recorder if app_config.ANALYTICS_ENABLED else None,
         )
 
+    def _get_api_cache_metrics(self) -> Dict:
+        return {
+            intent_id: cache.get_metrics()
+            for intent_id, cache in self.api_caches.items()
+        }
+
     def update_model(self, models_dir):
         """
         Signal hook to be called after training is completed.
@@ -95,11 +119,16 @@ class DialogueManager:
             self.nlu_pipeline = None
         logger.info("NLU Pipeline models updated")
 
-    async def process(self, message: UserMessage) -> State:
+    async def process(
+        self, message: UserMessage, deadline: Optional[Deadline] = None
+    ) -> State:
         """
         Single entry point to process the user message.
 
         :param message: UserMessage instance containing the request data.
+        :param deadline: time budget of the request, defaults to the budget
+            of the message channel. The time the turn waits in the queue of
+            its thread counts against it.
         :return: current state of the conversation including the bot response
         """
 
@@ -108,23 +137,33 @@ class DialogueManager:
                 "NLU pipeline is not initialized. Please build the models."
             )
 
-        # Step 1: Get current state
-        current_state = await self.memory_saver.get(message.thread_id)
+        if deadline is None:
+            deadline = Deadline.for_channel(message.channel)
 
-        if not current_state:
-            logger.debug(
-                f"No current state found for thread_id: {message.thread_id}, creating new state"
-            )
-            current_state = await self.memory_saver.init_state(message.thread_id)
+        # turns of the same thread run one after another so that none of them
+        # works on a stale state, different threads run concurrently
+        return await thread_dispatcher.run(
+            message.thread_id, self._process_turn, message, deadline
+        )
 
-        current_state.update(message)
+    async def _process_turn(self, message: UserMessage, deadline: Deadline) -> State:
+        reserve = app_config.DEADLINE_RESPONSE_RESERVE
+
+        # Step 1 & 2: Process through NLU pipeline while fetching current state.
+        # NLU runs in a worker thread so that blocking models and LLM calls
+        # don't hold the event loop.
+        nlu_result, (current_state, state_found) = await asyncio.gather(
+            self._run_nlu(message.text, deadline.timeout(reserve=reserve)),
+            self._get_or_init_state(
+                message.thread_id, deadline.timeout(reserve=reserve)
+            ),
+        )
 
-        try:
-            # Step 2: Process through NLU pipeline
-            nlu_result = self.nlu_pipeline.process(
-                {"text": current_state.user_message.text}
-            )
+        # every saved state has an intent
+        new_thread = state_found and not current_state.intent
+        current_state.update(message, self.context_policy)
 
+        try:
             # Step 3: Get intent ID and confidence
             query_intent_id, _ = self._get_intent_id_and_confidence(
                 current_state, nlu_result
@@ -159,7 +198,7 @@ class DialogueManager:
             # Step 6: Handle API trigger if the intent is complete
             if current_state.complete:
                 current_state = await self._handle_api_trigger(
-                    active_intent, current_state
+                    active_intent, current_state, deadline
                 )
 
             logger.debug(
@@ -167,8 +206,35 @@ class DialogueManager:
                 extra=current_state.to_dict(),
             )
 
-            # Step 7: Save the state
-            await self.memory_saver.save(message.thread_id, current_state)
+            # Step 7: Save the state, if the budget runs out
+            # the save completes in the background. A turn answered from a
+            # new state because the lookup timed out must not replace the
+            # saved conversation.
+            if not state_found:
+                logger.warning(
+                    f"State lookup timed out, turn not saved: {message.thread_id}"
+                )
+                return current_state
+
+            save = asyncio.ensure_future(
+                self.memory_saver.save(message.thread_id, current_state)
+            )
+            self._track_save(message.thread_id, save)
+            try:
+                await asyncio.wait_for(asyncio.shield(save), deadline.timeout())
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"Deadline exceeded, saving state in background: "
+                    f"{message.thread_id}"
+                )
+
+            if self.analytics is not None:
+                self.analytics.record_turn(
+                    active_intent.intent_id,
+                    fallback=active_intent.intent_id == self.fallback_intent_id,
+                    confidence=(nlu_result.get("intent") or {}).get("confidence"),
+                    new_thread=new_thread,
+                )
 
             return current_state
 
@@ -176,6 +242,64 @@ class DialogueManager:
             logger.error(f"Error processing request: {e}", exc_info=True)
             raise
 
+    async def _run_nlu(self, text: str, timeout: float) -> Dict:
+        """
+        Process the text through the NLU pipeline within the given timeout.
+        If it runs out of time, no intent is returned and the
+        fallback intent is used.
+        """
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(self.nlu_pipeline.process, {"text": text}),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"NLU pipeline timed out after {timeout:.2f}s")
+            return {"intent": {"intent": None, "confidence": 0.0}, "entities": {}}
+
+    def _track_save(self, thread_id: str, save: asyncio.Future):
+        self._pending_saves[thread_id] = save
+
+        def done(_):
+            if self._pending_saves.get(thread_id) is save:
+                del self._pending_saves[thread_id]
+
+        save.add_done_callback(done)
+
+    async def _get_state(self, thread_id: str) -> Optional[State]:
+        # wait for a save of the previous turn still running in the background
+        pending = self._pending_saves.get(thread_id)
+        if pending is not None:
+            try:
+                await asyncio.shield(pending)
+            except Exception as e:
+                # a failure of the previous turn, not of this one
+                logger.error(f"Background save failed for {thread_id}: {e}")
+        return await self.memory_saver.get(thread_id)
+
+    async def _get_or_init_state(
+        self, thread_id: str, timeout: float
+    ) -> Tuple[State, bool]:
+        """
+        Get the current state of the thread or initialize a new one.
+        If the lookup runs out of time, the turn continues with a new state
+        and False is returned, the state must not be saved then.
+        """
+        try:
+            current_state = await asyncio.wait_for(
+                self._get_state(thread_id), timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"State lookup timed out after {timeout:.2f}s")
+            return await self.memory_saver.init_state(thread_id), False
+
+        if not current_state:
+            logger.debug(
+                f"No current state found for thread_id: {thread_id}, creating new state"
+            )
+            current_state = await self.memory_saver.init_state(thread_id)
+        return current_state, True
+
     def _get_intent_id_and_confidence(
         self, current_state: State, nlu_result: Dict
     ) -> Tuple[str, float]:
@@ -310,29 +434,59 @@ class DialogueManager:
             ]
         return current_state
 
+    @staticmethod
+    def _compile_templates(intent: IntentModel) -> Dict[str, ResponseTemplate]:
+        """
+        Compile the response and api call templates of an intent.
+        Invalid templates are logged and fail when the intent is used.
+        """
+        templates = {"speech_response": ResponseTemplate(intent.speech_response)}
+        if intent.api_details:
+            templates["url"] = ResponseTemplate(intent.api_details.url)
+            templates["json_data"] = ResponseTemplate(intent.api_details.json_data)
+        for name, template in templates.items():
+            if template.error is not None:
+                logger.error(
+                    f"Invalid {name} template of intent {intent.intent_id}: "
+                    f"{template.error}"
+                )
+        return templates
+
+    def _get_templates(self, intent: IntentModel) -> Dict[str, ResponseTemplate]:
+        templates = self.templates.get(intent.intent_id)
+        if templates is None:
+            templates = self._compile_templates(intent)
+            self.templates[intent.intent_id] = templates
+        return templates
+
     async def _handle_api_trigger(
-        self, intent: IntentModel, current_state: State
+        self,
+        intent: IntentModel,
+        current_state: State,
+        deadline: Optional[Deadline] = None,
     ) -> State:
         """
         Handle API trigger if the intent requires it.
         """
+        speech_template = self._get_templates(intent)["speech_response"]
         if intent.api_trigger and intent.api_details:
             try:
-                result = await self._call_intent_api(intent, current_state)
-                template = Template(
-                    intent.speech_response,
-                    undefined=SilentUndefined,
-                    enable_async=True,
-                )
-                rendered_text = await template.render_async(
-                    context=current_state.context,
+                timeout = app_config.API_CALL_TIMEOUT
+                if deadline is not None:
+                    timeout = deadline.timeout(
+                        cap=timeout, reserve=app_config.DEADLINE_RESPONSE_RESERVE
+                    )
+                if timeout <= 0:
+                    raise DialogueManagerException("Deadline exceeded")
+
+                result = await self._call_intent_api(intent, current_state, timeout)
+                sentences = await speech_template.render_sentences(
+                    context=current_state.turn_context,
                     parameters=current_state.extracted_parameters,
                     result=result,
                 )
 
-                current_state.bot_message = [
-                    {"text": msg} for msg in split_sentence(rendered_text)
-                ]
+                current_state.bot_message = [{"text": msg} for msg in sentences]
 
             except DialogueManagerException as e:
                 logger.warning(f"API call failed: {e}")
@@ -340,50 +494,69 @@ class DialogueManager:
                     {"text": "Service is not available. Please try again later."}
                 ]
         else:
-            template = Template(
-                intent.speech_response,
-                undefined=SilentUndefined,
-                enable_async=True,
-            )
-            rendered_text = await template.render_async(
-                context=current_state.context,
+            sentences = await speech_template.render_sentences(
+                context=current_state.turn_context,
                 parameters=current_state.extracted_parameters,
             )
-            current_state.bot_message = [
-                {"text": msg} for msg in split_sentence(rendered_text)
-            ]
+            current_state.bot_message = [{"text": msg} for msg in sentences]
         return current_state
 
-    async def _call_intent_api(self, intent: IntentModel, current_state: State):
+    async def _call_intent_api(
+        self,
+        intent: IntentModel,
+        current_state: State,
+        timeout: float = app_config.API_CALL_TIMEOUT,
+    ):
         """
         Call the API associated with the intent.
         """
         api_details = intent.api_details
+        templates = self._get_templates(intent)
         headers = api_details.get_headers()
-        url_template = Template(api_details.url, undefined=SilentUndefined)
-        rendered_url = url_template.render(
-            context=current_state.context, parameters=current_state.extracted_parameters
+        rendered_url = await templates["url"].render(
+            context=current_state.turn_context,
+            parameters=current_state.extracted_parameters,
         )
         if api_details.is_json:
-            request_template = Template(
-                api_details.json_data, undefined=SilentUndefined
-            )
-            request_json = request_template.render(
-                context=current_state.context,
+            request_json = await templates["json_data"].render(
+                context=current_state.turn_context,
                 parameters=current_state.extracted_parameters,
             )
             parameters = json.loads(request_json)
         else:
             parameters = current_state.extracted_parameters
 
+        async def fetch():
+            started = time.monotonic()
+            success = False
+            try:
+                result = await call_api(
+                    rendered_url,
+                    api_details.request_type,
+                    headers,
+                    parameters,
+                    api_details.is_json,
+                    timeout,
+                )
+                success = True
+                return result
+            finally:
+                if self.analytics is not None:
+                    self.analytics.record_api_call(
+                        intent.intent_id, success, time.monotonic() - started
+                    )
+
+        # only idempotent calls are served from the cache
+        cache = self.api_caches.get(intent.intent_id)
+        if api_details.request_type.upper() != "GET":
+            cache = None
+
         try:
-            return await call_api(
-                rendered_url,
-                api_details.request_type,
-                headers,
-                parameters,
-                api_details.is_json,
-            )
+            if cache is not None:
+                return await cache.get_or_fetch(
+                    cache.make_key(rendered_url, parameters), fetch
+                )
+            return await fetch()
         except APICallExcetion as e:
             logger.warning(f"API call failed: {e}")
             raise DialogueManagerException("API call failed")
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from app.metrics import register_metrics
+
+
+class _KeyQueue:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # tasks holding or waiting for the lock
+        self.pending = 0
+
+
+class KeyedDispatcher:
+    """
+    Runs work for the same key one at a time, in arrival order, while work
+    for different keys runs concurrently. Only keys with pending work are
+    kept in memory.
+    """
+
+    def __init__(self):
+        self.queues: Dict[Hashable, _KeyQueue] = {}
+        self.processed = 0
+        self.max_queue_depth = 0
+
+    async def run(
+        self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = _KeyQueue()
+        queue.pending += 1
+        self.max_queue_depth = max(self.max_queue_depth, queue.pending)
+        try:
+            # asyncio.Lock wakes up waiters in FIFO order
+            async with queue.lock:
+                return await func(*args, **kwargs)
+        finally:
+            self.processed += 1
+            queue.pending -= 1
+            if queue.pending == 0:
+                del self.queues[key]
+
+    def queue_depth(self, key: Hashable) -> int:
+        queue = self.queues.get(key)
+        return queue.pending if queue else 0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "active_keys": len(self.queues),
+            "queued": sum(queue.pending for queue in self.queues.values()),
+            "max_queue_depth": self.max_queue_depth,
+            "processed": self.processed,
+        }
+
+
+# serializes turns per conversation thread, shared across dialogue manager reloads
+thread_dispatcher = KeyedDispatcher()
+register_metrics("thread_dispatcher", thread_dispatcher.get_metrics)
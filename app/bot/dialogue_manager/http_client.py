@@ -1,8 +1,17 @@
 import logging
+import time
 import aiohttp
 import asyncio
+from collections import defaultdict
 from typing import Dict, Any, Optional
+from urllib.parse import urlsplit
 from aiohttp import ClientTimeout
+from app.config import app_config
+from app.bot.dialogue_manager.circuit_breaker import (
+    CircuitBreakerRegistry,
+    CircuitOpenException,
+)
+from app.metrics import register_metrics
 
 logger = logging.getLogger("http_client")
 
@@ -11,6 +20,97 @@ class APICallExcetion(Exception):
     pass
 
 
+class HTTPClientManager:
+    """
+    Owns a single aiohttp session for the lifetime of the app so that
+    connections, DNS lookups and TLS sessions are reused across API calls.
+    Also keeps per-host latency and error metrics.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.host_metrics = defaultdict(
+            lambda: {"requests": 0, "errors": 0, "total_latency": 0.0}
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def record(self, url: str, latency: float, error: bool = False):
+        metrics = self.host_metrics[urlsplit(url).netloc]
+        metrics["requests"] += 1
+        metrics["total_latency"] += latency
+        if error:
+            metrics["errors"] += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        hosts = {}
+        for host, metrics in self.host_metrics.items():
+            requests = metrics["requests"]
+            hosts[host] = {
+                "requests": requests,
+                "errors": metrics["errors"],
+                "error_rate": metrics["errors"] / requests if requests else 0.0,
+                "avg_latency_ms": (
+                    metrics["total_latency"] / requests * 1000 if requests else 0.0
+                ),
+            }
+        return {"hosts": hosts}
+
+
+http_client_manager = HTTPClientManager(
+    limit=app_config.HTTP_CLIENT_LIMIT,
+    limit_per_host=app_config.HTTP_CLIENT_LIMIT_PER_HOST,
+    dns_cache_ttl=app_config.HTTP_CLIENT_DNS_CACHE_TTL,
+    keepalive_timeout=app_config.HTTP_CLIENT_KEEPALIVE_TIMEOUT,
+)
+register_metrics("http_client", http_client_manager.get_metrics)
+
+def is_upstream_failure(error: Exception) -> bool:
+    """
+    Whether an API call error means the host is failing: connection
+    errors, timeouts and 5xx responses. 4xx responses are answers to
+    the request, e.g. bad user input.
+    """
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500
+    return True
+
+
+circuit_breakers = CircuitBreakerRegistry(
+    is_failure=is_upstream_failure,
+    failure_threshold=app_config.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=app_config.CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
+    half_open_max_calls=app_config.CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS,
+    max_concurrency=app_config.API_MAX_CONCURRENCY_PER_HOST,
+    bulkhead_timeout=app_config.API_BULKHEAD_TIMEOUT,
+)
+
+
 async def call_api(
     url: str,
     method: str,
@@ -43,38 +143,46 @@ async def call_api(
     parameters = parameters or {}
     timeout_config = ClientTimeout(total=timeout)
 
+    method = method.upper()
+    if method in ["GET", "DELETE"]:
+        kwargs = {"headers": headers, "params": parameters}
+    elif method in ["POST", "PUT"]:
+        kwargs = {
+            "headers": headers,
+            "json" if is_json else "params": parameters,
+        }
+    else:
+        raise ValueError(f"Unsupported request method: {method}")
+
+    breaker = circuit_breakers.get(urlsplit(url).netloc)
+    started = time.perf_counter()
+
     try:
-        async with aiohttp.ClientSession(timeout=timeout_config) as session:
-            method = method.upper()
+        async with breaker.guard():
+            session = await http_client_manager.get_session()
             logger.debug(
                 f"Initiating async API Call: url={url} \
                     method={method} payload={parameters}"
             )
 
-            if method == "GET":
-                async with session.get(
-                    url, headers=headers, params=parameters
+            try:
+                async with session.request(
+                    method, url, timeout=timeout_config, **kwargs
                 ) as response:
                     result = await response.json()
-            elif method in ["POST", "PUT"]:
-                kwargs = {
-                    "headers": headers,
-                    "json" if is_json else "params": parameters,
-                }
-                async with getattr(session, method.lower())(url, **kwargs) as response:
-                    result = await response.json()
-            elif method == "DELETE":
-                async with session.delete(
-                    url, headers=headers, params=parameters
-                ) as response:
-                    result = await response.json()
-            else:
-                raise ValueError(f"Unsupported request method: {method}")
 
-            response.raise_for_status()
+                response.raise_for_status()
+            except Exception:
+                http_client_manager.record(url, time.perf_counter() - started, True)
+                raise
+
+            http_client_manager.record(url, time.perf_counter() - started)
             logger.debug(f"API response => {result}")
             return result
 
+    except CircuitOpenException as e:
+        logger.warning(f"API call rejected: {str(e)}")
+        raise APICallExcetion(str(e))
     except aiohttp.ClientError as e:
         logger.error(f"HTTP error occurred: {str(e)}")
         raise APICallExcetion(f"HTTP error occurred: {str(e)}")
@@ -12,6 +12,10 @@ class ApiDetailsModel:
     headers: List[Dict[str, str]]
     is_json: bool = False
     json_data: str = "{}"
+    cache_enabled: bool = False
+    cache_ttl: int = 60
+    cache_stale_ttl: int = 0
+    cache_max_size: int = 128
 
     def get_headers(self) -> Dict[str, str]:
         headers = {}
@@ -53,6 +57,10 @@ class IntentModel:
                 headers=db_intent.apiDetails.headers,
                 is_json=db_intent.apiDetails.isJson,
                 json_data=db_intent.apiDetails.jsonData,
+                cache_enabled=db_intent.apiDetails.cacheEnabled,
+                cache_ttl=db_intent.apiDetails.cacheTtl,
+                cache_stale_ttl=db_intent.apiDetails.cacheStaleTtl,
+                cache_max_size=db_intent.apiDetails.cacheMaxSize,
             )
 
         parameters = []
@@ -152,6 +160,8 @@ class ChatModel:
 
 
 class UserMessage:
+    __slots__ = ("thread_id", "text", "channel", "context")
+
     def __init__(
         self, thread_id: str, text: Text, context: Dict, channel: Text = "rest"
     ):
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger("response_cache")
+
+
+class APIResponseCache:
+    """
+    Size-capped TTL cache for idempotent intent API calls.
+    Entries older than ttl but within the stale window are served
+    immediately while being refreshed in the background.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float = 0,
+        max_size: int = 128,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max(1, max_size)
+        self.clock = clock
+        self.entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(url: str, parameters: Dict[str, Any]) -> str:
+        return json.dumps([url, parameters], sort_keys=True, default=str)
+
+    async def get_or_fetch(
+        self, key: str, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the cached response for key, calling fetch on a miss.
+        Failed fetches are not cached.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = self.clock() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self.entries.move_to_end(key)
+                self._refresh(key, fetch)
+                return value
+
+        self.misses += 1
+        value = await fetch()
+        self._store(key, value)
+        return value
+
+    def _store(self, key: str, value: Any):
+        self.entries[key] = (value, self.clock())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def _refresh(self, key: str, fetch: Callable[[], Awaitable[Any]]):
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                self._store(key, await fetch())
+            except Exception as e:
+                logger.warning(f"Background refresh failed: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        requests = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.stale_hits) / requests if requests else 0.0,
+        }
@@ -1,4 +1,14 @@
-from jinja2 import Undefined
+import fnmatch
+import hashlib
+import os
+from typing import Dict, List, Optional
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FunctionLoader,
+    TemplateSyntaxError,
+    Undefined,
+)
 
 
 def split_sentence(sentence):
@@ -20,3 +30,94 @@ class SilentUndefined(Undefined):
     ) = __getitem__ = __lt__ = __le__ = __gt__ = __ge__ = __int__ = __float__ = (
         __complex__
     ) = __pow__ = __rpow__ = _fail_with_undefined_error
+
+
+class BoundedBytecodeCache(FileSystemBytecodeCache):
+    """
+    Bytecode cache that keeps the max_files most recently written files,
+    templates of edited responses are not left behind on disk.
+    """
+
+    def __init__(self, max_files: int = 1000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_files = max_files
+
+    def dump_bytecode(self, bucket):
+        super().dump_bytecode(bucket)
+        pattern = self.pattern % ("*",)
+        try:
+            paths = [
+                os.path.join(self.directory, name)
+                for name in fnmatch.filter(os.listdir(self.directory), pattern)
+            ]
+            paths.sort(key=os.path.getmtime)
+            for path in paths[: max(0, len(paths) - self.max_files)]:
+                os.remove(path)
+        except OSError:
+            # another process is cleaning up too
+            pass
+
+
+# sources of the templates being compiled, by their checksum. Compiled
+# templates are kept by the environment, sources are only needed until then.
+_template_sources: Dict[str, str] = {}
+
+# shared environment for intent responses and api calls, compiled templates
+# are cached by the environment and their bytecode survives restarts
+template_env = Environment(
+    loader=FunctionLoader(_template_sources.get),
+    undefined=SilentUndefined,
+    enable_async=True,
+    auto_reload=False,
+    cache_size=1000,
+    bytecode_cache=BoundedBytecodeCache(max_files=1000),
+)
+
+
+def has_template_markup(source: str) -> bool:
+    return any(token in source for token in ("{{", "{%", "{#"))
+
+
+def compile_template(source: str):
+    """
+    Compile a template once. Identical sources share the compiled template.
+    """
+    name = hashlib.sha1(source.encode("utf-8")).hexdigest()
+    _template_sources[name] = source
+    try:
+        return template_env.get_template(name)
+    finally:
+        del _template_sources[name]
+
+
+class ResponseTemplate:
+    """
+    Precompiled template. Text without template markup is pre-split
+    and served without rendering. A template with a syntax error is kept
+    in `error` and raises when rendered, so only its intent fails.
+    """
+
+    def __init__(self, source: Optional[str]):
+        self.source = source or ""
+        self.template = None
+        self.sentences = None
+        self.error: Optional[TemplateSyntaxError] = None
+        if has_template_markup(self.source):
+            try:
+                self.template = compile_template(self.source)
+            except TemplateSyntaxError as e:
+                self.error = e
+        else:
+            self.sentences = split_sentence(self.source)
+
+    async def render(self, **kwargs) -> str:
+        if self.error is not None:
+            raise self.error
+        if self.template is None:
+            return self.source
+        return await self.template.render_async(**kwargs)
+
+    async def render_sentences(self, **kwargs) -> List[str]:
+        if self.template is None and self.error is None:
+            return self.sentences
+        return split_sentence(await self.render(**kwargs))
@@ -1,5 +1,9 @@
-from collections import OrderedDict
-from typing import Text, Optional, List
+import copy
+import functools
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Text, Tuple
 from app.bot.memory.models import State
 
 
@@ -20,28 +24,162 @@ class MemorySaver:
         """
         raise NotImplementedError("save method not implemented")
 
+    async def save_many(self, states: List[State]):
+        """
+        append several states at once, in order
+        """
+        for state in states:
+            await self.save(state.thread_id, state)
+
+    def batch_writes(self, states: List[State]) -> List[Callable[[], Awaitable]]:
+        """
+        The steps of save_many, in order, for callers that retry a failed
+        batch: each step can be retried on its own without redoing the
+        others. A single step unless save_many isn't atomic.
+        """
+        return [functools.partial(self.save_many, states)]
+
     async def get(self, thread_id) -> Optional[State]:
         raise NotImplementedError("get method not implemented")
 
     async def get_all(self, thread_id) -> List[State]:
         raise NotImplementedError("get_all method not implemented")
 
+    async def setup(self):
+        """
+        Create indexes, tables etc., called on application startup
+        """
+        pass
+
+    async def close(self):
+        """
+        Release resources and flush pending writes, called on shutdown
+        """
+        pass
+
+
+class _Shard:
+    __slots__ = ("lock", "threads", "size")
 
-class MemorySaverInMemory(MemorySaver):
     def __init__(self):
-        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        # thread_id -> (states, last access), least recently used first
+        self.threads: "OrderedDict[Text, Tuple[deque, float]]" = OrderedDict()
+        # number of states stored in the shard
+        self.size = 0
+
+
+class MemorySaverInMemory(MemorySaver):
+    """
+    In-process memory saver for tests, load tests and single-node deployments.
+
+    - each thread keeps its last max_history states (ring buffer)
+    - threads idle for longer than ttl seconds are evicted
+    - once more than max_states states are stored, least recently used
+      threads of the shard being written are evicted, never the thread
+      just saved. The memory budget is a number of states rather than
+      bytes, measuring the size of every saved state would cost more
+      than the save.
+    - threads are spread over num_shards shards with their own lock,
+      so it can be used from several OS threads, the budget is shared
+    - states are copied on save and on get, the dialogue manager updates
+      the state of a thread in place from turn to turn
+    """
+
+    def __init__(
+        self,
+        max_history: Optional[int] = 100,
+        ttl: Optional[float] = 3600,
+        max_states: Optional[int] = 100000,
+        num_shards: int = 16,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_history = max_history
+        self.ttl = ttl
+        self.clock = clock
+        self.max_states = max_states
+        self.shards = [_Shard() for _ in range(max(1, num_shards))]
+
+        self.expired_threads = 0
+        self.evicted_threads = 0
+        self.dropped_states = 0
+
+    def _shard(self, thread_id: Text) -> _Shard:
+        return self.shards[hash(thread_id) % len(self.shards)]
+
+    def _size(self) -> int:
+        # sizes of the other shards are read without their lock, the
+        # budget is approximate
+        return sum(shard.size for shard in self.shards)
+
+    def _evict(self, shard: _Shard, now: float, keep: Optional[Text] = None):
+        """
+        Evict idle threads, then threads over the budget, oldest first,
+        up to the thread to keep
+        """
+        while shard.threads:
+            thread_id, (states, last_access) = next(iter(shard.threads.items()))
+            if thread_id == keep:
+                break
+            if self.ttl is not None and now - last_access >= self.ttl:
+                self.expired_threads += 1
+            elif self.max_states is not None and self._size() > self.max_states:
+                self.evicted_threads += 1
+            else:
+                break
+            del shard.threads[thread_id]
+            shard.size -= len(states)
 
     async def save(self, thread_id: Text, state: State):
-        if thread_id not in self.memory:
-            self.memory[thread_id] = []
-        self.memory[thread_id].append(state)
+        shard = self._shard(thread_id)
+        now = self.clock()
+        with shard.lock:
+            entry = shard.threads.get(thread_id)
+            states = entry[0] if entry else deque(maxlen=self.max_history)
+            if len(states) == states.maxlen:
+                self.dropped_states += 1
+            else:
+                shard.size += 1
+            states.append(copy.deepcopy(state))
+            shard.threads[thread_id] = (states, now)
+            shard.threads.move_to_end(thread_id)
+            self._evict(shard, now, keep=thread_id)
+
+    def _get_states(self, thread_id: Text) -> Optional[deque]:
+        shard = self._shard(thread_id)
+        now = self.clock()
+        with shard.lock:
+            entry = shard.threads.get(thread_id)
+            if (
+                entry is not None
+                and self.ttl is not None
+                and now - entry[1] >= self.ttl
+            ):
+                del shard.threads[thread_id]
+                shard.size -= len(entry[0])
+                self.expired_threads += 1
+                entry = None
+            if entry is not None:
+                shard.threads[thread_id] = (entry[0], now)
+                shard.threads.move_to_end(thread_id)
+            self._evict(shard, now, keep=thread_id)
+            return entry[0] if entry else None
 
     async def get(self, thread_id) -> Optional[State]:
-        if thread_id not in self.memory:
+        states = self._get_states(thread_id)
+        if not states:
             return None
-        return self.memory.get(thread_id)[-1]
+        return copy.deepcopy(states[-1])
 
     async def get_all(self, thread_id) -> List[State]:
-        if thread_id not in self.memory:
-            return []
-        return self.memory.get(thread_id)
+        states = self._get_states(thread_id)
+        return copy.deepcopy(list(states)) if states else []
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "threads": sum(len(shard.threads) for shard in self.shards),
+            "states": sum(shard.size for shard in self.shards),
+            "expired_threads": self.expired_threads,
+            "evicted_threads": self.evicted_threads,
+            "dropped_states": self.dropped_states,
+        }
@@ -0,0 +1,284 @@
+"""
+Moves the history of conversations idle for `idle_days` out of the hot
+`state` collection / `chat_states` table into compressed cold storage.
+
+A thread's history is stored as chunks of up to `chunk_size` turns, each
+chunk a zstd compressed NDJSON document, indexed by (thread_id, seq).
+Readers get the archived turns with read_archived() and put them before the
+live ones, delta encoded turns rebuild across both.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, UTC
+from typing import Dict, List, Optional, Text
+import orjson
+import zstandard
+from bson import Binary
+from app.config import app_config
+
+logger = logging.getLogger(__name__)
+
+
+def encode_chunk(documents: List[Dict]) -> bytes:
+    lines = b"\n".join(orjson.dumps(document, default=str) for document in documents)
+    return zstandard.ZstdCompressor(level=9).compress(lines)
+
+
+def decode_chunk(data: bytes) -> List[Dict]:
+    lines = zstandard.ZstdDecompressor().decompress(data).splitlines()
+    documents = []
+    for line in lines:
+        document = orjson.loads(line)
+        if isinstance(document.get("date"), str):
+            document["date"] = datetime.fromisoformat(document["date"])
+        documents.append(document)
+    return documents
+
+
+class HistoryArchiver:
+    """
+    Base class of the archivers, subclasses implement the storage.
+    """
+
+    def __init__(self, idle_days: int = 30, chunk_size: int = 500):
+        self.idle_days = idle_days
+        self.chunk_size = chunk_size
+
+    async def setup(self):
+        pass
+
+    async def archive_idle_threads(self, max_threads: int = 1000) -> int:
+        """
+        Archive up to max_threads idle threads, returns the number of archived
+        threads.
+        """
+        cutoff = datetime.now(UTC) - timedelta(days=self.idle_days)
+        thread_ids = await self.find_idle_threads(cutoff, max_threads)
+        for thread_id in thread_ids:
+            await self.archive_thread(thread_id)
+        if thread_ids:
+            logger.info(f"Archived {len(thread_ids)} idle threads")
+        return len(thread_ids)
+
+    async def find_idle_threads(self, cutoff: datetime, limit: int) -> List[Text]:
+        raise NotImplementedError("find_idle_threads method not implemented")
+
+    async def archive_thread(self, thread_id: Text):
+        raise NotImplementedError("archive_thread method not implemented")
+
+    async def read_archived(self, thread_id: Text) -> List[Dict]:
+        """
+        Archived history documents of the thread, oldest first
+        """
+        raise NotImplementedError("read_archived method not implemented")
+
+
+class MongoHistoryArchiver(HistoryArchiver):
+    """
+    Idle threads are found on the `thread_summary` collection kept by the
+    memory saver, archived threads are flagged there until their next turn.
+    Threads saved before the summaries existed are only found after
+    `manage.py migrate` backfills them.
+    """
+
+    def __init__(self, database, **kwargs):
+        super().__init__(**kwargs)
+        self.collection = database.get_collection("state")
+        self.archive_collection = database.get_collection("state_archive")
+        self.summary_collection = database.get_collection("thread_summary")
+
+    async def setup(self):
+        await self.archive_collection.create_index([("thread_id", 1), ("seq", 1)])
+        await self.summary_collection.create_index([("archived", 1), ("last_date", 1)])
+
+    async def find_idle_threads(self, cutoff: datetime, limit: int) -> List[Text]:
+        # summaries written before the flag existed have no archived field
+        cursor = self.summary_collection.find(
+            {"archived": {"$in": [False, None]}, "last_date": {"$lt": cutoff}},
+            {"_id": 0, "thread_id": 1},
+            limit=limit,
+        )
+        return [doc["thread_id"] async for doc in cursor]
+
+    async def archive_thread(self, thread_id: Text):
+        documents = await self.collection.find(
+            {"thread_id": thread_id}, sort=[("date", 1), ("_id", 1)]
+        ).to_list(None)
+        if documents:
+            await self._archive_documents(thread_id, documents)
+
+        # unless a turn was saved in the meantime
+        last_date = documents[-1]["date"] if documents else datetime.max
+        await self.summary_collection.update_one(
+            {"thread_id": thread_id, "last_date": {"$lte": last_date}},
+            {"$set": {"archived": True}},
+        )
+
+    async def _archive_documents(self, thread_id: Text, documents: List[Dict]):
+        last = await self.archive_collection.find_one(
+            {"thread_id": thread_id}, {"seq": 1}, sort=[("seq", -1)]
+        )
+        seq = last["seq"] + 1 if last else 0
+
+        for start in range(0, len(documents), self.chunk_size):
+            chunk = documents[start : start + self.chunk_size]
+            # keyed by the first turn so that a rerun after a crash
+            # replaces the chunk instead of duplicating it
+            await self.archive_collection.replace_one(
+                {"thread_id": thread_id, "first_id": chunk[0]["_id"]},
+                {
+                    "thread_id": thread_id,
+                    "first_id": chunk[0]["_id"],
+                    "seq": seq,
+                    "first_date": chunk[0]["date"],
+                    "last_date": chunk[-1]["date"],
+                    "count": len(chunk),
+                    "data": Binary(encode_chunk(chunk)),
+                },
+                upsert=True,
+            )
+            await self.collection.delete_many(
+                {"_id": {"$in": [document["_id"] for document in chunk]}}
+            )
+            seq += 1
+
+    async def read_archived(self, thread_id: Text) -> List[Dict]:
+        documents = []
+        async for chunk in self.archive_collection.find(
+            {"thread_id": thread_id}, sort=[("seq", 1)]
+        ):
+            documents.extend(decode_chunk(chunk["data"]))
+        return documents
+
+
+class PostgresHistoryArchiver(HistoryArchiver):
+    """
+    Idle threads are found on chat_state_latest, by the partial index on
+    the updated_at of threads not archived yet. Saving a turn clears the
+    archived flag of its thread.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(**kwargs)
+        self.db = db
+
+    async def find_idle_threads(self, cutoff: datetime, limit: int) -> List[Text]:
+        rows = await self.db.fetch(
+            """
+            SELECT thread_id FROM chat_state_latest
+            WHERE NOT archived AND updated_at < $1
+            LIMIT $2
+            """,
+            cutoff.replace(tzinfo=None),
+            limit,
+        )
+        return [row["thread_id"] for row in rows]
+
+    async def archive_thread(self, thread_id: Text):
+        pool = await self.db.get_pool()
+        async with pool.acquire() as connection:
+            async with connection.transaction():
+                rows = await connection.fetch(
+                    """
+                    SELECT id, state_data, created_at FROM chat_states
+                    WHERE thread_id = $1
+                    ORDER BY created_at, id
+                    FOR UPDATE
+                    """,
+                    thread_id,
+                )
+                if rows:
+                    await self._archive_rows(connection, thread_id, rows)
+                # unless a turn was saved in the meantime
+                await connection.execute(
+                    """
+                    UPDATE chat_state_latest SET archived = TRUE
+                    WHERE thread_id = $1 AND updated_at <= $2
+                    """,
+                    thread_id,
+                    rows[-1]["created_at"] if rows else datetime.max,
+                )
+
+    async def _archive_rows(self, connection, thread_id: Text, rows: List):
+        seq = await connection.fetchval(
+            "SELECT COALESCE(MAX(seq) + 1, 0) FROM chat_states_archive"
+            " WHERE thread_id = $1",
+            thread_id,
+        )
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start : start + self.chunk_size]
+            await connection.execute(
+                """
+                INSERT INTO chat_states_archive
+                (thread_id, seq, first_created_at, last_created_at,
+                 count, data)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                """,
+                thread_id,
+                seq,
+                chunk[0]["created_at"],
+                chunk[-1]["created_at"],
+                len(chunk),
+                encode_chunk([row["state_data"] for row in chunk]),
+            )
+            seq += 1
+        await connection.execute(
+            "DELETE FROM chat_states WHERE id = ANY($1::int[])",
+            [row["id"] for row in rows],
+        )
+
+    async def read_archived(self, thread_id: Text) -> List[Dict]:
+        rows = await self.db.fetch(
+            "SELECT data FROM chat_states_archive WHERE thread_id = $1 ORDER BY seq",
+            thread_id,
+        )
+        documents = []
+        for row in rows:
+            documents.extend(decode_chunk(row["data"]))
+        return documents
+
+
+# process-wide archiver, created on first use
+_archiver: Optional[HistoryArchiver] = None
+
+
+def get_history_archiver() -> HistoryArchiver:
+    global _archiver
+    if _archiver is None:
+        settings = dict(
+            idle_days=app_config.HISTORY_ARCHIVE_IDLE_DAYS,
+            chunk_size=app_config.HISTORY_ARCHIVE_CHUNK_SIZE,
+        )
+        if app_config.USE_POSTGRESQL:
+            from app.database_postgres import postgres_db
+
+            _archiver = PostgresHistoryArchiver(postgres_db, **settings)
+        else:
+            from app.database import client
+
+            _archiver = MongoHistoryArchiver(
+                client.get_database("chatbot"), **settings
+            )
+    return _archiver
+
+
+async def run_history_archiver(interval: float):
+    """
+    Archive idle threads every interval seconds, runs until cancelled.
+    """
+    archiver = get_history_archiver()
+    await archiver.setup()
+    while True:
+        try:
+            # keep going while full batches are archived
+            while (
+                await archiver.archive_idle_threads(
+                    app_config.HISTORY_ARCHIVE_BATCH_SIZE
+                )
+                == app_config.HISTORY_ARCHIVE_BATCH_SIZE
+            ):
+                pass
+        except Exception as e:
+            logger.warning(f"History archival failed: {e}")
+        await asyncio.sleep(interval)
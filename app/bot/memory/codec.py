@@ -0,0 +1,104 @@
+"""
+Compact binary encoding of the conversation State for the latest-state
+stores and the in-process state cache.
+
+Layout: one header byte followed by the payload.
+  - the low 7 bits are the codec version
+  - the high bit is set when the payload is zstd compressed
+The payload is an orjson array of the fields needed to continue a
+conversation, in the order of STATE_FIELDS, followed by the state date as
+a unix timestamp and the turn id. Payloads written before the turn id
+was added end with the date. Chat history keeps using State.to_dict.
+
+Values must be JSON types (dict, list, str, int, float, bool, None) so
+that a state decodes to the same values. Anything else, including
+datetimes, Decimals, sets and subclasses of the built-in types, is
+rejected with a StateCodecException instead of being turned into a string
+(UUIDs are the exception, orjson always writes them as strings).
+"""
+
+import threading
+from datetime import datetime, UTC
+import orjson
+import zstandard
+from app.bot.memory.models import State
+
+CODEC_VERSION = 1
+FLAG_ZSTD = 0x80
+
+# payloads smaller than this are not worth compressing
+COMPRESSION_THRESHOLD = 512
+
+# types orjson would otherwise serialize as strings or dicts
+PASSTHROUGH = (
+    orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+    | orjson.OPT_PASSTHROUGH_SUBCLASS
+)
+
+STATE_FIELDS = (
+    "thread_id",
+    "context",
+    "intent",
+    "parameters",
+    "extracted_parameters",
+    "missing_parameters",
+    "complete",
+    "current_node",
+)
+
+# zstd contexts are not thread safe
+_local = threading.local()
+
+
+class StateCodecException(Exception):
+    pass
+
+
+def _compressor() -> zstandard.ZstdCompressor:
+    compressor = getattr(_local, "compressor", None)
+    if compressor is None:
+        compressor = _local.compressor = zstandard.ZstdCompressor(level=3)
+    return compressor
+
+
+def _decompressor() -> zstandard.ZstdDecompressor:
+    decompressor = getattr(_local, "decompressor", None)
+    if decompressor is None:
+        decompressor = _local.decompressor = zstandard.ZstdDecompressor()
+    return decompressor
+
+
+def encode_state(state: State, compress: bool = True) -> bytes:
+    values = [getattr(state, field) for field in STATE_FIELDS]
+    values.append(state.date.timestamp())
+    values.append(state.turn_id)
+    try:
+        payload = orjson.dumps(values, option=PASSTHROUGH)
+    except orjson.JSONEncodeError as e:
+        raise StateCodecException(f"Can't encode state of {state.thread_id}: {e}")
+
+    if compress and len(payload) >= COMPRESSION_THRESHOLD:
+        return bytes([CODEC_VERSION | FLAG_ZSTD]) + _compressor().compress(payload)
+    return bytes([CODEC_VERSION]) + payload
+
+
+def decode_state(data: bytes) -> State:
+    if not data:
+        raise StateCodecException("Empty state")
+
+    header = data[0]
+    version = header & ~FLAG_ZSTD
+    if version != CODEC_VERSION:
+        raise StateCodecException(f"Unsupported state codec version {version}")
+
+    payload = memoryview(data)[1:]
+    if header & FLAG_ZSTD:
+        payload = _decompressor().decompress(payload)
+    values = orjson.loads(payload)
+
+    state = State(**dict(zip(STATE_FIELDS, values)))
+    state.date = datetime.fromtimestamp(values[len(STATE_FIELDS)], UTC)
+    if len(values) > len(STATE_FIELDS) + 1:
+        state.turn_id = values[len(STATE_FIELDS) + 1]
+    return state
@@ -0,0 +1,64 @@
+import logging
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+import orjson
+from app.config import app_config
+
+logger = logging.getLogger(__name__)
+
+
+class ContextPolicy:
+    """
+    Decides which keys of the context sent with a message are kept in the
+    conversation state across turns.
+
+    - ephemeral keys (e.g. a per-message timestamp) are only available
+      to the current turn
+    - if persisted_keys is set, only those keys are kept across turns,
+      the others are treated as ephemeral
+    - values larger than max_value_size bytes (JSON encoded) are not kept
+      across turns, 0 disables the limit
+    """
+
+    def __init__(
+        self,
+        persisted_keys: Optional[Iterable[str]] = None,
+        ephemeral_keys: Iterable[str] = (),
+        max_value_size: int = 0,
+    ):
+        self.persisted_keys: Optional[Set[str]] = (
+            set(persisted_keys) if persisted_keys else None
+        )
+        self.ephemeral_keys = set(ephemeral_keys)
+        self.max_value_size = max_value_size
+
+    @classmethod
+    def from_config(cls) -> "ContextPolicy":
+        return cls(
+            persisted_keys=app_config.CONTEXT_PERSISTED_KEYS,
+            ephemeral_keys=app_config.CONTEXT_EPHEMERAL_KEYS,
+            max_value_size=app_config.CONTEXT_MAX_VALUE_SIZE,
+        )
+
+    def is_durable(self, key: str, value: Any) -> bool:
+        if key in self.ephemeral_keys:
+            return False
+        if self.persisted_keys is not None and key not in self.persisted_keys:
+            return False
+        if self.max_value_size:
+            size = len(orjson.dumps(value, default=str))
+            if size > self.max_value_size:
+                logger.debug(f"Context value of {key} too large to keep ({size}B)")
+                return False
+        return True
+
+    def split(self, context: Dict) -> Tuple[Dict, Dict]:
+        """
+        Split a context into the durable and the ephemeral part
+        """
+        durable, ephemeral = {}, {}
+        for key, value in context.items():
+            if self.is_durable(key, value):
+                durable[key] = value
+            else:
+                ephemeral[key] = value
+        return durable, ephemeral
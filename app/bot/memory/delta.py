@@ -0,0 +1,192 @@
+"""
+Delta encoding of the conversation history.
+
+Each history document keeps the per-turn fields (user_message, bot_message,
+nlu, date) in full. The fields carried over between turns (context,
+parameters, ...) are stored as a full snapshot every `snapshot_interval`
+turns, and in between only as changes against the previous turn:
+
+    {"delta": {"current_node": {"value": "toppings"},
+               "context": {"set": {"name": "bob"}, "unset": ["timestamp"]}},
+     "turn_id": "...", "base": "<turn_id of the previous turn>"}
+
+Documents without "delta" are snapshots, so histories written before delta
+encoding can be read as is.
+
+The encoder remembers the last turn of each thread it saved in process.
+A delta is only written against the turn the state was loaded from
+(State.previous_turn_id): when another process saved the thread in
+between, or the encoder doesn't know the thread, the turn is a snapshot.
+The decoder applies a delta to its base turn, so turns of two processes
+saved at the same time still rebuild.
+"""
+
+import copy
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Text, Tuple
+from app.bot.memory.models import State
+
+DURABLE_FIELDS = (
+    "context",
+    "intent",
+    "parameters",
+    "extracted_parameters",
+    "missing_parameters",
+    "complete",
+    "current_node",
+)
+
+# dict fields diffed key by key
+KEYED_FIELDS = ("context", "extracted_parameters")
+
+
+def diff(previous: Dict, current: Dict) -> Dict:
+    """
+    Changes of the durable fields from previous to current
+    """
+    delta = {}
+    for field in DURABLE_FIELDS:
+        old, new = previous.get(field), current.get(field)
+        if old == new:
+            continue
+        if field in KEYED_FIELDS and isinstance(old, dict) and isinstance(new, dict):
+            changes = {}
+            updated = {k: v for k, v in new.items() if k not in old or old[k] != v}
+            removed = [k for k in old if k not in new]
+            if updated:
+                changes["set"] = updated
+            if removed:
+                changes["unset"] = removed
+            delta[field] = changes
+        else:
+            delta[field] = {"value": new}
+    return delta
+
+
+def apply(durable: Dict, delta: Dict) -> Dict:
+    """
+    Apply a delta to the durable fields of the previous turn
+    """
+    durable = dict(durable)
+    for field, changes in delta.items():
+        if "value" in changes:
+            durable[field] = changes["value"]
+            continue
+        value = dict(durable.get(field) or {})
+        value.update(changes.get("set", {}))
+        for key in changes.get("unset", []):
+            value.pop(key, None)
+        durable[field] = value
+    return durable
+
+
+def rebuild(documents: Iterable[Dict]) -> List[Dict]:
+    """
+    Rebuild full state documents from history documents, oldest first
+    """
+    decoder = HistoryDecoder()
+    return [decoder.decode(document) for document in documents]
+
+
+class HistoryDecoder:
+    """
+    Rebuilds the history documents of one thread one at a time, oldest
+    first, so that a history can be read in batches.
+    """
+
+    def __init__(self, max_turns: int = 32):
+        self.durable: Dict = {}
+        self.max_turns = max_turns
+        # turn_id -> durable fields of the recent turns, bases of deltas
+        self.turns: "OrderedDict[Text, Dict]" = OrderedDict()
+
+    def decode(self, document: Dict) -> Dict:
+        document = dict(document)
+        delta = document.pop("delta", None)
+        base = document.pop("base", None)
+        if delta is None:
+            self.durable = {field: document.get(field) for field in DURABLE_FIELDS}
+        else:
+            # the previous turn, unless two processes saved the thread
+            self.durable = apply(self.turns.get(base, self.durable), delta)
+            document.update(copy.deepcopy(self.durable))
+
+        turn_id = document.get("turn_id")
+        if turn_id is not None:
+            self.turns[turn_id] = self.durable
+            while len(self.turns) > self.max_turns:
+                self.turns.popitem(last=False)
+        return document
+
+
+class HistoryEncoder:
+    """
+    Turns states into history documents, a snapshot every snapshot_interval
+    turns of a thread and deltas in between. snapshot_interval 0 or 1
+    stores every turn as a snapshot.
+    """
+
+    def __init__(self, snapshot_interval: int = 20, max_threads: int = 10000):
+        self.snapshot_interval = snapshot_interval
+        self.max_threads = max_threads
+        # thread_id -> (durable fields of the last turn, turns since snapshot,
+        # turn_id of the last turn)
+        self.threads: "OrderedDict[Text, Tuple[Dict, int, Optional[Text]]]" = (
+            OrderedDict()
+        )
+
+    def encode(self, state: State) -> Dict:
+        document = state.to_dict()
+        if state.turn_id is not None:
+            document["turn_id"] = state.turn_id
+        # states are mutated by the next turn, keep a copy
+        current = copy.deepcopy(
+            {field: document.pop(field) for field in DURABLE_FIELDS}
+        )
+
+        previous = self.threads.get(state.thread_id)
+        if (
+            previous is not None
+            and previous[1] + 1 < self.snapshot_interval
+            # saved by another process since
+            and previous[2] == state.previous_turn_id
+        ):
+            document["delta"] = diff(previous[0], current)
+            if previous[2] is not None:
+                document["base"] = previous[2]
+            turns = previous[1] + 1
+        else:
+            document.update(current)
+            turns = 0
+
+        self.threads[state.thread_id] = (current, turns, state.turn_id)
+        self.threads.move_to_end(state.thread_id)
+        while len(self.threads) > self.max_threads:
+            self.threads.popitem(last=False)
+        return document
+
+    def forget(self, thread_id: Text):
+        """
+        Start the next turn of the thread with a snapshot
+        """
+        self.threads.pop(thread_id, None)
+
+
+def latest_from_history(documents: Iterable[Dict]) -> Optional[Dict]:
+    """
+    Rebuild the latest state from history documents, newest first.
+    Only reads back to the snapshot the latest turn is based on.
+    """
+    chain = []
+    base = None
+    for document in documents:
+        # skip turns saved at the same time by another process
+        if chain and base is not None and document.get("turn_id") != base:
+            continue
+        chain.append(document)
+        if "delta" not in document:
+            break
+        base = document.get("base")
+    if not chain:
+        return None
+    return rebuild(reversed(chain))[-1]
@@ -0,0 +1,100 @@
+import logging
+from typing import Optional
+from app.bot.memory import MemorySaver
+from app.config import app_config
+from app.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# process-wide memory saver, shared across dialogue manager reloads
+_memory_saver: Optional[MemorySaver] = None
+
+
+def create_memory_saver() -> MemorySaver:
+    """
+    Create the memory saver for the configured backend, optionally
+    behind a write-behind queue and an in-process state cache.
+    """
+    if app_config.STATE_BACKEND == "memory":
+        from app.bot.memory import MemorySaverInMemory
+
+        memory_saver = MemorySaverInMemory(
+            max_history=app_config.STATE_MEMORY_MAX_HISTORY,
+            ttl=app_config.STATE_MEMORY_TTL,
+            max_states=app_config.STATE_MEMORY_MAX_STATES,
+        )
+        register_metrics("state_memory", memory_saver.get_metrics)
+        # already in process, no need for a cache or write-behind queue
+        return memory_saver
+
+    if app_config.STATE_BACKEND == "sqlite":
+        from app.bot.memory.memory_saver_sqlite import MemorySaverSQLite
+
+        memory_saver = MemorySaverSQLite(app_config.STATE_SQLITE_PATH)
+        register_metrics("state_sqlite", memory_saver.get_metrics)
+    elif app_config.USE_POSTGRESQL:
+        from app.bot.memory.memory_saver_postgres import MemorySaverPostgreSQL
+
+        memory_saver = MemorySaverPostgreSQL(
+            snapshot_interval=app_config.STATE_HISTORY_SNAPSHOT_INTERVAL
+        )
+    else:
+        from app.bot.memory.memory_saver_mongo import MemorySaverMongo
+        from app.database import client
+
+        memory_saver = MemorySaverMongo(
+            client,
+            snapshot_interval=app_config.STATE_HISTORY_SNAPSHOT_INTERVAL,
+            fallback_intent_id=app_config.DEFAULT_FALLBACK_INTENT_NAME,
+        )
+
+    if app_config.STATE_WRITE_BEHIND_ENABLED:
+        from app.bot.memory.memory_saver_write_behind import WriteBehindMemorySaver
+
+        memory_saver = WriteBehindMemorySaver(
+            memory_saver,
+            flush_size=app_config.STATE_WRITE_BEHIND_FLUSH_SIZE,
+            flush_interval=app_config.STATE_WRITE_BEHIND_FLUSH_INTERVAL,
+            max_queue_size=app_config.STATE_WRITE_BEHIND_MAX_QUEUE_SIZE,
+        )
+        register_metrics("state_write_behind", memory_saver.get_metrics)
+
+    if app_config.STATE_CACHE_ENABLED:
+        from app.bot.memory.memory_saver_cached import CachedMemorySaver
+
+        memory_saver = CachedMemorySaver(
+            memory_saver,
+            max_size=app_config.STATE_CACHE_MAX_SIZE,
+            ttl=app_config.STATE_CACHE_TTL,
+        )
+        register_metrics("state_cache", memory_saver.get_metrics)
+
+    return memory_saver
+
+
+def get_memory_saver() -> MemorySaver:
+    global _memory_saver
+    if _memory_saver is None:
+        _memory_saver = create_memory_saver()
+        logger.info(f"Using {type(_memory_saver).__name__} for conversation state")
+    return _memory_saver
+
+
+async def init_memory_saver():
+    """
+    Create the memory saver and its indexes, called on application startup.
+    """
+    try:
+        await get_memory_saver().setup()
+    except Exception as e:
+        logger.warning(f"Failed to set up memory saver: {e}")
+
+
+async def close_memory_saver():
+    """
+    Flush pending writes of the memory saver, called on application shutdown.
+    """
+    global _memory_saver
+    if _memory_saver is not None:
+        await _memory_saver.close()
+        _memory_saver = None
@@ -0,0 +1,143 @@
+import asyncio
+import inspect
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Text, Tuple
+from app.bot.memory.models import State
+from app.bot.memory import MemorySaver
+from app.bot.memory.codec import decode_state, encode_state
+
+logger = logging.getLogger(__name__)
+
+
+class CachedMemorySaver(MemorySaver):
+    """
+    Write-through cache of the latest state of each thread in front of
+    another MemorySaver. Active conversations are read from memory, idle ones
+    expire after ttl seconds and the least recently used are evicted beyond
+    max_size. Concurrent misses of a thread share one backend lookup.
+
+    With several app instances, a thread may be served by more than one node
+    and a node would keep serving its copy after another node saved a newer
+    state. Requests of a thread must then be routed to one node, or nodes
+    must drop their copy through invalidate() when notified by the on_save
+    listeners of the others. No cross-node notification is wired up, which
+    is why STATE_CACHE_ENABLED defaults to off.
+    """
+
+    def __init__(
+        self,
+        backend: MemorySaver,
+        max_size: int = 10000,
+        ttl: float = 300,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.backend = backend
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.clock = clock
+        self.entries: "OrderedDict[Text, Tuple[bytes, float]]" = OrderedDict()
+        self.listeners: List[Callable[[Text], Any]] = []
+        # backend lookups in flight, by thread
+        self.loading: Dict[Text, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def setup(self):
+        await self.backend.setup()
+
+    async def init_state(self, thread_id: Text) -> State:
+        return await self.backend.init_state(thread_id)
+
+    async def save(self, thread_id: Text, state: State):
+        try:
+            await self.backend.save(thread_id, state)
+        except Exception:
+            # the backend may or may not have the new state
+            self.invalidate(thread_id)
+            raise
+        self._store(thread_id, state)
+        await self._notify(thread_id)
+
+    async def get(self, thread_id: Text) -> Optional[State]:
+        entry = self.entries.get(thread_id)
+        if entry is not None:
+            snapshot, stored_at = entry
+            if self.clock() - stored_at < self.ttl:
+                self.hits += 1
+                self.entries.move_to_end(thread_id)
+                # callers mutate the state, every hit decodes a new copy
+                return decode_state(snapshot)
+            self.expirations += 1
+            del self.entries[thread_id]
+
+        self.misses += 1
+        loading = self.loading.get(thread_id)
+        if loading is None:
+            loading = asyncio.ensure_future(self._load(thread_id))
+            self.loading[thread_id] = loading
+            loading.add_done_callback(lambda _: self.loading.pop(thread_id, None))
+        # a cancelled caller doesn't cancel the lookup of the others
+        snapshot = await asyncio.shield(loading)
+        return decode_state(snapshot) if snapshot is not None else None
+
+    async def _load(self, thread_id: Text) -> Optional[bytes]:
+        state = await self.backend.get(thread_id)
+        if state is None:
+            return None
+        if thread_id in self.entries:
+            # saved during the lookup, the cached state is newer
+            return self.entries[thread_id][0]
+        return self._store(thread_id, state)
+
+    async def get_all(self, thread_id: Text) -> List[State]:
+        return await self.backend.get_all(thread_id)
+
+    async def close(self):
+        await self.backend.close()
+
+    def invalidate(self, thread_id: Text):
+        self.entries.pop(thread_id, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def on_save(self, listener: Callable[[Text], Any]):
+        """
+        Register a callback (sync or async) called with the thread_id
+        after each save.
+        """
+        self.listeners.append(listener)
+
+    async def _notify(self, thread_id: Text):
+        for listener in self.listeners:
+            try:
+                result = listener(thread_id)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"State cache listener failed: {e}")
+
+    def _store(self, thread_id: Text, state: State) -> bytes:
+        snapshot = encode_state(state, compress=False)
+        self.entries[thread_id] = (snapshot, self.clock())
+        self.entries.move_to_end(thread_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return snapshot
+
+    def get_metrics(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
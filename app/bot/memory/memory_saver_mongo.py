@@ -1,34 +1,283 @@
+import functools
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Text, Optional, List
+from bson import Binary, ObjectId
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import Awaitable, Callable, Dict, Text, Optional, List, Tuple
 from app.bot.memory.models import State
 from app.bot.memory import MemorySaver
+from app.bot.memory.archiver import MongoHistoryArchiver
+from app.bot.memory.codec import decode_state, encode_state
+from app.bot.memory.delta import HistoryEncoder, latest_from_history, rebuild
+
+# fields not needed to continue the conversation
+STATE_PROJECTION = {
+    "_id": 0,
+    "nlu": 0,
+    "date": 0,
+    "user_message": 0,
+    "bot_message": 0,
+}
+
+DUPLICATE_KEY = 11000
+
+
+def _only_duplicates(error: BulkWriteError) -> bool:
+    """
+    Whether a bulk write only failed on documents that already exist
+    """
+    details = error.details
+    return not details.get("writeConcernErrors") and all(
+        e["code"] == DUPLICATE_KEY for e in details.get("writeErrors", [])
+    )
 
 
 class MemorySaverMongo(MemorySaver):
     """
     MemorySaverMongo implements the MemorySaver interface for MongoDB.
+
+    Every turn is appended to the `state` collection (the chat logs),
+    delta encoded against the previous turn, and the latest state of each
+    thread is upserted into `latest_state`, encoded with the compact state
+    codec, which serves the per-turn lookup. A per-thread summary
+    (first/last date, turn and fallback counts, last intent) is kept up to
+    date in `thread_summary` for the chat log listing.
+
+    The writes of a batch are idempotent so that a retry can't duplicate
+    them: history documents get their _id before the first attempt, and a
+    summary records the last turn added to it.
     """
 
-    def __init__(self, client: AsyncIOMotorClient):
+    def __init__(
+        self,
+        client: AsyncIOMotorClient,
+        snapshot_interval: int = 20,
+        fallback_intent_id: Text = "fallback",
+    ):
         self.client = client
         self.db = client.get_database("chatbot")
         self.collection = self.db.get_collection("state")
+        self.latest_collection = self.db.get_collection("latest_state")
+        self.summary_collection = self.db.get_collection("thread_summary")
+        self.fallback_intent_id = fallback_intent_id
+        self.history_encoder = HistoryEncoder(snapshot_interval)
+        self.archiver = MongoHistoryArchiver(self.db)
+
+    async def setup(self):
+        await self.latest_collection.create_index(
+            [("thread_id", ASCENDING)], unique=True
+        )
+        await self.collection.create_index(
+            [("thread_id", ASCENDING), ("date", ASCENDING)]
+        )
+        await self.collection.create_index([("date", DESCENDING)])
+        await self.summary_collection.create_index(
+            [("thread_id", ASCENDING)], unique=True
+        )
+        await self.summary_collection.create_index(
+            [("last_date", DESCENDING), ("thread_id", DESCENDING)]
+        )
+
+    @staticmethod
+    def _latest_document(state: State) -> dict:
+        return {
+            "thread_id": state.thread_id,
+            "state": Binary(encode_state(state)),
+            "date": state.date,
+        }
+
+    def _summarize(self, turns: List[Dict]) -> Dict:
+        """
+        Summary of turns of a thread ({"intent", "date"}), oldest first
+        """
+        intents = [(turn.get("intent") or {}).get("id") for turn in turns]
+        return {
+            "first_date": turns[0]["date"],
+            "last_date": turns[-1]["date"],
+            "last_intent": intents[-1],
+            "turn_count": len(turns),
+            "fallback_count": intents.count(self.fallback_intent_id),
+        }
+
+    def _summary_update(
+        self, states: List[State], last_id: ObjectId, upsert: bool = True
+    ) -> UpdateOne:
+        """
+        Add new turns of a thread, oldest first, to its summary. last_id is
+        the history _id of the last turn: once added, the filter no longer
+        matches and the upsert fails on the unique thread_id instead.
+        """
+        summary = self._summarize(
+            [{"intent": state.intent, "date": state.date} for state in states]
+        )
+        return UpdateOne(
+            {"thread_id": states[0].thread_id, "last_id": {"$ne": last_id}},
+            {
+                "$min": {"first_date": summary["first_date"]},
+                "$max": {"last_date": summary["last_date"]},
+                "$set": {
+                    "last_intent": summary["last_intent"],
+                    "last_id": last_id,
+                    "archived": False,
+                },
+                "$inc": {
+                    "turn_count": summary["turn_count"],
+                    "fallback_count": summary["fallback_count"],
+                },
+            },
+            upsert=upsert,
+        )
+
+    def _history_document(self, state: State) -> Dict:
+        document = self.history_encoder.encode(state)
+        document["_id"] = ObjectId()
+        return document
+
+    async def _update_summaries(self, updates: List[Tuple[List[State], ObjectId]]):
+        try:
+            await self.summary_collection.bulk_write(
+                [self._summary_update(*update) for update in updates], ordered=False
+            )
+        except BulkWriteError as e:
+            if not _only_duplicates(e):
+                raise
+            # the turns were added already by a retried write, or another
+            # process created the summary at the same time: add them without
+            # upserting, a no-op in the first case
+            await self.summary_collection.bulk_write(
+                [
+                    self._summary_update(*updates[error["index"]], upsert=False)
+                    for error in e.details["writeErrors"]
+                ],
+                ordered=False,
+            )
 
     async def save(self, thread_id: Text, state: State):
-        await self.collection.insert_one(state.to_dict())
+        document = self._history_document(state)
+        try:
+            await self.collection.insert_one(document)
+        except Exception:
+            # the next turn can't be a delta against a missing turn
+            self.history_encoder.forget(thread_id)
+            raise
+        await self.latest_collection.replace_one(
+            {"thread_id": thread_id}, self._latest_document(state), upsert=True
+        )
+        await self._update_summaries([([state], document["_id"])])
+
+    async def _insert_history(self, documents: List[Dict]):
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except Exception as e:
+            # inserted by an attempt whose reply was lost
+            if isinstance(e, BulkWriteError) and _only_duplicates(e):
+                return
+            for document in documents:
+                self.history_encoder.forget(document["thread_id"])
+            raise
+
+    async def _replace_latest(self, requests: List[ReplaceOne]):
+        await self.latest_collection.bulk_write(requests, ordered=False)
+
+    def batch_writes(self, states: List[State]) -> List[Callable[[], Awaitable]]:
+        """
+        History, latest state and summary writes of a batch, encoded once
+        so that retries write the same documents
+        """
+        if not states:
+            return []
+        documents = [self._history_document(state) for state in states]
+
+        # only the last state of each thread in the batch is the latest
+        latest = {state.thread_id: state for state in states}
+        last_ids = {document["thread_id"]: document["_id"] for document in documents}
+        threads: Dict[Text, List[State]] = {}
+        for state in states:
+            threads.setdefault(state.thread_id, []).append(state)
+
+        return [
+            functools.partial(self._insert_history, documents),
+            functools.partial(
+                self._replace_latest,
+                [
+                    ReplaceOne(
+                        {"thread_id": thread_id},
+                        self._latest_document(state),
+                        upsert=True,
+                    )
+                    for thread_id, state in latest.items()
+                ],
+            ),
+            functools.partial(
+                self._update_summaries,
+                [
+                    (thread, last_ids[thread_id])
+                    for thread_id, thread in threads.items()
+                ],
+            ),
+        ]
+
+    async def save_many(self, states: List[State]):
+        for write in self.batch_writes(states):
+            await write()
 
     async def get(self, thread_id: Text) -> Optional[State]:
-        result = await self.collection.find_one(
-            {"thread_id": thread_id},
-            {"_id": 0, "nlu": 0, "date": 0, "user_message": 0, "bot_message": 0},
-            sort=[("$natural", -1)],
+        result = await self.latest_collection.find_one(
+            {"thread_id": thread_id}, {"_id": 0, "state": 1}
         )
+        if result:
+            return decode_state(result["state"])
+
+        # threads saved before latest_state existed
+        # the last snapshot is within the last snapshot_interval turns
+        documents = await self.collection.find(
+            {"thread_id": thread_id},
+            STATE_PROJECTION,
+            sort=[("date", DESCENDING)],
+            limit=max(1, self.history_encoder.snapshot_interval),
+        ).to_list()
+        result = latest_from_history(documents)
         if result:
             return State.from_dict(result)
         return None
 
     async def get_all(self, thread_id: Text) -> List[State]:
-        results = await self.collection.find(
-            {"thread_id": thread_id}, sort=[("$natural", -1)]
+        results = await self.archiver.read_archived(thread_id)
+        results += await self.collection.find(
+            {"thread_id": thread_id}, sort=[("date", ASCENDING)]
         ).to_list()
-        return [State.from_dict(result) for result in results]
+        return [State.from_dict(result) for result in reversed(rebuild(results))]
+
+    async def backfill_thread_summary(self, batch_size: int = 500) -> int:
+        """
+        Rebuild the thread summaries from the full history, including
+        archived turns. Meant to run from manage.py migrate while no
+        conversations are saved.
+        Returns the number of threads summarized.
+        """
+        thread_ids = set()
+        for collection in (self.collection, self.archiver.archive_collection):
+            async for document in collection.aggregate(
+                [{"$group": {"_id": "$thread_id"}}]
+            ):
+                thread_ids.add(document["_id"])
+
+        requests = []
+        for thread_id in thread_ids:
+            archived = await self.archiver.read_archived(thread_id)
+            live = await self.collection.find(
+                {"thread_id": thread_id}, sort=[("date", ASCENDING)]
+            ).to_list()
+            if not archived and not live:
+                continue
+            summary = self._summarize(rebuild(archived + live))
+            summary["archived"] = not live
+            requests.append(
+                UpdateOne({"thread_id": thread_id}, {"$set": summary}, upsert=True)
+            )
+            if len(requests) >= batch_size:
+                await self.summary_collection.bulk_write(requests, ordered=False)
+                requests = []
+        if requests:
+            await self.summary_collection.bulk_write(requests, ordered=False)
+        return len(thread_ids)
@@ -1,45 +1,113 @@
 from typing import Text, Optional, List
-import json
 from app.bot.memory.models import State
 from app.bot.memory import MemorySaver
-from app.database_postgres import postgres_db
+from app.bot.memory.archiver import PostgresHistoryArchiver
+from app.bot.memory.codec import decode_state, encode_state
+from app.bot.memory.delta import HistoryEncoder, latest_from_history, rebuild
+from app.database_postgres import create_tables, postgres_db
 
 
 class MemorySaverPostgreSQL(MemorySaver):
     """
     MemorySaverPostgreSQL implements the MemorySaver interface for PostgreSQL/Supabase.
+
+    Every turn is appended to chat_states, delta encoded against the previous
+    turn, and the latest state of each thread
+    is upserted into chat_state_latest, encoded with the compact state codec,
+    which serves the per-turn lookup. History is passed as dicts, the pool
+    encodes jsonb with orjson.
     """
 
-    def __init__(self):
+    def __init__(self, snapshot_interval: int = 20):
         self.db = postgres_db
+        self.history_encoder = HistoryEncoder(snapshot_interval)
+        self.archiver = PostgresHistoryArchiver(postgres_db)
+
+    async def setup(self):
+        await create_tables()
 
     async def save(self, thread_id: Text, state: State):
         """Save conversation state to PostgreSQL"""
-        state_dict = state.to_dict()
-        
         query = '''
-            INSERT INTO chat_states (thread_id, state_data)
-            VALUES ($1, $2)
+            WITH history AS (
+                INSERT INTO chat_states (thread_id, state_data)
+                VALUES ($1, $2)
+            )
+            INSERT INTO chat_state_latest (thread_id, state_bytes, updated_at)
+            VALUES ($1, $3, CURRENT_TIMESTAMP)
+            ON CONFLICT (thread_id) DO UPDATE
+            SET state_bytes = EXCLUDED.state_bytes, updated_at = EXCLUDED.updated_at,
+                archived = FALSE
         '''
-        
-        await self.db.execute(query, thread_id, json.dumps(state_dict))
+
+        try:
+            await self.db.execute(
+                query,
+                thread_id,
+                self.history_encoder.encode(state),
+                encode_state(state),
+            )
+        except Exception:
+            # the next turn can't be a delta against a missing turn
+            self.history_encoder.forget(thread_id)
+            raise
+
+    async def save_many(self, states: List[State]):
+        """Save several conversation states with a single multi-row INSERT"""
+        if not states:
+            return
+
+        query = '''
+            WITH batch AS (
+                SELECT * FROM unnest($1::varchar[], $2::jsonb[], $3::bytea[])
+                WITH ORDINALITY AS t(thread_id, state_data, state_bytes, seq)
+            ), history AS (
+                INSERT INTO chat_states (thread_id, state_data)
+                SELECT thread_id, state_data FROM batch ORDER BY seq
+            )
+            INSERT INTO chat_state_latest (thread_id, state_bytes, updated_at)
+            SELECT DISTINCT ON (thread_id) thread_id, state_bytes, CURRENT_TIMESTAMP
+            FROM batch ORDER BY thread_id, seq DESC
+            ON CONFLICT (thread_id) DO UPDATE
+            SET state_bytes = EXCLUDED.state_bytes, updated_at = EXCLUDED.updated_at,
+                archived = FALSE
+        '''
+
+        try:
+            await self.db.execute(
+                query,
+                [state.thread_id for state in states],
+                [self.history_encoder.encode(state) for state in states],
+                [encode_state(state) for state in states],
+            )
+        except Exception:
+            for state in states:
+                self.history_encoder.forget(state.thread_id)
+            raise
 
     async def get(self, thread_id: Text) -> Optional[State]:
         """Get the latest conversation state for a thread"""
+        state_bytes = await self.db.fetchval(
+            'SELECT state_bytes FROM chat_state_latest WHERE thread_id = $1',
+            thread_id,
+        )
+        if state_bytes is not None:
+            return decode_state(state_bytes)
+
+        # threads saved before chat_state_latest existed,
+        # the last snapshot is within the last snapshot_interval turns
         query = '''
-            SELECT state_data FROM chat_states 
-            WHERE thread_id = $1 
-            ORDER BY created_at DESC 
-            LIMIT 1
+            SELECT state_data FROM chat_states
+            WHERE thread_id = $1
+            ORDER BY created_at DESC, id DESC
+            LIMIT $2
         '''
-        
-        result = await self.db.fetchval(query, thread_id)
-        
-        if result:
-            if isinstance(result, str):
-                state_data = json.loads(result)
-            else:
-                state_data = result
+        rows = await self.db.fetch(
+            query, thread_id, max(1, self.history_encoder.snapshot_interval)
+        )
+        state_data = latest_from_history(row['state_data'] for row in rows)
+
+        if state_data:
             return State.from_dict(state_data)
         return None
 
@@ -48,21 +116,23 @@ class MemorySaverPostgreSQL(MemorySaver):
         query = '''
             SELECT state_data FROM chat_states 
             WHERE thread_id = $1 
-            ORDER BY created_at DESC
+            ORDER BY created_at, id
         '''
         
         results = await self.db.fetch(query, thread_id)
-        
-        states = []
-        for row in results:
-            state_data = row['state_data']
-            if isinstance(state_data, str):
-                state_data = json.loads(state_data)
-            states.append(State.from_dict(state_data))
-        
-        return states
+        archived = await self.archiver.read_archived(thread_id)
+        states = rebuild(archived + [row['state_data'] for row in results])
+
+        return [State.from_dict(state_data) for state_data in reversed(states)]
 
     async def clear(self, thread_id: Text):
         """Clear all states for a thread"""
-        query = 'DELETE FROM chat_states WHERE thread_id = $1'
-        await self.db.execute(query, thread_id)
\ No newline at end of file
+        await self.db.execute(
+            'DELETE FROM chat_states WHERE thread_id = $1', thread_id
+        )
+        await self.db.execute(
+            'DELETE FROM chat_state_latest WHERE thread_id = $1', thread_id
+        )
+        await self.db.execute(
+            'DELETE FROM chat_states_archive WHERE thread_id = $1', thread_id
+        )
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Text, Tuple
+import orjson
+from app.bot.memory.models import State
+from app.bot.memory import MemorySaver
+from app.bot.memory.codec import decode_state, encode_state
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state_latest (
+    thread_id TEXT PRIMARY KEY,
+    state BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state_history (
+    id INTEGER PRIMARY KEY,
+    thread_id TEXT NOT NULL,
+    state BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS state_history_thread_id_idx
+ON state_history (thread_id, id);
+"""
+
+# stops the writer thread
+_STOP = object()
+
+
+def _connect(path: Text) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # in WAL mode commits are durable across crashes of the app,
+    # fsync happens on checkpoints
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA busy_timeout=5000")
+    return connection
+
+
+class MemorySaverSQLite(MemorySaver):
+    """
+    MemorySaverSQLite keeps conversation state in an embedded SQLite database
+    in WAL mode, for deployments without MongoDB or PostgreSQL.
+
+    A dedicated writer thread commits all saves waiting in its queue in one
+    transaction (group commit), so concurrent turns share a commit.
+    Reads run on their own thread and connection, WAL lets them proceed
+    while the writer commits.
+    """
+
+    def __init__(self, path: Text = "state.db", max_batch_size: int = 500):
+        self.path = path
+        self.max_batch_size = max_batch_size
+
+        connection = _connect(path)
+        connection.executescript(SCHEMA)
+        connection.close()
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="sqlite-state-writer", daemon=True
+        )
+        self._writer.start()
+
+        self._reader_local = threading.local()
+        self._reader = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="sqlite-state-reader"
+        )
+
+        self.writes = 0
+        self.commits = 0
+
+    async def save(self, thread_id: Text, state: State):
+        await self.save_many([state])
+
+    async def save_many(self, states: List[State]):
+        if not states:
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        rows = [
+            (
+                state.thread_id,
+                orjson.dumps(state.to_dict(), default=str),
+                encode_state(state),
+            )
+            for state in states
+        ]
+        self._queue.put((rows, loop, future))
+        await future
+
+    async def get(self, thread_id: Text) -> Optional[State]:
+        row = await self._read(
+            "SELECT state FROM state_latest WHERE thread_id = ?", thread_id, one=True
+        )
+        return decode_state(row[0]) if row else None
+
+    async def get_all(self, thread_id: Text) -> List[State]:
+        rows = await self._read(
+            "SELECT state FROM state_history WHERE thread_id = ? ORDER BY id DESC",
+            thread_id,
+        )
+        return [State.from_dict(orjson.loads(row[0])) for row in rows]
+
+    async def _read(self, query: Text, *args, one: bool = False):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._reader, self._execute_read, query, args, one
+        )
+
+    def _execute_read(self, query: Text, args: Tuple, one: bool):
+        connection = getattr(self._reader_local, "connection", None)
+        if connection is None:
+            connection = self._reader_local.connection = _connect(self.path)
+        cursor = connection.execute(query, args)
+        return cursor.fetchone() if one else cursor.fetchall()
+
+    def _write_loop(self):
+        connection = _connect(self.path)
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                batch = [item]
+                # take everything queued while the last commit was running
+                while len(batch) < self.max_batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        self._queue.put(_STOP)
+                        break
+                    batch.append(item)
+                self._commit(connection, batch)
+        finally:
+            connection.close()
+
+    def _commit(self, connection: sqlite3.Connection, batch: List):
+        rows = [row for rows, _, _ in batch for row in rows]
+        error = self._write(connection, rows)
+        if error is None or len(batch) == 1:
+            errors = [error] * len(batch)
+        else:
+            # one bad row rolls back the whole group,
+            # retry each save in its own transaction
+            errors = [self._write(connection, rows) for rows, _, _ in batch]
+
+        for (_, loop, future), error in zip(batch, errors):
+            loop.call_soon_threadsafe(_resolve, future, error)
+
+    def _write(self, connection: sqlite3.Connection, rows: List) -> Optional[Exception]:
+        now = time.time()
+        try:
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT INTO state_history (thread_id, state, created_at)"
+                " VALUES (?, ?, ?)",
+                [(thread_id, history, now) for thread_id, history, _ in rows],
+            )
+            connection.executemany(
+                "INSERT INTO state_latest (thread_id, state, updated_at)"
+                " VALUES (?, ?, ?) ON CONFLICT (thread_id) DO UPDATE"
+                " SET state = excluded.state, updated_at = excluded.updated_at",
+                [(thread_id, latest, now) for thread_id, _, latest in rows],
+            )
+            connection.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} states: {e}")
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            return e
+        self.writes += len(rows)
+        self.commits += 1
+        return None
+
+    def _close_reader(self):
+        connection = getattr(self._reader_local, "connection", None)
+        if connection is not None:
+            connection.close()
+
+    async def close(self):
+        if not self._writer.is_alive():
+            return
+        self._queue.put(_STOP)
+        await asyncio.to_thread(self._writer.join)
+        await asyncio.get_running_loop().run_in_executor(
+            self._reader, self._close_reader
+        )
+        self._reader.shutdown(wait=True)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "writes": self.writes,
+            "commits": self.commits,
+            "states_per_commit": self.writes / self.commits if self.commits else 0.0,
+        }
+
+
+def _resolve(future: asyncio.Future, error: Optional[Exception]):
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
@@ -0,0 +1,185 @@
+import asyncio
+import copy
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Text
+from app.bot.memory.models import State
+from app.bot.memory import MemorySaver
+
+logger = logging.getLogger(__name__)
+
+# queued to write out the current batch without waiting for flush_interval
+_FLUSH = object()
+
+
+class WriteBehindMemorySaver(MemorySaver):
+    """
+    Queues saved states and writes them to another MemorySaver in batches
+    from a background task, so that a turn doesn't wait for the database.
+
+    A batch is flushed when flush_size states are queued or flush_interval
+    seconds after its first state. The queue is bounded: once max_queue_size
+    states are waiting, save() waits for the writer to catch up.
+    States not yet written are served by get() and get_all().
+    A failed write is retried max_retries times, step by step (see
+    MemorySaver.batch_writes), before the batch is dropped from the history.
+    Dropped states stay pending until a later turn of their thread is
+    written, so that the conversation doesn't go back to an older state.
+
+    Pending states are only visible to this process, use it with a single
+    instance or with sticky routing of each thread to one instance.
+    """
+
+    def __init__(
+        self,
+        backend: MemorySaver,
+        flush_size: int = 100,
+        flush_interval: float = 0.5,
+        max_queue_size: int = 10000,
+        max_retries: int = 3,
+    ):
+        self.backend = backend
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        # states of each thread since its last written state, oldest first
+        self.pending: Dict[Text, List[State]] = {}
+
+        self.flushed = 0
+        self.batches = 0
+        self.dropped = 0
+
+    async def setup(self):
+        await self.backend.setup()
+
+    async def init_state(self, thread_id: Text) -> State:
+        return await self.backend.init_state(thread_id)
+
+    async def save(self, thread_id: Text, state: State):
+        if self._writer is None or self._writer.done():
+            self._queue = self._queue or asyncio.Queue(self.max_queue_size)
+            self._writer = asyncio.create_task(self._write_loop())
+
+        # the caller keeps using the state object after the turn
+        snapshot = copy.deepcopy(state)
+        self.pending.setdefault(thread_id, []).append(snapshot)
+        await self._queue.put(snapshot)
+
+    async def get(self, thread_id: Text) -> Optional[State]:
+        pending = self.pending.get(thread_id)
+        if pending:
+            return copy.deepcopy(pending[-1])
+        return await self.backend.get(thread_id)
+
+    async def get_all(self, thread_id: Text) -> List[State]:
+        # newest first, like the backends
+        pending = [copy.deepcopy(state) for state in self.pending.get(thread_id, [])]
+        return pending[::-1] + await self.backend.get_all(thread_id)
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = []
+            flush_at = None
+            flush_requested = False
+            while len(batch) < self.flush_size:
+                timeout = None if flush_at is None else flush_at - loop.time()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _FLUSH:
+                    flush_requested = True
+                    break
+                batch.append(item)
+                if flush_at is None:
+                    flush_at = loop.time() + self.flush_interval
+
+            if batch:
+                await self._flush(batch)
+            if flush_requested:
+                self._queue.task_done()
+
+    async def _write(self, write: Callable[[], Awaitable], size: int) -> bool:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await write()
+                return True
+            except Exception as e:
+                logger.warning(f"Failed to write {size} states: {e}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(0.1 * 2**attempt)
+        return False
+
+    async def _flush(self, batch: List[State]):
+        written = False
+        try:
+            # a retry only redoes the step that failed
+            for write in self.backend.batch_writes(batch):
+                if not await self._write(write, len(batch)):
+                    break
+            else:
+                written = True
+        except Exception as e:
+            logger.warning(f"Failed to write {len(batch)} states: {e}")
+
+        if written:
+            self.flushed += len(batch)
+            self.batches += 1
+            self._written(batch)
+        else:
+            logger.error(f"Dropping {len(batch)} states from the history")
+            self.dropped += len(batch)
+
+        for _ in batch:
+            self._queue.task_done()
+
+    def _written(self, batch: List[State]):
+        """
+        Forget the pending states up to the last written state of each
+        thread, dropped states before it included
+        """
+        last = {state.thread_id: state for state in batch}
+        for thread_id, state in last.items():
+            pending = self.pending.get(thread_id, [])
+            index = next(
+                (i for i, queued in enumerate(pending) if queued is state), None
+            )
+            if index is None:
+                continue
+            del pending[: index + 1]
+            if not pending:
+                del self.pending[thread_id]
+
+    async def flush(self):
+        """
+        Wait until all queued states are written
+        """
+        if self._writer is not None and not self._writer.done():
+            await self._queue.put(_FLUSH)
+            await self._queue.join()
+
+    async def close(self):
+        await self.flush()
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        await self.backend.close()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "pending_threads": len(self.pending),
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "dropped": self.dropped,
+        }
@@ -1,9 +1,29 @@
+import uuid
 from typing import Optional, Dict, List, Any, Text
 from datetime import datetime, UTC
 from app.bot.dialogue_manager.models import UserMessage
+from app.bot.memory.context_policy import ContextPolicy
 
 
 class State:
+    __slots__ = (
+        "thread_id",
+        "user_message",
+        "bot_message",
+        "nlu",
+        "context",
+        "intent",
+        "parameters",
+        "extracted_parameters",
+        "missing_parameters",
+        "complete",
+        "current_node",
+        "date",
+        "ephemeral_context",
+        "turn_id",
+        "previous_turn_id",
+    )
+
     def __init__(
         self,
         thread_id: Text,
@@ -30,6 +50,21 @@ class State:
         self.complete = complete
         self.current_node = current_node
         self.date = date or datetime.now(UTC)
+        # context of the current message only, not persisted
+        self.ephemeral_context = {}
+        # set by update(), the history delta of a turn is encoded
+        # against the turn its state was loaded from
+        self.turn_id: Optional[Text] = None
+        self.previous_turn_id: Optional[Text] = None
+
+    @property
+    def turn_context(self) -> Dict:
+        """
+        Context available to the current turn (durable and ephemeral)
+        """
+        if not self.ephemeral_context:
+            return self.context
+        return {**self.context, **self.ephemeral_context}
 
     def to_dict(self) -> Dict:
         return {
@@ -50,7 +85,7 @@ class State:
     @classmethod
     def from_dict(cls, state_dict: Dict) -> "State":
         # parse all the fields
-        return cls(
+        state = cls(
             thread_id=state_dict["thread_id"],
             context=state_dict["context"],
             intent=state_dict["intent"],
@@ -60,11 +95,23 @@ class State:
             complete=state_dict["complete"],
             current_node=state_dict["current_node"],
         )
+        state.turn_id = state_dict.get("turn_id")
+        return state
 
-    def update(self, user_message: UserMessage):
+    def update(
+        self, user_message: UserMessage, context_policy: Optional[ContextPolicy] = None
+    ):
         self.user_message = user_message
         self.date = datetime.now(UTC)
-        self.context.update(user_message.context)
+        self.previous_turn_id, self.turn_id = self.turn_id, uuid.uuid4().hex
+        if context_policy is None:
+            self.context.update(user_message.context)
+            self.ephemeral_context = {}
+        else:
+            # also compacts keys persisted before the policy changed
+            self.context, self.ephemeral_context = context_policy.split(
+                {**self.context, **user_message.context}
+            )
 
         if self.complete:
             self.bot_message = []
@@ -1,5 +1,6 @@
 import pycrfsuite
 import logging
+import threading
 from typing import Dict, Any, List
 from app.bot.nlu.pipeline import NLUComponent
 import os
@@ -15,6 +16,9 @@ class CRFEntityExtractor(NLUComponent):
 
     def __init__(self):
         self.tagger = None
+        # crfsuite taggers keep per-call state, messages may be
+        # processed from several worker threads
+        self.tagger_lock = threading.Lock()
 
     def extract_features(self, sent, i):
         """
@@ -163,7 +167,9 @@ class CRFEntityExtractor(NLUComponent):
         spacy_doc = message.get("spacy_doc")
         tagged_token = self.pos_tagger(spacy_doc)
         words = [token.text for token in spacy_doc]
-        predicted_labels = self.tagger.tag(self.sent_to_features(tagged_token))
+        features = self.sent_to_features(tagged_token)
+        with self.tagger_lock:
+            predicted_labels = self.tagger.tag(features)
         return self.crf2json(zip(words, predicted_labels))
 
     def pos_tagger(self, spacy_doc):
@@ -1,3 +1,4 @@
 from .zero_shot_nlu_openai import ZeroShotNLUOpenAI
+from .llm_fallback import LLMFallbackClassifier
 
-__all__ = ["ZeroShotNLUOpenAI"]
+__all__ = ["ZeroShotNLUOpenAI", "LLMFallbackClassifier"]
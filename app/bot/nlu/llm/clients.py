@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Tuple
+import httpx
+from jinja2 import Environment, FileSystemLoader, Template
+from langchain_openai import ChatOpenAI
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = os.path.join(os.path.dirname(__file__), "prompts")
+
+# connection pool settings shared by all LLM clients
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 60.0
+REQUEST_TIMEOUT = 60.0
+
+# clients kept for the most recently used settings, older ones are
+# dropped (and their connections closed) when bot settings change
+MAX_HTTP_CLIENTS = 8
+MAX_CHAT_MODELS = 32
+
+# process-wide registries, reused across pipeline reloads, least recently
+# used first
+_lock = threading.Lock()
+_http_clients: "OrderedDict[str, httpx.Client]" = OrderedDict()
+_chat_models: "OrderedDict[Tuple, ChatOpenAI]" = OrderedDict()
+
+# templates are compiled once and cached by the environment
+_prompt_env = Environment(loader=FileSystemLoader(PROMPTS_DIR), auto_reload=False)
+
+
+def get_prompt_template(name: str) -> Template:
+    """
+    Get a compiled prompt template by file name.
+    """
+    return _prompt_env.get_template(name)
+
+
+def _get_http_client(base_url: str) -> httpx.Client:
+    # the key and model are sent per request, the pool only depends on the host
+    http_client = _http_clients.get(base_url)
+    if http_client is None or http_client.is_closed:
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            timeout=REQUEST_TIMEOUT,
+        )
+        _http_clients[base_url] = http_client
+    _http_clients.move_to_end(base_url)
+    while len(_http_clients) > MAX_HTTP_CLIENTS:
+        _, evicted = _http_clients.popitem(last=False)
+        evicted.close()
+    return http_client
+
+
+def get_chat_model(
+    base_url: str,
+    api_key: str,
+    model_name: str,
+    temperature: float,
+    max_tokens: int,
+) -> ChatOpenAI:
+    """
+    Get a shared chat model client. Clients for the same base_url share one
+    pooled keep-alive HTTP client, so warm connections survive pipeline
+    reloads.
+    """
+    key = (base_url, model_name, api_key, temperature, max_tokens)
+    with _lock:
+        chat_model = _chat_models.get(key)
+        # its HTTP client was evicted
+        if chat_model is None or chat_model.http_client.is_closed:
+            logger.info(f"Creating LLM client for {base_url} ({model_name})")
+            chat_model = ChatOpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                model_name=model_name,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                http_client=_get_http_client(base_url),
+            )
+            _chat_models[key] = chat_model
+        _chat_models.move_to_end(key)
+        while len(_chat_models) > MAX_CHAT_MODELS:
+            _chat_models.popitem(last=False)
+        return chat_model
+
+
+def close_llm_clients():
+    """
+    Close all pooled HTTP connections, called on application shutdown.
+    """
+    with _lock:
+        for http_client in _http_clients.values():
+            http_client.close()
+        _http_clients.clear()
+        _chat_models.clear()
@@ -0,0 +1,52 @@
+from typing import Dict, List
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+class IntentRetriever:
+    """
+    In-memory vector index over intent descriptions and training examples.
+    Used to select the top-K candidate intents for a user message so that
+    only those are rendered into the LLM prompt.
+    """
+
+    def __init__(self, intent_documents: Dict[str, List[str]]):
+        """
+        Args:
+            intent_documents (Dict[str, List[str]]): intent id to the texts
+                describing it (name, training examples etc.)
+        """
+        self.intent_ids = list(intent_documents.keys())
+
+        texts = []
+        rows = []
+        for idx, intent_id in enumerate(self.intent_ids):
+            for text in [intent_id] + intent_documents[intent_id]:
+                if text and text.strip():
+                    texts.append(text)
+                    rows.append(idx)
+        self.rows = np.array(rows)
+
+        # character n-grams are robust to typos and inflections
+        self.vectorizer = TfidfVectorizer(
+            analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True
+        )
+        self.index = self.vectorizer.fit_transform(texts)
+
+    def search(self, text: str, top_k: int) -> List[str]:
+        """
+        Return the ids of the top_k intents closest to the given text
+        """
+        if top_k >= len(self.intent_ids):
+            return list(self.intent_ids)
+
+        query = self.vectorizer.transform([text])
+        # tf-idf vectors are l2 normalized, dot product is the cosine similarity
+        similarities = (self.index @ query.T).toarray().ravel()
+
+        # score each intent by its closest example
+        scores = np.zeros(len(self.intent_ids))
+        np.maximum.at(scores, self.rows, similarities)
+
+        top = np.argsort(-scores, kind="stable")[:top_k]
+        return [self.intent_ids[i] for i in top]
@@ -0,0 +1,88 @@
+import logging
+import threading
+from typing import Any, Dict, List
+from app.bot.nlu.pipeline import NLUComponent
+
+logger = logging.getLogger(__name__)
+
+
+class LLMFallbackClassifier(NLUComponent):
+    """
+    Confidence-gated cascade component. Placed after a traditional intent
+    classifier, it keeps predictions at or above the confidence threshold and
+    escalates only low-confidence messages to the wrapped LLM component.
+    """
+
+    def __init__(self, llm_component: NLUComponent, confidence_threshold: float):
+        """
+        Args:
+            llm_component (NLUComponent): LLM component used for escalated messages.
+            confidence_threshold (float): Minimum confidence of the traditional
+                classifier to skip escalation.
+        """
+        self.llm_component = llm_component
+        self.confidence_threshold = confidence_threshold
+
+        self._lock = threading.Lock()
+        self.total_messages = 0
+        self.escalated_messages = 0
+
+    def train(self, training_data: List[Dict[str, Any]], model_path: str) -> None:
+        self.llm_component.train(training_data, model_path)
+
+    def load(self, model_path: str) -> bool:
+        return self.llm_component.load(model_path)
+
+    def should_escalate(self, message: Dict[str, Any]) -> bool:
+        # explicit intent commands are resolved by the dialogue manager
+        if message["text"].startswith("/"):
+            return False
+
+        intent = message.get("intent") or {}
+        if not intent.get("intent"):
+            return True
+        return intent.get("confidence", 0.0) < self.confidence_threshold
+
+    def process(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Escalate the message to the LLM component if the traditional
+        classifier is not confident enough.
+        """
+        if not message.get("text"):
+            return message
+
+        escalate = self.should_escalate(message)
+        with self._lock:
+            self.total_messages += 1
+            if escalate:
+                self.escalated_messages += 1
+
+        if not escalate:
+            return message
+
+        logger.debug(f"Escalating message to LLM: {message.get('intent')}")
+        llm_result = self.llm_component.process({"text": message["text"]})
+
+        llm_intent = llm_result.get("intent") or {}
+        if not llm_intent.get("intent"):
+            # keep the traditional prediction, dialogue manager will fallback
+            return message
+
+        message["intent"] = llm_intent
+        message["intent_ranking"] = llm_result.get("intent_ranking", [])
+        message["entities"] = {
+            **(message.get("entities") or {}),
+            **(llm_result.get("entities") or {}),
+        }
+        return message
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.total_messages
+            escalated = self.escalated_messages
+        return {
+            "total_messages": total,
+            "escalated_messages": escalated,
+            "escalation_rate": escalated / total if total else 0.0,
+            "confidence_threshold": self.confidence_threshold,
+        }
@@ -1,10 +1,12 @@
+import json
 import logging
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 from app.bot.nlu.pipeline import NLUComponent
-from langchain_openai import ChatOpenAI
+from app.bot.nlu.llm.intent_retriever import IntentRetriever
+from app.bot.nlu.llm.clients import get_chat_model, get_prompt_template
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
-from jinja2 import Environment, FileSystemLoader
 
 logger = logging.getLogger(__name__)
 
@@ -15,26 +17,53 @@ class ZeroShotNLUOpenAI(NLUComponent):
     """
 
     PROMPT_TEMPLATE_NAME = "ZERO_SHOT_LEARNING_PROMPT.md"
+    BATCH_PROMPT_TEMPLATE_NAME = "ZERO_SHOT_BATCH_PROMPT.md"
+    CHAIN_CACHE_SIZE = 256
 
     def __init__(
         self,
         intents: Optional[List[str]] = None,
         entities: Optional[List[str]] = None,
+        intent_entities: Optional[Dict[str, List[str]]] = None,
+        retriever: Optional[IntentRetriever] = None,
+        retrieval_top_k: int = 0,
+        default_intents: Optional[List[str]] = None,
+        streaming: bool = False,
+        batch_size: int = 10,
         **kwargs,
     ):
         """
         Args:
             intents (Optional[List[str]]): List of intents to recognize.
             entities (Optional[List[str]]): List of entities to extract.
+            intent_entities (Optional[Dict[str, List[str]]]): Entities of each intent,
+                used to build the prompt for retrieved candidate intents.
+            retriever (Optional[IntentRetriever]): Index used to select candidate
+                intents for each message. All intents are rendered if not set.
+            retrieval_top_k (int): Number of candidate intents to render.
+            default_intents (Optional[List[str]]): Intents always rendered along
+                with the retrieved candidates, e.g. the fallback intent.
+            streaming (bool): Stream the completion and stop as soon as the intent
+                is resolved if the intent has no entities to extract.
+            batch_size (int): Number of messages packed into one prompt
+                by process_batch.
             **kwargs: Additional arguments for OpenAI configuration.
         """
         self.intents = intents or []
         self.entities = entities or []
+        self.intent_entities = intent_entities or {}
+        self.retriever = retriever if retrieval_top_k > 0 else None
+        self.retrieval_top_k = retrieval_top_k
+        self.default_intents = [
+            intent for intent in default_intents or [] if intent in self.intents
+        ]
+        self.streaming = streaming
+        self.batch_size = max(1, batch_size)
 
-        # Initialize the OpenAI LLM
+        # Get the shared OpenAI LLM client
         from app.config import app_config
-        
-        self.llm = ChatOpenAI(
+
+        self.llm = get_chat_model(
             base_url=kwargs.get("base_url", app_config.OPENAI_BASE_URL),
             api_key=kwargs.get("api_key", app_config.OPENAI_API_KEY),
             model_name=kwargs.get("model_name", app_config.OPENAI_MODEL),
@@ -42,13 +71,26 @@ class ZeroShotNLUOpenAI(NLUComponent):
             max_tokens=kwargs.get("max_tokens", app_config.OPENAI_MAX_TOKENS),
         )
 
-        # Load and render the prompt template
-        env = Environment(loader=FileSystemLoader("app/bot/nlu/llm/prompts"))
-        template = env.get_template(self.PROMPT_TEMPLATE_NAME)
-        system_prompt = template.render(
-            {"intents": self.intents, "entities": self.entities}
+        # Get the compiled prompt templates and build the chain for all intents
+        self.template = get_prompt_template(self.PROMPT_TEMPLATE_NAME)
+        self.batch_template = get_prompt_template(self.BATCH_PROMPT_TEMPLATE_NAME)
+        self.chain = self._build_chain(self.intents, self.entities)
+
+        # chains for retrieved candidate sets repeat often, keep them around
+        self._cached_chain = lru_cache(maxsize=self.CHAIN_CACHE_SIZE)(
+            lambda intents, entities, template: self._build_chain(
+                list(intents), list(entities), template
+            )
         )
 
+    def _build_chain(self, intents: List[str], entities: List[str], template=None):
+        """
+        Render the system prompt for the given intents and entities
+        and build the processing chain.
+        """
+        template = template or self.template
+        system_prompt = template.render({"intents": intents, "entities": entities})
+
         # Define the prompt template
         prompt_template = ChatPromptTemplate.from_messages(
             [
@@ -58,7 +100,84 @@ class ZeroShotNLUOpenAI(NLUComponent):
         )
 
         # Define the processing chain
-        self.chain = prompt_template | self.llm | JsonOutputParser()
+        return prompt_template | self.llm | JsonOutputParser()
+
+    def _get_candidates(self, texts: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Get the candidate intents and entities to render into the prompt
+        for the given texts.
+        """
+        if self.retriever is None:
+            return self.intents, self.entities
+
+        candidates = []
+        for text in texts:
+            for intent_id in self.retriever.search(text, self.retrieval_top_k):
+                if intent_id not in candidates:
+                    candidates.append(intent_id)
+        # lexical similarity rarely ranks these high
+        for intent_id in self.default_intents:
+            if intent_id not in candidates:
+                candidates.append(intent_id)
+
+        entities = []
+        for intent_id in candidates:
+            for entity in self.intent_entities.get(intent_id, []):
+                if entity not in entities:
+                    entities.append(entity)
+
+        logger.debug(f"Candidate intents for prompt: {candidates}")
+        return candidates, entities
+
+    def _get_chain(self, text: str):
+        """
+        Get the chain for a message. With a retriever, only the top-K
+        candidate intents and their entities are rendered into the prompt.
+        """
+        if self.retriever is None:
+            return self.chain
+        intents, entities = self._get_candidates([text])
+        return self._cached_chain(tuple(intents), tuple(entities), self.template)
+
+    def _needs_entities(self, intent: Optional[str]) -> bool:
+        """
+        Check whether entities must be generated for the resolved intent.
+        """
+        if not self.intent_entities:
+            # entities of each intent are unknown, always wait for them
+            return True
+        return bool(self.intent_entities.get(intent))
+
+    def _stream(self, chain, text: str) -> Dict[str, Any]:
+        """
+        Stream the completion and parse the JSON output incrementally.
+        The intent field is complete once the model starts generating
+        entities; generation is stopped early when they are not needed.
+        """
+        result = {}
+        stream = chain.stream({"text": text})
+        try:
+            for partial in stream:
+                result = partial or {}
+                intent = result.get("intent")
+                # entities may come first, only stop once a known intent is parsed
+                if (
+                    "entities" in result
+                    and isinstance(intent, str)
+                    and intent in self.intents
+                    and not self._needs_entities(intent)
+                ):
+                    logger.debug(
+                        f"Intent resolved early: {result.get('intent')}, "
+                        "skipping entity generation"
+                    )
+                    result["entities"] = {}
+                    break
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        return result
 
     def train(self, training_data: List[Dict[str, Any]], model_path: str) -> None:
         """
@@ -87,23 +206,13 @@ class ZeroShotNLUOpenAI(NLUComponent):
             return message
 
         try:
-            result = self.chain.invoke({"text": message.get("text")})
-
-            # Extract intent
-            intent_value = result.get("intent")
-            if intent_value:
-                intent = {
-                    "intent": intent_value,
-                    "confidence": 1.0,  # Zero-shot models don't provide confidence scores
-                }
-                message["intent"] = intent
-                message["intent_ranking"] = [intent]  # Single intent in ranking
+            chain = self._get_chain(message.get("text"))
+            if self.streaming:
+                result = self._stream(chain, message.get("text"))
             else:
-                message["intent"] = {"intent": None, "confidence": 0.0}
+                result = chain.invoke({"text": message.get("text")})
 
-            # Extract and filter entities
-            entities = result.get("entities", {})
-            message["entities"] = {k: v for k, v in entities.items() if v is not None}
+            self._apply_result(message, result)
 
         except Exception as e:
             logger.error(f"Error processing message with LLM: {e}", exc_info=True)
@@ -112,3 +221,83 @@ class ZeroShotNLUOpenAI(NLUComponent):
             message["entities"] = {}
 
         return message
+
+    def _apply_result(self, message: Dict[str, Any], result: Dict[str, Any]):
+        """
+        Populate the message with the intent and entities parsed from the LLM output.
+        """
+        # Extract intent
+        intent_value = result.get("intent")
+        if intent_value:
+            intent = {
+                "intent": intent_value,
+                "confidence": 1.0,  # Zero-shot models don't provide confidence scores
+            }
+            message["intent"] = intent
+            message["intent_ranking"] = [intent]  # Single intent in ranking
+        else:
+            message["intent"] = {"intent": None, "confidence": 0.0}
+
+        # Extract and filter entities
+        entities = result.get("entities") or {}
+        message["entities"] = {k: v for k, v in entities.items() if v is not None}
+
+    def process_batch(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Process messages in micro-batches, packing up to batch_size utterances
+        into a single prompt. Messages whose result can't be parsed from the
+        batch response are processed individually.
+
+        Args:
+            messages (List[Dict[str, Any]]): The input messages.
+
+        Returns:
+            List[Dict[str, Any]]: The processed messages, in the same order.
+        """
+        for start in range(0, len(messages), self.batch_size):
+            batch = [
+                message
+                for message in messages[start : start + self.batch_size]
+                if message.get("text")
+            ]
+            if not batch:
+                continue
+
+            results = self._invoke_batch([message["text"] for message in batch])
+
+            for idx, message in enumerate(batch):
+                result = results.get(idx)
+                try:
+                    if not isinstance(result, dict):
+                        raise ValueError(f"Missing result for batch item {idx}")
+                    self._apply_result(message, result)
+                except Exception as e:
+                    logger.warning(f"Falling back to single call: {e}")
+                    self.process(message)
+
+        return messages
+
+    def _invoke_batch(self, texts: List[str]) -> Dict[int, Any]:
+        """
+        Send a batch of utterances in a single prompt and return
+        the parsed results by utterance id.
+        """
+        chain = self._build_chain(
+            *self._get_candidates(texts), template=self.batch_template
+        )
+        utterances = [{"id": idx, "text": text} for idx, text in enumerate(texts)]
+        try:
+            response = chain.invoke({"text": json.dumps(utterances)})
+        except Exception as e:
+            logger.error(f"Error processing batch with LLM: {e}", exc_info=True)
+            return {}
+
+        if not isinstance(response, list):
+            logger.warning("Batch response is not a JSON array")
+            return {}
+
+        results = {}
+        for item in response:
+            if isinstance(item, dict) and isinstance(item.get("id"), int):
+                results[item["id"]] = item
+        return results
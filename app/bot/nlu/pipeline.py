@@ -22,6 +22,11 @@ class NLUComponent(ABC):
         """Process a message and return the extracted information."""
         pass
 
+    def process_batch(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process a batch of messages. Components that can process
+        messages more efficiently in bulk should override this."""
+        return [self.process(message) for message in messages]
+
 
 class NLUPipeline:
     """Main NLU pipeline that manages components and their execution order."""
@@ -54,3 +59,10 @@ class NLUPipeline:
         for component in self.components:
             message = component.process(message)
         return message
+
+    def process_batch(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process a batch of messages through all components in sequence.
+        Intended for offline jobs such as bulk relabelling and evaluation."""
+        for component in self.components:
+            messages = component.process_batch(messages)
+        return messages
@@ -5,10 +5,12 @@ from app.bot.nlu.featurizers import SpacyFeaturizer
 from app.bot.nlu.intent_classifiers import SklearnIntentClassifier
 from app.bot.nlu.entity_extractors import CRFEntityExtractor
 from app.bot.nlu.entity_extractors import SynonymReplacer
-from app.bot.nlu.llm import ZeroShotNLUOpenAI
+from app.bot.nlu.llm import ZeroShotNLUOpenAI, LLMFallbackClassifier
+from app.bot.nlu.llm.intent_retriever import IntentRetriever
 from app.admin.entities.store import list_synonyms
 from app.admin.bots.store import get_nlu_config
 from app.config import app_config
+from app.metrics import register_metrics
 
 
 async def train_pipeline():
@@ -46,6 +48,11 @@ async def get_pipeline():
         return await create_ml_pipeline(**nlu_config.traditional_settings.dict())
     if nlu_config.pipeline_type == "llm":
         return await create_zero_shot_pipeline(**nlu_config.llm_settings.dict())
+    if nlu_config.pipeline_type == "hybrid":
+        return await create_hybrid_pipeline(
+            nlu_config.traditional_settings.intent_detection_threshold,
+            **nlu_config.llm_settings.dict(),
+        )
 
 
 async def create_ml_pipeline(**kwargs):
@@ -64,29 +71,83 @@ async def create_ml_pipeline(**kwargs):
     )
 
 
-async def create_zero_shot_pipeline(**kwargs):
+async def create_zero_shot_nlu(**kwargs) -> ZeroShotNLUOpenAI:
     """
-    Create a zero shot pipeline
+    Create a zero shot NLU component for all intents and their parameters
     :return:
     """
     intents = await list_intents()
-    synonyms = await list_synonyms()
 
     intent_ids = []
     entity_ids = []
+    intent_entities = {}
+    intent_documents = {}
 
     for intent in intents:
         intent_ids.append(intent.intentId)
+        intent_entities[intent.intentId] = []
         for parameter in intent.parameters:
             entity_ids.append(parameter.name)
+            intent_entities[intent.intentId].append(parameter.name)
+        intent_documents[intent.intentId] = [intent.name] + [
+            example.get("text", "") for example in intent.trainingData
+        ]
+
+    # build the candidate index only if it would shrink the prompt
+    retriever = None
+    retrieval_top_k = kwargs.pop("retrieval_top_k", 0)
+    if 0 < retrieval_top_k < len(intent_ids):
+        retriever = IntentRetriever(intent_documents)
+
+    return ZeroShotNLUOpenAI(
+        intents=intent_ids,
+        entities=entity_ids,
+        intent_entities=intent_entities,
+        retriever=retriever,
+        retrieval_top_k=retrieval_top_k,
+        default_intents=[
+            app_config.DEFAULT_FALLBACK_INTENT_NAME,
+            app_config.DEFAULT_WELCOME_INTENT_NAME,
+        ],
+        **kwargs,
+    )
+
+
+async def create_zero_shot_pipeline(**kwargs):
+    """
+    Create a zero shot pipeline
+    :return:
+    """
+    synonyms = await list_synonyms()
+
+    return NLUPipeline(
+        [
+            await create_zero_shot_nlu(**kwargs),
+            SynonymReplacer(synonyms),
+        ]
+    )
+
+
+async def create_hybrid_pipeline(intent_detection_threshold: float, **kwargs):
+    """
+    Create a cascade pipeline. The traditional classifier handles confident
+    predictions and only low-confidence messages are escalated to the LLM.
+    :return:
+    """
+    synonyms = await list_synonyms()
+
+    llm_fallback = LLMFallbackClassifier(
+        await create_zero_shot_nlu(**kwargs),
+        confidence_threshold=intent_detection_threshold,
+    )
+    register_metrics("nlu_cascade", llm_fallback.get_metrics)
 
     return NLUPipeline(
         [
-            ZeroShotNLUOpenAI(
-                intents=intent_ids,
-                entities=entity_ids,
-                **kwargs,
-            ),
+            SpacyFeaturizer(app_config.SPACY_LANG_MODEL),
+            SklearnIntentClassifier(),
+            CRFEntityExtractor(),
+            llm_fallback,
             SynonymReplacer(synonyms),
         ]
     )
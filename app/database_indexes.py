@@ -0,0 +1,105 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+from app.config import app_config
+from app.database import client, database
+
+logger = logging.getLogger(__name__)
+
+# indexes needed by the admin stores, by collection. The conversation state
+# collections are indexed by the memory saver (MemorySaver.setup).
+INDEXES: Dict[str, List[IndexModel]] = {
+    "bot": [IndexModel([("name", ASCENDING)], name="name_unique", unique=True)],
+    "intent": [IndexModel([("name", ASCENDING)], name="name")],
+    "entity": [IndexModel([("name", ASCENDING)], name="name")],
+    "integrations": [IndexModel([("id", ASCENDING)], name="id_unique", unique=True)],
+    "analytics": [
+        IndexModel([("bucket", ASCENDING)], name="bucket_unique", unique=True)
+    ],
+}
+
+# (database, collection, filter, sort) of the queries the stores run,
+# checked for collection scans in debug mode
+QUERIES: List[Tuple[str, str, Dict, Optional[List]]] = [
+    (app_config.MONGODB_DATABASE, "bot", {"name": "default"}, None),
+    (app_config.MONGODB_DATABASE, "intent", {"name": ""}, None),
+    (app_config.MONGODB_DATABASE, "entity", {"name": ""}, None),
+    (app_config.MONGODB_DATABASE, "integrations", {"id": ""}, None),
+    ("chatbot", "state", {"thread_id": ""}, [("date", ASCENDING)]),
+    ("chatbot", "state", {}, [("date", DESCENDING)]),
+    ("chatbot", "latest_state", {"thread_id": ""}, None),
+    (
+        "chatbot",
+        "thread_summary",
+        {},
+        [("last_date", DESCENDING), ("thread_id", DESCENDING)],
+    ),
+]
+
+
+async def ensure_indexes(db=database) -> Dict[str, List[str]]:
+    """
+    Create the declared indexes. Index creation is idempotent, a failure
+    on one collection (e.g. duplicate values for a unique index) is logged
+    and doesn't stop the others.
+    Returns the names of the indexes created or already present.
+    """
+    created = {}
+    for collection_name, indexes in INDEXES.items():
+        try:
+            created[collection_name] = await db.get_collection(
+                collection_name
+            ).create_indexes(indexes)
+        except PyMongoError as e:
+            logger.warning(f"Failed to create indexes on {collection_name}: {e}")
+    logger.info(f"Ensured indexes on {', '.join(created)}")
+    return created
+
+
+def find_collection_scans(plan) -> bool:
+    """
+    Whether a query plan from explain contains a collection scan
+    """
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(find_collection_scans(value) for value in plan.values())
+    if isinstance(plan, list):
+        return any(find_collection_scans(value) for value in plan)
+    return False
+
+
+async def check_query_plans(mongo_client=client) -> List[str]:
+    """
+    Explain the known store queries and report the ones that still
+    scan a whole collection.
+    """
+    scans = []
+    for database_name, collection_name, query, sort in QUERIES:
+        cursor = mongo_client[database_name][collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            explain = await cursor.explain()
+        except PyMongoError as e:
+            logger.warning(f"Failed to explain query on {collection_name}: {e}")
+            continue
+        if find_collection_scans(explain.get("queryPlanner", {}).get("winningPlan")):
+            description = f"{collection_name} {query} sort={sort}"
+            logger.warning(f"Query scans the whole collection: {description}")
+            scans.append(description)
+    return scans
+
+
+async def bootstrap_indexes():
+    """
+    Create the indexes on startup, checking the query plans in debug mode.
+    Run as a background task, errors are logged and never raised.
+    """
+    try:
+        await ensure_indexes()
+        if app_config.DEBUG:
+            await check_query_plans()
+    except Exception as e:
+        logger.warning(f"Index bootstrap failed: {e}")
@@ -4,11 +4,31 @@ import asyncio
 from pydantic import PlainSerializer, PlainValidator
 from app.config import app_config
 import json
+import orjson
 from datetime import datetime
 
 # PostgreSQL connection pool
 _pool = None
 
+
+def _encode_json(value):
+    # queries may still pass JSON that is already serialized
+    if isinstance(value, str):
+        return value
+    return orjson.dumps(value, default=str).decode()
+
+
+async def _init_connection(connection):
+    """Decode and encode json/jsonb columns with orjson instead of text"""
+    for type_name in ("json", "jsonb"):
+        await connection.set_type_codec(
+            type_name,
+            encoder=_encode_json,
+            decoder=orjson.loads,
+            schema="pg_catalog",
+        )
+
+
 async def get_postgres_pool():
     global _pool
     if _pool is None:
@@ -16,7 +36,11 @@ async def get_postgres_pool():
             app_config.DATABASE_URL,
             min_size=1,
             max_size=10,
-            command_timeout=60
+            command_timeout=60,
+            init=_init_connection,
+            # parameterized queries are prepared once per connection and reused,
+            # set to 0 behind pgbouncer in transaction mode
+            statement_cache_size=app_config.POSTGRES_STATEMENT_CACHE_SIZE,
         )
     return _pool
 
@@ -118,11 +142,44 @@ async def create_tables():
                 id SERIAL PRIMARY KEY,
                 thread_id VARCHAR(255) NOT NULL,
                 state_data JSONB NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX(thread_id, created_at)
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        await connection.execute('''
+            CREATE INDEX IF NOT EXISTS chat_states_thread_id_created_at_idx
+            ON chat_states (thread_id, created_at)
+        ''')
+
+        # Create chat_state_latest table (latest state of each thread,
+        # encoded with app.bot.memory.codec)
+        await connection.execute('''
+            CREATE TABLE IF NOT EXISTS chat_state_latest (
+                thread_id VARCHAR(255) PRIMARY KEY,
+                state_bytes BYTEA NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                archived BOOLEAN NOT NULL DEFAULT FALSE
+            )
+        ''')
+        # idle threads to archive, see app.bot.memory.archiver
+        await connection.execute('''
+            CREATE INDEX IF NOT EXISTS chat_state_latest_idle_idx
+            ON chat_state_latest (updated_at) WHERE NOT archived
+        ''')
         
+        # Create chat_states_archive table (compressed history of idle threads,
+        # see app.bot.memory.archiver)
+        await connection.execute('''
+            CREATE TABLE IF NOT EXISTS chat_states_archive (
+                thread_id VARCHAR(255) NOT NULL,
+                seq INTEGER NOT NULL,
+                first_created_at TIMESTAMP NOT NULL,
+                last_created_at TIMESTAMP NOT NULL,
+                count INTEGER NOT NULL,
+                data BYTEA NOT NULL,
+                PRIMARY KEY (thread_id, seq)
+            )
+        ''')
+
         # Create chat_logs table
         await connection.execute('''
             CREATE TABLE IF NOT EXISTS chat_logs (
@@ -132,10 +189,13 @@ async def create_tables():
                 bot_message TEXT,
                 nlu_data JSONB,
                 context JSONB,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX(thread_id, created_at)
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        await connection.execute('''
+            CREATE INDEX IF NOT EXISTS chat_logs_thread_id_created_at_idx
+            ON chat_logs (thread_id, created_at)
+        ''')
 
 # Collection-like interface for PostgreSQL
 class PostgreSQLCollection:
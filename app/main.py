@@ -5,6 +5,15 @@ from fastapi import FastAPI, APIRouter, Request
 from fastapi.responses import FileResponse
 from app.database import client as database_client
 from app.dependencies import init_dialogue_manager
+from app.bot.nlu.llm.clients import close_llm_clients
+from app.bot.dialogue_manager.http_client import http_client_manager
+from app.bot.memory.factory import init_memory_saver, close_memory_saver
+from app.bot.memory.archiver import run_history_archiver
+from app.database_indexes import bootstrap_indexes
+from app.admin.analytics.store import analytics_recorder, run_analytics_flusher
+from app.metrics import register_metrics
+from app.config import app_config
+import asyncio
 import os
 
 from app.admin.bots.routes import router as bots_router
@@ -14,6 +23,7 @@ from app.admin.train.routes import router as train_router
 from app.admin.test.routes import router as test_router
 from app.admin.integrations.routes import router as integrations_router
 from app.admin.chatlogs.routes import router as chatlogs_router
+from app.admin.analytics.routes import router as analytics_router
 
 
 from app.bot.channels.rest.routes import router as rest_router
@@ -22,8 +32,31 @@ from app.bot.channels.facebook.routes import router as facebook_router
 
 @asynccontextmanager
 async def lifespan(_):
+    index_task = asyncio.create_task(bootstrap_indexes())
+    await init_memory_saver()
     await init_dialogue_manager()
+    archiver_task = None
+    if app_config.HISTORY_ARCHIVE_ENABLED:
+        archiver_task = asyncio.create_task(
+            run_history_archiver(app_config.HISTORY_ARCHIVE_INTERVAL)
+        )
+    analytics_task = None
+    if app_config.ANALYTICS_ENABLED:
+        register_metrics("analytics", analytics_recorder.get_metrics)
+        analytics_task = asyncio.create_task(
+            run_analytics_flusher(app_config.ANALYTICS_FLUSH_INTERVAL)
+        )
     yield
+    index_task.cancel()
+    if analytics_task is not None:
+        # flushes the remaining counters
+        analytics_task.cancel()
+        await asyncio.gather(analytics_task, return_exceptions=True)
+    if archiver_task is not None:
+        archiver_task.cancel()
+    await close_memory_saver()
+    await http_client_manager.close()
+    close_llm_clients()
     database_client.close()
 
 
@@ -89,6 +122,22 @@ async def health():
     return health_status
 
 
+@app.get("/status/circuit-breakers")
+async def circuit_breakers_status():
+    """State of the circuit breakers guarding intent API hosts."""
+    from app.bot.dialogue_manager.http_client import circuit_breakers
+
+    return circuit_breakers.get_status()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Snapshot of in-process runtime metrics."""
+    from app.metrics import collect_metrics
+
+    return collect_metrics()
+
+
 @app.get("/api")
 async def api_root():
     return {"message": "Welcome to AI Chatbot Framework API"}
@@ -103,6 +152,7 @@ admin_router.include_router(train_router)
 admin_router.include_router(test_router)
 admin_router.include_router(integrations_router)
 admin_router.include_router(chatlogs_router)
+admin_router.include_router(analytics_router)
 
 
 app.include_router(admin_router)
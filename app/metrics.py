@@ -0,0 +1,32 @@
+from typing import Any, Callable, Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+# name -> callable returning a dict of metric values
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]):
+    """
+    Register a metrics provider. Registering the same name again replaces
+    the previous provider (e.g. after a dialogue manager reload).
+    """
+    _providers[name] = provider
+
+
+def unregister_metrics(name: str):
+    _providers.pop(name, None)
+
+
+def collect_metrics() -> Dict[str, Dict[str, Any]]:
+    """
+    Collect a snapshot of all registered metrics
+    """
+    metrics = {}
+    for name, provider in list(_providers.items()):
+        try:
+            metrics[name] = provider()
+        except Exception as e:
+            logger.warning(f"Failed to collect metrics for {name}: {e}")
+    return metrics
@@ -1,4 +1,5 @@
 import os
+from typing import List
 import dotenv
 from pydantic import BaseModel
 
@@ -20,6 +21,10 @@ class BaseConfig(BaseModel):
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "ai_chatbot_framework")
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "postgres")
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "")
+    # prepared statements cached per connection, 0 disables (pgbouncer)
+    POSTGRES_STATEMENT_CACHE_SIZE: int = int(
+        os.getenv("POSTGRES_STATEMENT_CACHE_SIZE", "256")
+    )
     
     # Use PostgreSQL if DATABASE_URL is provided
     USE_POSTGRESQL: bool = bool(os.getenv("DATABASE_URL"))
@@ -37,6 +42,105 @@ class BaseConfig(BaseModel):
     OPENAI_TEMPERATURE: float = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
     OPENAI_MAX_TOKENS: int = int(os.getenv("OPENAI_MAX_TOKENS", "4096"))
     
+    # Where conversation state is kept: "memory" keeps it in process,
+    # "sqlite" in an embedded database file at STATE_SQLITE_PATH,
+    # empty uses the configured database (MongoDB or PostgreSQL)
+    STATE_BACKEND: str = os.getenv("STATE_BACKEND", "")
+    STATE_SQLITE_PATH: str = os.getenv("STATE_SQLITE_PATH", "state.db")
+    STATE_MEMORY_MAX_HISTORY: int = int(os.getenv("STATE_MEMORY_MAX_HISTORY", "100"))
+    STATE_MEMORY_TTL: float = float(os.getenv("STATE_MEMORY_TTL", "3600"))
+    STATE_MEMORY_MAX_STATES: int = int(os.getenv("STATE_MEMORY_MAX_STATES", "100000"))
+
+    # Conversation history stores a full state every N turns of a thread
+    # and only the changes in between, 1 stores every turn in full
+    STATE_HISTORY_SNAPSHOT_INTERVAL: int = int(
+        os.getenv("STATE_HISTORY_SNAPSHOT_INTERVAL", "20")
+    )
+
+    # Move the history of threads idle for HISTORY_ARCHIVE_IDLE_DAYS into
+    # compressed cold storage, checked every HISTORY_ARCHIVE_INTERVAL seconds
+    HISTORY_ARCHIVE_ENABLED: bool = (
+        os.getenv("HISTORY_ARCHIVE_ENABLED", "false").lower() == "true"
+    )
+    HISTORY_ARCHIVE_IDLE_DAYS: int = int(os.getenv("HISTORY_ARCHIVE_IDLE_DAYS", "30"))
+    HISTORY_ARCHIVE_INTERVAL: float = float(
+        os.getenv("HISTORY_ARCHIVE_INTERVAL", "3600")
+    )
+    HISTORY_ARCHIVE_CHUNK_SIZE: int = 500
+    HISTORY_ARCHIVE_BATCH_SIZE: int = 1000
+
+    # Context sent with a message is kept in the conversation state across
+    # turns, except for CONTEXT_EPHEMERAL_KEYS and values larger than
+    # CONTEXT_MAX_VALUE_SIZE bytes (0 disables the limit). If
+    # CONTEXT_PERSISTED_KEYS is set, only those keys are kept.
+    # Comma separated key lists.
+    CONTEXT_PERSISTED_KEYS: List[str] = [
+        key.strip()
+        for key in os.getenv("CONTEXT_PERSISTED_KEYS", "").split(",")
+        if key.strip()
+    ]
+    CONTEXT_EPHEMERAL_KEYS: List[str] = [
+        key.strip()
+        for key in os.getenv("CONTEXT_EPHEMERAL_KEYS", "timestamp").split(",")
+        if key.strip()
+    ]
+    CONTEXT_MAX_VALUE_SIZE: int = int(os.getenv("CONTEXT_MAX_VALUE_SIZE", "4096"))
+
+    # Roll conversation metrics up into hourly buckets, flushed to the
+    # database every ANALYTICS_FLUSH_INTERVAL seconds
+    ANALYTICS_ENABLED: bool = os.getenv("ANALYTICS_ENABLED", "true").lower() == "true"
+    ANALYTICS_FLUSH_INTERVAL: float = float(
+        os.getenv("ANALYTICS_FLUSH_INTERVAL", "10")
+    )
+
+    # In-process cache of the latest state of each conversation thread.
+    # Off by default: nothing invalidates the cache of other instances, so
+    # only enable it with a single instance or with sticky routing of each
+    # thread to one instance (e.g. by thread_id/sender id at the ingress).
+    STATE_CACHE_ENABLED: bool = (
+        os.getenv("STATE_CACHE_ENABLED", "false").lower() == "true"
+    )
+    STATE_CACHE_MAX_SIZE: int = int(os.getenv("STATE_CACHE_MAX_SIZE", "10000"))
+    STATE_CACHE_TTL: float = float(os.getenv("STATE_CACHE_TTL", "300"))
+
+    # Write states to the database in batches from a background task.
+    # Pending writes are flushed on shutdown, but lost if the process
+    # crashes. Off by default: states not yet written are only visible to
+    # this instance, same as the state cache.
+    STATE_WRITE_BEHIND_ENABLED: bool = (
+        os.getenv("STATE_WRITE_BEHIND_ENABLED", "false").lower() == "true"
+    )
+    STATE_WRITE_BEHIND_FLUSH_SIZE: int = int(
+        os.getenv("STATE_WRITE_BEHIND_FLUSH_SIZE", "100")
+    )
+    STATE_WRITE_BEHIND_FLUSH_INTERVAL: float = float(
+        os.getenv("STATE_WRITE_BEHIND_FLUSH_INTERVAL", "0.5")
+    )
+    STATE_WRITE_BEHIND_MAX_QUEUE_SIZE: int = int(
+        os.getenv("STATE_WRITE_BEHIND_MAX_QUEUE_SIZE", "10000")
+    )
+
+    # Request deadlines in seconds, per channel
+    DEFAULT_REQUEST_DEADLINE: float = 10.0
+    REQUEST_DEADLINES: dict = {"rest": 10.0, "facebook": 15.0}
+    # budget kept for rendering the response and saving the state
+    DEADLINE_RESPONSE_RESERVE: float = 0.25
+    # upper bound for a single intent API call
+    API_CALL_TIMEOUT: float = 30.0
+
+    # Outgoing HTTP client (intent API triggers, channels)
+    HTTP_CLIENT_LIMIT: int = 100
+    HTTP_CLIENT_LIMIT_PER_HOST: int = 10
+    HTTP_CLIENT_DNS_CACHE_TTL: int = 300
+    HTTP_CLIENT_KEEPALIVE_TIMEOUT: float = 30.0
+
+    # Circuit breaker and bulkhead for intent API triggers, per host
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RECOVERY_TIMEOUT: float = 30.0
+    CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS: int = 1
+    API_MAX_CONCURRENCY_PER_HOST: int = 10
+    API_BULKHEAD_TIMEOUT: float = 1.0
+
     # LLM Configuration
     USE_LLM_NLU: bool = os.getenv("USE_LLM_NLU", "false").lower() == "true"
     USE_ZERO_SHOT_NLU: bool = os.getenv("USE_ZERO_SHOT_NLU", "false").lower() == "true"
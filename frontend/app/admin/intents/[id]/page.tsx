@@ -406,6 +406,62 @@ const IntentPage = ({ params }: { params: Promise<{ id: string }> }) => {
                 </label>
               </div>
 
+              {formData.apiDetails?.requestType === 'GET' && (
+                <div>
+                  <label className="flex items-center mb-4">
+                    <input
+                      type="checkbox"
+                      checked={formData.apiDetails?.cacheEnabled || false}
+                      onChange={e => setFormData(prev => ({
+                        ...prev,
+                        apiDetails: {
+                          ...prev.apiDetails!,
+                          cacheEnabled: e.target.checked
+                        }
+                      }))}
+                      className="rounded border-gray-300 text-green-500 focus:ring-green-200 mr-2"
+                    />
+                    <span className="text-sm font-medium text-gray-700">Cache Response</span>
+                  </label>
+                  {formData.apiDetails?.cacheEnabled && (
+                    <div className="flex gap-4 mb-4">
+                      <div className="flex-1">
+                        <label className="block text-sm font-medium text-gray-700 mb-2">TTL (seconds)</label>
+                        <input
+                          type="number"
+                          min="1"
+                          value={formData.apiDetails?.cacheTtl ?? 60}
+                          onChange={e => setFormData(prev => ({
+                            ...prev,
+                            apiDetails: {
+                              ...prev.apiDetails!,
+                              cacheTtl: parseInt(e.target.value)
+                            }
+                          }))}
+                          className="w-full p-2.5 rounded-lg border border-gray-300 focus:ring-2 focus:ring-green-200 focus:border-green-500"
+                        />
+                      </div>
+                      <div className="flex-1">
+                        <label className="block text-sm font-medium text-gray-700 mb-2">Serve Stale For (seconds)</label>
+                        <input
+                          type="number"
+                          min="0"
+                          value={formData.apiDetails?.cacheStaleTtl ?? 0}
+                          onChange={e => setFormData(prev => ({
+                            ...prev,
+                            apiDetails: {
+                              ...prev.apiDetails!,
+                              cacheStaleTtl: parseInt(e.target.value)
+                            }
+                          }))}
+                          className="w-full p-2.5 rounded-lg border border-gray-300 focus:ring-2 focus:ring-green-200 focus:border-green-500"
+                        />
+                      </div>
+                    </div>
+                  )}
+                </div>
+              )}
+
               {formData.apiDetails?.isJson && (
                 <div>
                   <div  className="flex items-center gap-2 mb-2">
@@ -74,18 +74,19 @@ const MLSettingsPage: React.FC = () => {
                 value={localConfig?.pipeline_type}
                 onChange={(e) => handleLocalConfigUpdate({
                   ...localConfig!,
-                  pipeline_type: e.target.value as 'traditional' | 'llm'
+                  pipeline_type: e.target.value as 'traditional' | 'llm' | 'hybrid'
                 })}
                 className="mt-1 block w-full pl-3 pr-10 py-2 text-base border-gray-300 focus:outline-none focus:ring-green-500 focus:border-green-500 sm:text-sm rounded-md"
               >
                 <option value="traditional">Default NLU Pipeline (Manual Training Required)</option>
                 <option value="llm">Large Language Model (Zero-shot Learning)</option>
+                <option value="hybrid">Hybrid (Default NLU Pipeline with LLM Fallback)</option>
               </select>
             </div>
           </div>
         </div>
 
-        {localConfig?.pipeline_type === 'traditional' && (
+        {(localConfig?.pipeline_type === 'traditional' || localConfig?.pipeline_type === 'hybrid') && (
           <div className="border-b border-gray-200 pb-6">
             <h2 className="text-lg font-medium text-gray-800 mb-4">Default NLU Pipeline Settings</h2>
             <div className="space-y-6">
@@ -121,7 +122,7 @@ const MLSettingsPage: React.FC = () => {
           </div>
         )}
 
-        {localConfig?.pipeline_type === 'llm' && (
+        {(localConfig?.pipeline_type === 'llm' || localConfig?.pipeline_type === 'hybrid') && (
           <div>
             <h2 className="text-lg font-medium text-gray-800 mb-4">LLM Settings</h2>
             <p className="text-sm text-gray-500 mb-4">
@@ -200,6 +201,28 @@ const MLSettingsPage: React.FC = () => {
                 />
               </div>
 
+              <div>
+                <label className="block text-sm font-medium text-gray-700 mb-2">
+                  Candidate Intents
+                </label>
+                <p className="text-sm text-gray-500 mb-4">
+                  Number of most similar intents included in the prompt for each message. Use 0 to include all intents.
+                </p>
+                <input
+                  type="number"
+                  min="0"
+                  value={localConfig?.llm_settings.retrieval_top_k}
+                  onChange={(e) => handleLocalConfigUpdate({
+                    ...localConfig!,
+                    llm_settings: {
+                      ...localConfig!.llm_settings,
+                      retrieval_top_k: parseInt(e.target.value)
+                    }
+                  })}
+                  className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-green-500 focus:border-green-500 sm:text-sm"
+                />
+              </div>
+
               <div>
                 <label className="block text-sm font-medium text-gray-700 mb-2">
                   Temperature
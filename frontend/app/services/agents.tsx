@@ -1,7 +1,7 @@
 import { API_BASE_URL } from "./base";
 
 interface NLUConfig {
-  pipeline_type: 'traditional' | 'llm';
+  pipeline_type: 'traditional' | 'llm' | 'hybrid';
   traditional_settings: {
     intent_detection_threshold: number;
     entity_detection_threshold: number;
@@ -13,6 +13,7 @@ interface NLUConfig {
     model_name: string;
     max_tokens: number;
     temperature: number;
+    retrieval_top_k: number;
   };
 }
 
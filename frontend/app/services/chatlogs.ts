@@ -20,6 +20,13 @@ export interface ChatLogsResponse {
   page: number;
   limit: number;
   conversations: ChatThreadInfo[];
+  next: string | null;
+}
+
+interface ChatThreadResponse {
+  thread_id: string;
+  messages: ChatLog[];
+  next: string | null;
 }
 
 export async function listChatLogs(page: number, limit: number): Promise<ChatLogsResponse> {
@@ -28,8 +35,17 @@ export async function listChatLogs(page: number, limit: number): Promise<ChatLog
 }
 
 export async function getChatThread(threadId: string): Promise<ChatLog[]> {
-  const response = await fetch(`${API_BASE_URL}chatlogs/${threadId}`);
-  return response.json();
+  const messages: ChatLog[] = [];
+  let cursor: string | null = null;
+  do {
+    const query: string = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    const response = await fetch(`${API_BASE_URL}chatlogs/${threadId}${query}`);
+    const page: ChatThreadResponse = await response.json();
+    if (!page.messages) break;
+    messages.push(...page.messages);
+    cursor = page.next;
+  } while (cursor);
+  return messages;
 }
 
 export function formatTimestamp(timestamp: string): string {
@@ -60,6 +60,10 @@ interface IntentModel {
     }>;
     requestType: string;
     jsonData: string;
+    cacheEnabled?: boolean;
+    cacheTtl?: number;
+    cacheStaleTtl?: number;
+    cacheMaxSize?: number;
   };
 }
 
@@ -16,6 +16,8 @@ def migrate():
     async def async_migrate():
         from app.admin.bots.store import ensure_default_bot, import_bot
         from app.admin.integrations.store import ensure_default_integrations
+        from app.bot.memory.factory import get_memory_saver
+        from app.database_indexes import check_query_plans, ensure_indexes
         from app.config import app_config
 
         try:
@@ -36,6 +38,22 @@ def migrate():
 
         await ensure_default_integrations()
 
+        await ensure_indexes()
+        await get_memory_saver().setup()
+        logger.info("Created conversation state indexes")
+
+        if not app_config.STATE_BACKEND and not app_config.USE_POSTGRESQL:
+            from app.bot.memory.memory_saver_mongo import MemorySaverMongo
+            from app.database import client
+
+            memory_saver = MemorySaverMongo(
+                client, fallback_intent_id=app_config.DEFAULT_FALLBACK_INTENT_NAME
+            )
+            threads = await memory_saver.backfill_thread_summary()
+            logger.info(f"Summarized {threads} conversations")
+        if app_config.DEBUG:
+            await check_query_plans()
+
         # ensure spacy language models are installed
         logger.info("Downloading spacy language models...")
         spacy.cli.download(app_config.SPACY_LANG_MODEL)
@@ -57,5 +75,27 @@ def train():
     asyncio.run(async_train())
 
 
+@cli.command()
+def archive(idle_days: int = 30):
+    """Move the history of conversations idle for idle_days to cold storage"""
+
+    async def async_archive():
+        from app.bot.memory.archiver import get_history_archiver
+
+        archiver = get_history_archiver()
+        archiver.idle_days = idle_days
+        await archiver.setup()
+
+        total = 0
+        while True:
+            archived = await archiver.archive_idle_threads()
+            total += archived
+            if archived == 0:
+                break
+        logger.info(f"Archived {total} conversations.")
+
+    asyncio.run(async_archive())
+
+
 if __name__ == "__main__":
     cli()
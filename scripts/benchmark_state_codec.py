@@ -0,0 +1,88 @@
+"""
+Compare the size and encode/decode time per turn of the conversation
+state formats.
+
+    python scripts/benchmark_state_codec.py [--turns 10000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson  # noqa: E402
+from app.bot.dialogue_manager.models import UserMessage  # noqa: E402
+from app.bot.memory.codec import decode_state, encode_state  # noqa: E402
+from app.bot.memory.models import State  # noqa: E402
+
+
+def make_state(context_size: int) -> State:
+    context = {"name": "bob", "email": "bob@example.com", "order_id": "A1234"}
+    context.update({f"key_{i}": f"value {i} " * 4 for i in range(context_size)})
+    state = State(
+        thread_id="3f8c1e2a-5b7d-4c9e-8f1a-2b3c4d5e6f70",
+        user_message=UserMessage(
+            thread_id="3f8c1e2a-5b7d-4c9e-8f1a-2b3c4d5e6f70",
+            text="I want a large pizza with pepperoni",
+            context={},
+        ),
+        bot_message=[{"text": "Your large pizza with pepperoni will be ready soon!"}],
+        context=context,
+        intent={"id": "order_pizza", "name": "Order Pizza"},
+        parameters=[
+            {"name": "size", "type": "pizza_size", "required": True},
+            {"name": "toppings", "type": "pizza_topping", "required": True},
+        ],
+        extracted_parameters={"size": "large", "toppings": "pepperoni"},
+        complete=True,
+        current_node="",
+    )
+    state.nlu = {
+        "intent": {"intent": "order_pizza", "confidence": 0.97},
+        "entities": {"pizza_size": "large", "pizza_topping": "pepperoni"},
+    }
+    return state
+
+
+def run(name, encode, decode, turns):
+    data = encode()
+    encode_us = timeit.timeit(encode, number=turns) / turns * 1e6
+    decode_us = timeit.timeit(lambda: decode(data), number=turns) / turns * 1e6
+    print(f"{name:<22}{len(data):>8}{encode_us:>12.1f}{decode_us:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=10000)
+    args = parser.parse_args()
+
+    for context_size in [0, 20, 200]:
+        state = make_state(context_size)
+        print(f"\ncontext keys: {len(state.context)}")
+        print(f"{'format':<22}{'bytes':>8}{'encode us':>12}{'decode us':>12}")
+        run(
+            "to_dict + BSON",
+            lambda: bson.encode(state.to_dict()),
+            lambda data: State.from_dict(bson.decode(data)),
+            args.turns,
+        )
+        run(
+            "to_dict + json",
+            lambda: json.dumps(state.to_dict(), default=str).encode(),
+            lambda data: State.from_dict(json.loads(data)),
+            args.turns,
+        )
+        run(
+            "codec",
+            lambda: encode_state(state, compress=False),
+            decode_state,
+            args.turns,
+        )
+        run("codec + zstd", lambda: encode_state(state), decode_state, args.turns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+from app.bot.dialogue_manager.models import UserMessage
+from app.bot.memory.models import State
+
+
+class FakeClock:
+    """
+    Monotonic clock advanced by hand
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_state(thread_id, **context):
+    return State(
+        thread_id=thread_id,
+        user_message=UserMessage(thread_id=thread_id, text="hi", context={}),
+        context=context,
+    )
@@ -0,0 +1,100 @@
+import pytest
+from datetime import datetime, UTC
+from unittest.mock import AsyncMock, MagicMock
+from app.admin.analytics import store
+from app.admin.analytics.store import AnalyticsRecorder
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+@pytest.fixture
+def recorder():
+    clock = MagicMock(return_value=datetime(2024, 1, 1, 10, 30, tzinfo=UTC))
+    return AnalyticsRecorder(AsyncMock(), clock=clock)
+
+
+class TestAnalyticsRecorder:
+    @pytest.mark.asyncio
+    async def test_flush_increments_hourly_bucket(self, recorder):
+        recorder.record_turn("greet", fallback=False, confidence=0.95, new_thread=True)
+        recorder.record_turn("fallback", fallback=True, confidence=0.2)
+        recorder.record_api_call("order.pizza", success=False, latency=0.5)
+
+        await recorder.flush()
+
+        (request,) = recorder.collection.bulk_write.call_args.args[0]
+        assert request._filter == {"bucket": datetime(2024, 1, 1, 10, tzinfo=UTC)}
+        assert request._doc["$inc"] == {
+            "turns": 2,
+            "threads": 1,
+            "fallbacks": 1,
+            "intents.greet": 1,
+            "intents.fallback": 1,
+            "confidence.9": 1,
+            "confidence.2": 1,
+            "api.order_pizza.calls": 1,
+            "api.order_pizza.failures": 1,
+            "api.order_pizza.latency_ms": 500.0,
+        }
+        assert not recorder.pending
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_counters(self, recorder):
+        recorder.collection.bulk_write.side_effect = Exception("down")
+        recorder.record_turn("greet", fallback=False)
+
+        await recorder.flush()
+        recorder.record_turn("greet", fallback=False)
+
+        (counters,) = recorder.pending.values()
+        assert counters["turns"] == 2
+        assert recorder.flush_failures == 1
+
+
+class TestGetAnalytics:
+    @pytest.mark.asyncio
+    async def test_sums_buckets(self, monkeypatch):
+        collection = MagicMock()
+        collection.find.return_value = FakeCursor(
+            [
+                {
+                    "bucket": datetime(2024, 1, 1, 10),
+                    "turns": 3,
+                    "threads": 1,
+                    "fallbacks": 1,
+                    "intents": {"greet": 2, "fallback": 1},
+                    "confidence": {"9": 2},
+                    "api": {"order": {"calls": 2, "failures": 1, "latency_ms": 300}},
+                },
+                {
+                    "bucket": datetime(2024, 1, 1, 11),
+                    "turns": 1,
+                    "threads": 1,
+                    "intents": {"greet": 1},
+                },
+            ]
+        )
+        monkeypatch.setattr(store, "analytics_collection", collection)
+
+        result = await store.get_analytics(
+            datetime(2024, 1, 1, tzinfo=UTC), datetime(2024, 1, 2, tzinfo=UTC)
+        )
+
+        assert result.turns == 4
+        assert result.fallback_rate == 0.25
+        assert result.turns_per_thread == 2
+        assert result.intents == {"greet": 3, "fallback": 1}
+        assert result.confidence_histogram[9] == 2
+        assert result.api["order"].success_rate == 0.5
+        assert result.api["order"].avg_latency_ms == 150
+        assert len(result.buckets) == 2
@@ -0,0 +1,122 @@
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from app.bot.memory.archiver import (
+    MongoHistoryArchiver,
+    PostgresHistoryArchiver,
+    decode_chunk,
+    encode_chunk,
+)
+from app.bot.memory.delta import HistoryEncoder, rebuild
+from app.bot.memory.models import State
+from app.bot.dialogue_manager.models import UserMessage
+
+
+def make_state(turn):
+    return State(
+        thread_id="user1",
+        user_message=UserMessage(thread_id="user1", text=f"turn {turn}", context={}),
+        context={"turn": turn},
+        date=datetime(2024, 1, 1, 12, turn),
+    )
+
+
+class TestArchiveChunks:
+    def test_round_trip(self):
+        documents = [make_state(turn).to_dict() for turn in range(3)]
+
+        decoded = decode_chunk(encode_chunk(documents))
+
+        assert [document["context"] for document in decoded] == [
+            {"turn": 0},
+            {"turn": 1},
+            {"turn": 2},
+        ]
+        assert decoded[2]["date"] == datetime(2024, 1, 1, 12, 2)
+
+    def test_archived_deltas_rebuild_with_live_history(self):
+        encoder = HistoryEncoder(snapshot_interval=10)
+        documents = [encoder.encode(make_state(turn)) for turn in range(4)]
+
+        archived = decode_chunk(encode_chunk(documents[:2]))
+        rebuilt = rebuild(archived + documents[2:])
+
+        assert [document["context"] for document in rebuilt] == [
+            {"turn": turn} for turn in range(4)
+        ]
+
+
+class AsyncCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+    async def to_list(self, length):
+        return self.documents
+
+
+@pytest.fixture
+def archiver():
+    collections = {
+        "state": MagicMock(delete_many=AsyncMock()),
+        "state_archive": AsyncMock(),
+        "thread_summary": MagicMock(update_one=AsyncMock()),
+    }
+    database = MagicMock()
+    database.get_collection.side_effect = lambda name: collections[name]
+    return MongoHistoryArchiver(database, chunk_size=2)
+
+
+class TestMongoHistoryArchiver:
+    @pytest.mark.asyncio
+    async def test_idle_threads_come_from_thread_summary(self, archiver):
+        archiver.summary_collection.find.return_value = AsyncCursor(
+            [{"thread_id": "user1"}, {"thread_id": "user2"}]
+        )
+        cutoff = datetime(2024, 1, 2)
+
+        threads = await archiver.find_idle_threads(cutoff, 10)
+
+        assert threads == ["user1", "user2"]
+        query = archiver.summary_collection.find.call_args.args[0]
+        assert query == {
+            "archived": {"$in": [False, None]},
+            "last_date": {"$lt": cutoff},
+        }
+        assert archiver.summary_collection.find.call_args.kwargs == {"limit": 10}
+        archiver.collection.aggregate.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_archive_flags_summary_unless_thread_moved_on(self, archiver):
+        documents = [dict(make_state(turn).to_dict(), _id=turn) for turn in range(3)]
+        archiver.collection.find.return_value = AsyncCursor(documents)
+        archiver.archive_collection.find_one.return_value = None
+
+        await archiver.archive_thread("user1")
+
+        assert archiver.archive_collection.replace_one.call_count == 2
+        archiver.summary_collection.update_one.assert_called_once_with(
+            {"thread_id": "user1", "last_date": {"$lte": datetime(2024, 1, 1, 12, 2)}},
+            {"$set": {"archived": True}},
+        )
+
+
+class TestPostgresHistoryArchiver:
+    @pytest.mark.asyncio
+    async def test_idle_threads_come_from_latest_state(self):
+        db = AsyncMock()
+        db.fetch.return_value = [{"thread_id": "user1"}]
+        archiver = PostgresHistoryArchiver(db)
+
+        threads = await archiver.find_idle_threads(datetime(2024, 1, 2), 10)
+
+        assert threads == ["user1"]
+        query = db.fetch.call_args.args[0]
+        assert "FROM chat_state_latest" in query
+        assert "GROUP BY" not in query
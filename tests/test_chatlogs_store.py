@@ -0,0 +1,112 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId
+from app.admin.chatlogs import store
+from app.bot.dialogue_manager.models import UserMessage
+from app.bot.memory.archiver import encode_chunk
+from app.bot.memory.delta import HistoryEncoder
+from app.bot.memory.models import State
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+def make_history(count, snapshot_interval=3):
+    encoder = HistoryEncoder(snapshot_interval)
+    start = datetime(2024, 1, 1)
+    history = []
+    for index in range(count):
+        state = State(
+            thread_id="t1",
+            user_message=UserMessage(thread_id="t1", text=f"hi {index}", context={}),
+            bot_message=[{"text": "hello"}],
+            context={"index": index},
+        )
+        state.date = start + timedelta(minutes=index)
+        document = encoder.encode(state)
+        document["_id"] = ObjectId()
+        history.append(document)
+    return history
+
+
+@pytest.fixture
+def history(monkeypatch):
+    documents = make_history(7)
+
+    def find(query, sort=None, batch_size=None):
+        since = query.get("date", {}).get("$gte")
+        return FakeCursor(
+            [d for d in documents if since is None or d["date"] >= since]
+        )
+
+    async def find_one(query, projection=None, sort=None):
+        snapshots = [
+            d
+            for d in documents
+            if "delta" not in d and d["date"] <= query["date"]["$lte"]
+        ]
+        return snapshots[-1] if snapshots else None
+
+    collection = MagicMock()
+    collection.find.side_effect = find
+    collection.find_one.side_effect = find_one
+    archive_collection = MagicMock()
+    archive_collection.find_one = AsyncMock(return_value=None)
+    archive_collection.find.return_value = FakeCursor([])
+    monkeypatch.setattr(store, "collection", collection)
+    monkeypatch.setattr(store.archiver, "archive_collection", archive_collection)
+    return documents
+
+
+class TestCursor:
+    def test_round_trip(self):
+        date = datetime(2024, 1, 1, 12)
+
+        assert store.decode_cursor(store.encode_cursor(date, "t1")) == (date, "t1")
+
+    def test_invalid_cursor(self):
+        with pytest.raises(store.InvalidCursorException):
+            store.decode_cursor("not a cursor")
+
+
+class TestGetChatThread:
+    @pytest.mark.asyncio
+    async def test_pages_through_delta_encoded_history(self, history):
+        contexts = []
+        cursor = None
+        while True:
+            page = await store.get_chat_thread("t1", limit=3, cursor=cursor)
+            contexts += [message.context for message in page.messages]
+            cursor = page.next
+            if cursor is None:
+                break
+
+        assert contexts == [{"index": index} for index in range(7)]
+
+    @pytest.mark.asyncio
+    async def test_reads_archived_turns_first(self, history):
+        archive_collection = store.archiver.archive_collection
+        archive_collection.find.return_value = FakeCursor(
+            [{"data": encode_chunk(history[:3])}]
+        )
+        del history[:3]
+
+        page = await store.get_chat_thread("t1", limit=10)
+
+        assert [m.context["index"] for m in page.messages] == list(range(7))
+
+    @pytest.mark.asyncio
+    async def test_missing_thread(self, history):
+        history.clear()
+
+        assert await store.get_chat_thread("t1") is None
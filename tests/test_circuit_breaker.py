@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from app.bot.dialogue_manager.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenException,
+)
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(
+        "orders.example.com", failure_threshold=2, recovery_timeout=30, clock=clock
+    )
+
+
+async def fail(breaker):
+    with pytest.raises(RuntimeError):
+        async with breaker.guard():
+            raise RuntimeError("timeout")
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_opens_after_consecutive_failures(self, breaker):
+        await fail(breaker)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+        await fail(breaker)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        with pytest.raises(CircuitOpenException):
+            async with breaker.guard():
+                pass
+        assert breaker.get_status()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_closes_circuit(self, breaker, clock):
+        await fail(breaker)
+        await fail(breaker)
+
+        clock.now = 31
+        async with breaker.guard():
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.failures == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_frees_its_slot(self, breaker, clock):
+        await fail(breaker)
+        await fail(breaker)
+
+        clock.now = 31
+        with pytest.raises(asyncio.CancelledError):
+            async with breaker.guard():
+                raise asyncio.CancelledError()
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        async with breaker.guard():
+            pass
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_failed_probe_opens_circuit_again(self, breaker, clock):
+        await fail(breaker)
+        await fail(breaker)
+
+        clock.now = 31
+        await fail(breaker)
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.opened_at == 31
+
+    @pytest.mark.asyncio
+    async def test_bulkhead_rejects_when_full(self, clock):
+        breaker = CircuitBreaker(
+            "orders.example.com", max_concurrency=1, bulkhead_timeout=0.01, clock=clock
+        )
+
+        async with breaker.guard():
+            with pytest.raises(CircuitOpenException):
+                async with breaker.guard():
+                    pass
+
+        assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,70 @@
+from app.bot.dialogue_manager.models import UserMessage
+from app.bot.memory.context_policy import ContextPolicy
+from app.bot.memory.models import State
+
+
+def make_message(context):
+    return UserMessage(thread_id="t1", text="hello", context=context)
+
+
+class TestContextPolicy:
+    def test_ephemeral_keys_are_not_kept(self):
+        policy = ContextPolicy(ephemeral_keys=["timestamp"])
+
+        durable, ephemeral = policy.split({"user": "bob", "timestamp": 1})
+
+        assert durable == {"user": "bob"}
+        assert ephemeral == {"timestamp": 1}
+
+    def test_only_persisted_keys_are_kept(self):
+        policy = ContextPolicy(persisted_keys=["user"])
+
+        durable, ephemeral = policy.split({"user": "bob", "page": "home"})
+
+        assert durable == {"user": "bob"}
+        assert ephemeral == {"page": "home"}
+
+    def test_large_values_are_not_kept(self):
+        policy = ContextPolicy(max_value_size=16)
+
+        durable, ephemeral = policy.split({"user": "bob", "cart": ["x" * 32]})
+
+        assert durable == {"user": "bob"}
+        assert "cart" in ephemeral
+
+
+class TestStateUpdate:
+    def test_context_does_not_grow_with_ephemeral_keys(self):
+        policy = ContextPolicy(ephemeral_keys=["timestamp"])
+        state = State(thread_id="t1")
+
+        for timestamp in range(3):
+            state.update(make_message({"user": "bob", "timestamp": timestamp}), policy)
+
+        assert state.context == {"user": "bob"}
+        assert state.turn_context == {"user": "bob", "timestamp": 2}
+        assert state.to_dict()["context"] == {"user": "bob"}
+
+    def test_ephemeral_context_is_cleared_on_next_turn(self):
+        policy = ContextPolicy(ephemeral_keys=["timestamp"])
+        state = State(thread_id="t1")
+
+        state.update(make_message({"timestamp": 1}), policy)
+        state.update(make_message({}), policy)
+
+        assert state.turn_context == {}
+
+    def test_policy_compacts_previously_persisted_keys(self):
+        policy = ContextPolicy(persisted_keys=["user"])
+        state = State(thread_id="t1", context={"user": "bob", "stale": "x"})
+
+        state.update(make_message({}), policy)
+
+        assert state.context == {"user": "bob"}
+
+    def test_update_without_policy_keeps_everything(self):
+        state = State(thread_id="t1")
+
+        state.update(make_message({"timestamp": 1}))
+
+        assert state.context == {"timestamp": 1}
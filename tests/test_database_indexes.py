@@ -0,0 +1,68 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import OperationFailure
+from app.database_indexes import (
+    INDEXES,
+    check_query_plans,
+    ensure_indexes,
+    find_collection_scans,
+)
+
+
+def explain_with(stage):
+    return {
+        "queryPlanner": {
+            "winningPlan": {"stage": "FETCH", "inputStage": {"stage": stage}}
+        }
+    }
+
+
+class TestEnsureIndexes:
+    @pytest.mark.asyncio
+    async def test_creates_declared_indexes(self):
+        collections = {name: AsyncMock() for name in INDEXES}
+        db = MagicMock()
+        db.get_collection.side_effect = lambda name: collections[name]
+
+        await ensure_indexes(db)
+
+        for name, indexes in INDEXES.items():
+            collections[name].create_indexes.assert_called_once_with(indexes)
+
+    @pytest.mark.asyncio
+    async def test_failure_does_not_stop_other_collections(self):
+        collections = {name: AsyncMock() for name in INDEXES}
+        collections["bot"].create_indexes.side_effect = OperationFailure("dup")
+        db = MagicMock()
+        db.get_collection.side_effect = lambda name: collections[name]
+
+        created = await ensure_indexes(db)
+
+        assert "bot" not in created
+        collections["integrations"].create_indexes.assert_called_once()
+
+
+class TestQueryPlans:
+    def test_find_collection_scans(self):
+        assert find_collection_scans(explain_with("COLLSCAN"))
+        assert not find_collection_scans(explain_with("IXSCAN"))
+        assert find_collection_scans(
+            {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}
+        )
+
+    @pytest.mark.asyncio
+    async def test_reports_collection_scans(self):
+        def find(query):
+            cursor = MagicMock()
+            cursor.sort.return_value = cursor
+            stage = "COLLSCAN" if "name" in query else "IXSCAN"
+            cursor.explain = AsyncMock(return_value=explain_with(stage))
+            return cursor
+
+        mongo_client = MagicMock()
+        mongo_client.__getitem__.return_value.__getitem__.return_value.find = find
+
+        scans = await check_query_plans(mongo_client)
+
+        assert scans
+        assert all("name" in scan for scan in scans)
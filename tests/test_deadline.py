@@ -0,0 +1,26 @@
+from unittest.mock import patch
+from app.bot.dialogue_manager.deadline import Deadline
+from tests.helpers import FakeClock
+
+
+class TestDeadline:
+    def test_timeout_is_capped_by_remaining_budget(self):
+        clock = FakeClock()
+        deadline = Deadline(5.0, clock=clock)
+
+        assert deadline.timeout(cap=30.0) == 5.0
+        assert deadline.timeout(cap=2.0) == 2.0
+
+        clock.now = 4.0
+        assert deadline.timeout(cap=30.0, reserve=0.5) == 0.5
+
+        clock.now = 6.0
+        assert deadline.remaining() == 0.0
+        assert deadline.expired
+
+    def test_for_channel(self):
+        with patch(
+            "app.bot.dialogue_manager.deadline.app_config.REQUEST_DEADLINES",
+            {"facebook": 15.0},
+        ):
+            assert Deadline.for_channel("facebook").budget == 15.0
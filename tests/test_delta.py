@@ -0,0 +1,115 @@
+import copy
+from app.bot.memory.delta import HistoryEncoder, latest_from_history, rebuild
+from app.bot.memory.models import State
+from app.bot.dialogue_manager.models import UserMessage
+
+
+def make_state(index, **context):
+    return State(
+        thread_id="user1",
+        user_message=UserMessage(thread_id="user1", text=f"turn {index}", context={}),
+        context=context,
+        current_node=f"node{index % 2}",
+    )
+
+
+def conversation():
+    context = {"name": "bob"}
+    for turn in range(7):
+        context = dict(context, turn=turn)
+        if turn == 4:
+            del context["name"]
+        yield make_state(turn, **context)
+
+
+class TestHistoryEncoder:
+    def test_snapshot_every_interval(self):
+        encoder = HistoryEncoder(snapshot_interval=3)
+
+        documents = [encoder.encode(state) for state in conversation()]
+
+        assert ["delta" in document for document in documents] == [
+            False,
+            True,
+            True,
+            False,
+            True,
+            True,
+            False,
+        ]
+        assert documents[4]["delta"] == {
+            "context": {"set": {"turn": 4}, "unset": ["name"]},
+            "current_node": {"value": "node0"},
+        }
+
+    def test_rebuild(self):
+        encoder = HistoryEncoder(snapshot_interval=3)
+        states = list(conversation())
+
+        rebuilt = rebuild([encoder.encode(state) for state in states])
+
+        assert [state["context"] for state in rebuilt] == [
+            state.context for state in states
+        ]
+        assert [state["current_node"] for state in rebuilt] == [
+            state.current_node for state in states
+        ]
+        assert rebuilt[2]["user_message"]["text"] == "turn 2"
+
+    def test_latest_from_history(self):
+        encoder = HistoryEncoder(snapshot_interval=3)
+        documents = [encoder.encode(state) for state in conversation()][:6]
+
+        assert latest_from_history(documents[::-1])["context"] == {"turn": 5}
+
+    def test_forgotten_thread_starts_with_snapshot(self):
+        encoder = HistoryEncoder(snapshot_interval=3)
+        encoder.encode(make_state(0))
+        encoder.forget("user1")
+
+        assert "delta" not in encoder.encode(make_state(1))
+
+    def test_turn_saved_by_another_process_is_followed_by_snapshot(self):
+        replica_a = HistoryEncoder(snapshot_interval=10)
+        replica_b = HistoryEncoder(snapshot_interval=10)
+        state = make_state(0)
+        documents = []
+        for turn, encoder in enumerate([replica_a, replica_a, replica_b, replica_a]):
+            # each turn loads the state saved by the previous one
+            state = copy.deepcopy(state)
+            state.update(UserMessage(thread_id="user1", text="hi", context={}))
+            state.context["turn"] = turn
+            documents.append(encoder.encode(state))
+
+        assert ["delta" in document for document in documents] == [
+            False,
+            True,
+            False,
+            False,
+        ]
+        assert documents[1]["base"] == documents[0]["turn_id"]
+        assert [document["context"] for document in rebuild(documents)] == [
+            {"turn": turn} for turn in range(4)
+        ]
+
+
+class TestHistoryDecoder:
+    def history(self):
+        return [
+            {"turn_id": "t1", "context": {"name": "bob"}, "current_node": "a"},
+            # two processes saved a turn based on t1
+            {"turn_id": "t2", "base": "t1", "delta": {"context": {"set": {"a": 1}}}},
+            {"turn_id": "t3", "base": "t1", "delta": {"context": {"set": {"b": 2}}}},
+        ]
+
+    def test_delta_is_applied_to_its_base(self):
+        rebuilt = rebuild(self.history())
+
+        assert rebuilt[1]["context"] == {"name": "bob", "a": 1}
+        assert rebuilt[2]["context"] == {"name": "bob", "b": 2}
+        assert "base" not in rebuilt[2]
+
+    def test_latest_from_history_follows_base(self):
+        latest = latest_from_history(self.history()[::-1])
+
+        assert latest["context"] == {"name": "bob", "b": 2}
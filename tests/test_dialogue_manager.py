@@ -1,6 +1,13 @@
+import asyncio
+import time
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
-from app.bot.dialogue_manager.dialogue_manager import DialogueManager
+from app.bot.dialogue_manager.dialogue_manager import (
+    DialogueManager,
+    DialogueManagerException,
+)
+from app.bot.dialogue_manager.http_client import APICallExcetion
+from app.bot.dialogue_manager.deadline import Deadline
 from app.bot.dialogue_manager.models import (
     IntentModel,
     ParameterModel,
@@ -10,6 +17,7 @@ from app.bot.dialogue_manager.models import (
 from app.bot.memory import MemorySaver
 from app.bot.memory.models import State
 from app.bot.nlu.pipeline import NLUPipeline
+from tests.helpers import FakeClock
 
 
 @pytest.fixture
@@ -371,3 +379,174 @@ class TestDialogueManager:
             assert current_state.extracted_parameters["size"] == "large"
             assert current_state.extracted_parameters["toppings"] == "pepperoni"
             assert current_state.missing_parameters == []
+
+
+class TestDialogueManagerDeadline:
+    @pytest.mark.asyncio
+    async def test_slow_nlu_falls_back(self, dialogue_manager, mock_nlu_pipeline):
+        mock_nlu_pipeline.process.side_effect = lambda message: time.sleep(0.5)
+
+        message = UserMessage(text="hello", context={}, thread_id="user1")
+        current_state = await dialogue_manager.process(message, Deadline(0.1))
+
+        assert current_state.intent["id"] == "fallback"
+
+    @pytest.mark.asyncio
+    async def test_state_lookup_timeout_does_not_save(
+        self, dialogue_manager, mock_memory_saver
+    ):
+        async def slow_get(thread_id):
+            await asyncio.sleep(0.5)
+
+        mock_memory_saver.get.side_effect = slow_get
+
+        message = UserMessage(text="hello", context={}, thread_id="user1")
+        current_state = await dialogue_manager.process(message, Deadline(0))
+
+        assert current_state.bot_message
+        mock_memory_saver.save.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_budget_includes_queue_time(
+        self, dialogue_manager, mock_nlu_pipeline, mock_memory_saver
+    ):
+        def slow_nlu(message):
+            time.sleep(0.3)
+            return {"intent": {"intent": "greet", "confidence": 0.95}, "entities": {}}
+
+        mock_nlu_pipeline.process.side_effect = slow_nlu
+        intents = []
+        mock_memory_saver.save.side_effect = lambda thread_id, state: intents.append(
+            state.intent
+        )
+
+        with patch.object(
+            Deadline, "for_channel", side_effect=lambda channel: Deadline(0.7)
+        ):
+            await asyncio.gather(
+                *[
+                    dialogue_manager.process(
+                        UserMessage(text="hello", context={}, thread_id="user1")
+                    )
+                    for _ in range(2)
+                ]
+            )
+
+        # the second turn waited ~0.3s in the queue, what was left of its
+        # budget minus the reserve wasn't enough for NLU
+        assert intents == [{"id": "greet"}, {"id": "fallback"}]
+
+    @pytest.mark.asyncio
+    async def test_failed_background_save_does_not_fail_next_turn(
+        self, dialogue_manager, mock_nlu_pipeline, mock_memory_saver
+    ):
+        mock_nlu_pipeline.process.return_value = {
+            "intent": {"intent": "greet", "confidence": 0.95},
+            "entities": {},
+        }
+        failed = asyncio.get_running_loop().create_future()
+        failed.set_exception(OSError("connection reset"))
+        dialogue_manager._pending_saves["user1"] = failed
+
+        state = await dialogue_manager.process(
+            UserMessage(text="hello", context={}, thread_id="user1")
+        )
+
+        assert state.intent == {"id": "greet"}
+        mock_memory_saver.save.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_api_call_skipped_when_budget_exhausted(
+        self, dialogue_manager, mock_nlu_pipeline, mock_memory_saver
+    ):
+        initial_state = State(
+            thread_id="user1",
+            user_message=UserMessage(
+                text="a large pizza", context={}, thread_id="user1"
+            ),
+            complete=False,
+            parameters=[
+                {"name": "size", "type": "pizza_size", "required": True},
+                {"name": "toppings", "type": "pizza_topping", "required": True},
+            ],
+            extracted_parameters={"size": "large"},
+            missing_parameters=["toppings"],
+            current_node="toppings",
+            intent={"id": "order_pizza"},
+        )
+        mock_memory_saver.get.return_value = initial_state
+
+        clock = FakeClock()
+        deadline = Deadline(1.0, clock=clock)
+
+        # NLU uses up most of the budget
+        def slow_nlu(message):
+            clock.now = 0.9
+            return {
+                "intent": {"intent": "order_pizza", "confidence": 0.95},
+                "entities": {"pizza_topping": "pepperoni"},
+            }
+
+        mock_nlu_pipeline.process.side_effect = slow_nlu
+
+        with patch(
+            "app.bot.dialogue_manager.dialogue_manager.call_api", new_callable=AsyncMock
+        ) as mock_call_api:
+            message = UserMessage(text="pepperoni", context={}, thread_id="user1")
+            current_state = await dialogue_manager.process(message, deadline)
+
+            assert not mock_call_api.called
+            assert current_state.bot_message == [
+                {"text": "Service is not available. Please try again later."}
+            ]
+
+    @pytest.mark.asyncio
+    async def test_api_call_gets_remaining_budget(
+        self, dialogue_manager, mock_nlu_pipeline
+    ):
+        mock_nlu_pipeline.process.return_value = {
+            "intent": {"intent": "order_pizza", "confidence": 0.95},
+            "entities": {"pizza_size": "large", "pizza_topping": "pepperoni"},
+        }
+
+        with patch(
+            "app.bot.dialogue_manager.dialogue_manager.call_api", new_callable=AsyncMock
+        ) as mock_call_api:
+            mock_call_api.return_value = {}
+            message = UserMessage(text="a large pepperoni", context={}, thread_id="u")
+            await dialogue_manager.process(message, Deadline(5.0))
+
+            timeout = mock_call_api.call_args.args[-1]
+            assert 0 < timeout <= 5.0
+
+
+class TestDialogueManagerAnalytics:
+    @pytest.mark.asyncio
+    async def test_records_turn(self, dialogue_manager):
+        dialogue_manager.analytics = Mock()
+
+        await dialogue_manager.process(
+            UserMessage(text="hello", context={}, thread_id="user1")
+        )
+
+        dialogue_manager.analytics.record_turn.assert_called_once_with(
+            "greet", fallback=False, confidence=0.95, new_thread=True
+        )
+
+    @pytest.mark.asyncio
+    async def test_records_api_call(self, dialogue_manager, sample_intents):
+        dialogue_manager.analytics = Mock()
+        state = State(thread_id="user1", extracted_parameters={"size": "large"})
+
+        with patch(
+            "app.bot.dialogue_manager.dialogue_manager.call_api", new_callable=AsyncMock
+        ) as mock_call_api:
+            mock_call_api.side_effect = APICallExcetion("down")
+            with pytest.raises(DialogueManagerException):
+                await dialogue_manager._call_intent_api(sample_intents[1], state)
+
+        intent_id, success, latency = (
+            dialogue_manager.analytics.record_api_call.call_args.args
+        )
+        assert (intent_id, success) == ("order_pizza", False)
+        assert latency >= 0
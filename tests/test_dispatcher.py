@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from app.bot.dialogue_manager.dispatcher import KeyedDispatcher
+
+
+class TestKeyedDispatcher:
+    @pytest.mark.asyncio
+    async def test_same_key_runs_in_order(self):
+        dispatcher = KeyedDispatcher()
+        events = []
+
+        async def work(name, delay):
+            events.append(f"start {name}")
+            await asyncio.sleep(delay)
+            events.append(f"end {name}")
+
+        await asyncio.gather(
+            dispatcher.run("thread1", work, "a", 0.02),
+            dispatcher.run("thread1", work, "b", 0.0),
+        )
+
+        assert events == ["start a", "end a", "start b", "end b"]
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_concurrently(self):
+        dispatcher = KeyedDispatcher()
+        running = set()
+        overlapped = False
+
+        async def work(key):
+            nonlocal overlapped
+            running.add(key)
+            await asyncio.sleep(0.01)
+            overlapped = overlapped or len(running) > 1
+            running.discard(key)
+
+        await asyncio.gather(
+            dispatcher.run("thread1", work, "thread1"),
+            dispatcher.run("thread2", work, "thread2"),
+        )
+
+        assert overlapped
+
+    @pytest.mark.asyncio
+    async def test_idle_keys_are_released(self):
+        dispatcher = KeyedDispatcher()
+
+        async def fail():
+            raise ValueError("boom")
+
+        async def work():
+            await asyncio.sleep(0)
+            return dispatcher.queue_depth("thread1")
+
+        results = await asyncio.gather(
+            dispatcher.run("thread1", work), dispatcher.run("thread1", work)
+        )
+        with pytest.raises(ValueError):
+            await dispatcher.run("thread2", fail)
+
+        assert results == [2, 1]
+        assert dispatcher.queues == {}
+        metrics = dispatcher.get_metrics()
+        assert metrics["active_keys"] == 0
+        assert metrics["max_queue_depth"] == 2
+        assert metrics["processed"] == 3
@@ -0,0 +1,133 @@
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from app.bot.dialogue_manager import http_client
+from app.bot.dialogue_manager.http_client import (
+    APICallExcetion,
+    HTTPClientManager,
+    call_api,
+)
+from app.bot.dialogue_manager.circuit_breaker import CircuitBreakerRegistry
+
+
+@pytest_asyncio.fixture
+async def server():
+    async def ok(request):
+        return web.json_response({"status": "ok"})
+
+    async def error(request):
+        return web.json_response({"status": "error"}, status=500)
+
+    async def not_found(request):
+        return web.json_response({"status": "not found"}, status=404)
+
+    app = web.Application()
+    app.router.add_get("/ok", ok)
+    app.router.add_get("/error", error)
+    app.router.add_get("/not_found", not_found)
+    server = TestServer(app)
+    await server.start_server()
+    yield server
+    await server.close()
+
+
+@pytest_asyncio.fixture
+async def manager(monkeypatch):
+    manager = HTTPClientManager()
+    monkeypatch.setattr(http_client, "http_client_manager", manager)
+    monkeypatch.setattr(
+        http_client,
+        "circuit_breakers",
+        CircuitBreakerRegistry(
+            failure_threshold=2, is_failure=http_client.is_upstream_failure
+        ),
+    )
+    yield manager
+    await manager.close()
+
+
+class TestHTTPClientManager:
+    @pytest.mark.asyncio
+    async def test_session_is_reused(self, manager):
+        session = await manager.get_session()
+
+        assert await manager.get_session() is session
+
+    @pytest.mark.asyncio
+    async def test_session_is_recreated_after_close(self, manager):
+        session = await manager.get_session()
+        await manager.close()
+
+        new_session = await manager.get_session()
+
+        assert session.closed
+        assert new_session is not session
+        assert not new_session.closed
+
+    @pytest.mark.asyncio
+    async def test_closed_session_is_replaced(self, manager):
+        session = await manager.get_session()
+        await session.close()
+
+        assert await manager.get_session() is not session
+
+    def test_metrics_per_host(self):
+        manager = HTTPClientManager()
+        manager.record("http://a.example.com/x", 0.1)
+        manager.record("http://a.example.com/y", 0.3, error=True)
+        manager.record("http://b.example.com/", 0.2)
+
+        hosts = manager.get_metrics()["hosts"]
+
+        assert hosts["a.example.com"]["requests"] == 2
+        assert hosts["a.example.com"]["errors"] == 1
+        assert hosts["a.example.com"]["error_rate"] == 0.5
+        assert hosts["a.example.com"]["avg_latency_ms"] == pytest.approx(200)
+        assert hosts["b.example.com"]["errors"] == 0
+
+
+class TestCallAPI:
+    @pytest.mark.asyncio
+    async def test_calls_share_the_session(self, manager, server):
+        first = await call_api(str(server.make_url("/ok")), "GET")
+        session = await manager.get_session()
+        second = await call_api(str(server.make_url("/ok")), "GET")
+
+        assert first == second == {"status": "ok"}
+        assert await manager.get_session() is session
+        host = manager.get_metrics()["hosts"][f"{server.host}:{server.port}"]
+        assert host["requests"] == 2
+        assert host["errors"] == 0
+
+    @pytest.mark.asyncio
+    async def test_http_errors_are_counted(self, manager, server):
+        with pytest.raises(APICallExcetion):
+            await call_api(str(server.make_url("/error")), "GET")
+
+        host = manager.get_metrics()["hosts"][f"{server.host}:{server.port}"]
+        assert host["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_connection_errors_are_counted(self, manager, unused_tcp_port):
+        url = f"http://127.0.0.1:{unused_tcp_port}/ok"
+
+        with pytest.raises(APICallExcetion):
+            await call_api(url, "GET", timeout=2)
+
+        host = manager.get_metrics()["hosts"][f"127.0.0.1:{unused_tcp_port}"]
+        assert host["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_client_errors_do_not_open_circuit(self, manager, server):
+        for _ in range(3):
+            with pytest.raises(APICallExcetion):
+                await call_api(str(server.make_url("/not_found")), "GET")
+
+        breaker = http_client.circuit_breakers.get(f"{server.host}:{server.port}")
+        assert breaker.state == breaker.CLOSED
+
+        for _ in range(2):
+            with pytest.raises(APICallExcetion):
+                await call_api(str(server.make_url("/error")), "GET")
+        assert breaker.state == breaker.OPEN
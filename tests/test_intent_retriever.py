@@ -0,0 +1,34 @@
+from app.bot.nlu.llm.intent_retriever import IntentRetriever
+
+
+def get_retriever():
+    return IntentRetriever(
+        {
+            "greet": ["Greeting", "hello", "hi there", "good morning"],
+            "order_pizza": ["Order Pizza", "I want a large pizza", "order a pizza"],
+            "order_status": ["Order Status", "where is my order", "track my order"],
+            "store_hours": ["Store Hours", "when do you open", "opening hours"],
+        }
+    )
+
+
+class TestIntentRetriever:
+    def test_search_returns_closest_intents(self):
+        retriever = get_retriever()
+
+        candidates = retriever.search("can I get a pizza", top_k=2)
+
+        assert len(candidates) == 2
+        assert candidates[0] == "order_pizza"
+
+    def test_search_returns_all_intents_when_k_is_large(self):
+        retriever = get_retriever()
+
+        candidates = retriever.search("hello", top_k=10)
+
+        assert set(candidates) == {
+            "greet",
+            "order_pizza",
+            "order_status",
+            "store_hours",
+        }
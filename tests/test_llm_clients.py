@@ -0,0 +1,48 @@
+import pytest
+from app.bot.nlu.llm import clients
+
+
+@pytest.fixture(autouse=True)
+def registries():
+    clients.close_llm_clients()
+    yield
+    clients.close_llm_clients()
+
+
+def get_chat_model(base_url="http://llm.example.com/v1", api_key="key", **kwargs):
+    settings = dict(model_name="gpt", temperature=0.0, max_tokens=100)
+    settings.update(kwargs)
+    return clients.get_chat_model(base_url=base_url, api_key=api_key, **settings)
+
+
+class TestLLMClients:
+    def test_settings_changes_share_the_http_client(self):
+        get_chat_model(api_key="old")
+        get_chat_model(api_key="new", temperature=0.5)
+
+        assert len(clients._http_clients) == 1
+        assert len(clients._chat_models) == 2
+
+    def test_least_recently_used_http_clients_are_closed(self, monkeypatch):
+        monkeypatch.setattr(clients, "MAX_HTTP_CLIENTS", 2)
+        get_chat_model(base_url="http://a.example.com/v1")
+        first = clients._http_clients["http://a.example.com/v1"]
+
+        get_chat_model(base_url="http://b.example.com/v1")
+        get_chat_model(base_url="http://c.example.com/v1")
+
+        assert list(clients._http_clients) == [
+            "http://b.example.com/v1",
+            "http://c.example.com/v1",
+        ]
+        assert first.is_closed
+        chat_model = get_chat_model(base_url="http://a.example.com/v1")
+        assert not chat_model.http_client.is_closed
+
+    def test_chat_models_are_bounded(self, monkeypatch):
+        monkeypatch.setattr(clients, "MAX_CHAT_MODELS", 2)
+
+        for temperature in range(3):
+            get_chat_model(temperature=float(temperature))
+
+        assert len(clients._chat_models) == 2
@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import Mock
+from app.bot.nlu.pipeline import NLUComponent
+from app.bot.nlu.llm.llm_fallback import LLMFallbackClassifier
+
+
+@pytest.fixture
+def mock_llm_component():
+    component = Mock(spec=NLUComponent)
+    component.process.return_value = {
+        "intent": {"intent": "order_pizza", "confidence": 1.0},
+        "intent_ranking": [{"intent": "order_pizza", "confidence": 1.0}],
+        "entities": {"toppings": "pepperoni"},
+    }
+    return component
+
+
+@pytest.fixture
+def llm_fallback(mock_llm_component):
+    return LLMFallbackClassifier(mock_llm_component, confidence_threshold=0.75)
+
+
+class TestLLMFallbackClassifier:
+    def test_confident_prediction_is_kept(self, llm_fallback, mock_llm_component):
+        message = {
+            "text": "hello",
+            "intent": {"intent": "greet", "confidence": 0.95},
+            "entities": {},
+        }
+
+        result = llm_fallback.process(message)
+
+        mock_llm_component.process.assert_not_called()
+        assert result["intent"]["intent"] == "greet"
+
+    def test_low_confidence_is_escalated(self, llm_fallback, mock_llm_component):
+        message = {
+            "text": "large one with pepperoni please",
+            "intent": {"intent": "greet", "confidence": 0.40},
+            "entities": {"size": "large"},
+        }
+
+        result = llm_fallback.process(message)
+
+        mock_llm_component.process.assert_called_once_with(
+            {"text": "large one with pepperoni please"}
+        )
+        assert result["intent"]["intent"] == "order_pizza"
+        assert result["entities"] == {"size": "large", "toppings": "pepperoni"}
+
+    def test_unresolved_llm_intent_keeps_prediction(
+        self, llm_fallback, mock_llm_component
+    ):
+        mock_llm_component.process.return_value = {
+            "intent": {"intent": None, "confidence": 0.0},
+            "entities": {},
+        }
+        message = {
+            "text": "gibberish",
+            "intent": {"intent": "greet", "confidence": 0.40},
+            "entities": {},
+        }
+
+        result = llm_fallback.process(message)
+
+        assert result["intent"] == {"intent": "greet", "confidence": 0.40}
+
+    def test_commands_are_not_escalated(self, llm_fallback, mock_llm_component):
+        message = {"text": "/cancel", "intent": {"intent": None, "confidence": 0.0}}
+
+        llm_fallback.process(message)
+
+        mock_llm_component.process.assert_not_called()
+
+    def test_escalation_rate_metric(self, llm_fallback):
+        llm_fallback.process(
+            {"text": "hello", "intent": {"intent": "greet", "confidence": 0.95}}
+        )
+        llm_fallback.process(
+            {"text": "hmm", "intent": {"intent": "greet", "confidence": 0.10}}
+        )
+
+        metrics = llm_fallback.get_metrics()
+
+        assert metrics["total_messages"] == 2
+        assert metrics["escalated_messages"] == 1
+        assert metrics["escalation_rate"] == 0.5
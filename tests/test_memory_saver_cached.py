@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from app.bot.memory import MemorySaverInMemory
+from app.bot.memory.memory_saver_cached import CachedMemorySaver
+from tests.helpers import make_state
+
+
+@pytest.fixture
+def backend():
+    backend = MemorySaverInMemory()
+    backend.get = AsyncMock(wraps=backend.get)
+    return backend
+
+
+@pytest.fixture
+def cached_saver(backend, clock):
+    return CachedMemorySaver(backend, max_size=2, ttl=60, clock=clock)
+
+
+class TestCachedMemorySaver:
+    @pytest.mark.asyncio
+    async def test_saved_state_is_read_from_cache(self, cached_saver, backend):
+        await cached_saver.save("user1", make_state("user1", name="bob"))
+
+        state = await cached_saver.get("user1")
+
+        assert state.context == {"name": "bob"}
+        backend.get.assert_not_called()
+        assert cached_saver.get_metrics()["hit_rate"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_cached_state_is_a_copy(self, cached_saver):
+        await cached_saver.save("user1", make_state("user1", name="bob"))
+
+        state = await cached_saver.get("user1")
+        state.context["name"] = "alice"
+
+        assert (await cached_saver.get("user1")).context == {"name": "bob"}
+
+    @pytest.mark.asyncio
+    async def test_idle_threads_expire(self, cached_saver, backend, clock):
+        await cached_saver.save("user1", make_state("user1"))
+
+        clock.now = 61
+        await cached_saver.get("user1")
+
+        backend.get.assert_called_once_with("user1")
+        assert cached_saver.get_metrics()["expirations"] == 1
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_thread_is_evicted(self, cached_saver):
+        for thread_id in ["user1", "user2"]:
+            await cached_saver.save(thread_id, make_state(thread_id))
+        await cached_saver.get("user1")
+        await cached_saver.save("user3", make_state("user3"))
+
+        assert list(cached_saver.entries) == ["user1", "user3"]
+        assert cached_saver.get_metrics()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_on_save_of_another_node(self, backend):
+        node1 = CachedMemorySaver(backend)
+        node2 = CachedMemorySaver(backend)
+        node1.on_save(node2.invalidate)
+
+        await node2.save("user1", make_state("user1", step=1))
+        await node1.save("user1", make_state("user1", step=2))
+
+        assert (await node2.get("user1")).context == {"step": 2}
+
+    @pytest.mark.asyncio
+    async def test_failed_save_invalidates(self, cached_saver, backend):
+        await cached_saver.save("user1", make_state("user1"))
+        backend.save = AsyncMock(side_effect=RuntimeError("db down"))
+
+        with pytest.raises(RuntimeError):
+            await cached_saver.save("user1", make_state("user1"))
+
+        assert "user1" not in cached_saver.entries
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_lookup(self, cached_saver, backend):
+        await backend.save("user1", make_state("user1", name="bob"))
+
+        async def slow_get(thread_id):
+            await asyncio.sleep(0.01)
+            return make_state(thread_id, name="bob")
+
+        backend.get.side_effect = slow_get
+
+        states = await asyncio.gather(*[cached_saver.get("user1") for _ in range(3)])
+
+        assert backend.get.call_count == 1
+        assert [state.context for state in states] == [{"name": "bob"}] * 3
+        assert states[0] is not states[1]
+        assert cached_saver.loading == {}
@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from app.bot.memory import MemorySaverInMemory
+from app.bot.memory.models import State
+from tests.helpers import FakeClock
+
+
+class TestMemorySaverInMemory:
+    @pytest.mark.asyncio
+    async def test_history_is_capped(self):
+        memory_saver = MemorySaverInMemory(max_history=3)
+
+        for turn in range(5):
+            await memory_saver.save("user1", State("user1", context={"turn": turn}))
+
+        states = await memory_saver.get_all("user1")
+        assert [state.context["turn"] for state in states] == [2, 3, 4]
+        assert (await memory_saver.get("user1")).context["turn"] == 4
+        assert memory_saver.get_metrics()["dropped_states"] == 2
+
+    @pytest.mark.asyncio
+    async def test_states_are_copied(self):
+        memory_saver = MemorySaverInMemory()
+        state = State("user1")
+        for text in ["one", "two", "three"]:
+            state.context["text"] = text
+            await memory_saver.save("user1", state)
+
+        latest = await memory_saver.get("user1")
+        latest.context["text"] = "changed"
+
+        states = await memory_saver.get_all("user1")
+        assert [s.context["text"] for s in states] == ["one", "two", "three"]
+        assert (await memory_saver.get("user1")).context["text"] == "three"
+
+    @pytest.mark.asyncio
+    async def test_idle_threads_expire(self):
+        clock = FakeClock()
+        memory_saver = MemorySaverInMemory(ttl=60, clock=clock)
+        await memory_saver.save("user1", State("user1"))
+        clock.now = 30
+        await memory_saver.save("user2", State("user2"))
+
+        clock.now = 70
+
+        assert await memory_saver.get("user1") is None
+        assert await memory_saver.get("user2") is not None
+        assert memory_saver.get_metrics()["expired_threads"] == 1
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_threads_are_evicted(self):
+        memory_saver = MemorySaverInMemory(max_states=4, num_shards=1)
+        for thread_id in ["user1", "user2"]:
+            await memory_saver.save(thread_id, State(thread_id))
+            await memory_saver.save(thread_id, State(thread_id))
+        await memory_saver.get("user1")
+
+        await memory_saver.save("user3", State("user3"))
+
+        assert await memory_saver.get("user2") is None
+        assert await memory_saver.get("user1") is not None
+        metrics = memory_saver.get_metrics()
+        assert metrics["evicted_threads"] == 1
+        assert metrics["states"] == 3
+
+    @pytest.mark.asyncio
+    async def test_thread_just_saved_is_not_evicted(self):
+        memory_saver = MemorySaverInMemory(max_states=1, num_shards=1)
+
+        await memory_saver.save("user1", State("user1"))
+        await memory_saver.save("user1", State("user1"))
+
+        assert len(await memory_saver.get_all("user1")) == 2
+
+    @pytest.mark.asyncio
+    async def test_budget_is_shared_between_shards(self):
+        memory_saver = MemorySaverInMemory(max_states=3, num_shards=4)
+        shard = memory_saver._shard("user0")
+        same_shard = [
+            thread_id
+            for thread_id in (f"user{i}" for i in range(100))
+            if memory_saver._shard(thread_id) is shard
+        ][:3]
+
+        for thread_id in same_shard:
+            await memory_saver.save(thread_id, State(thread_id))
+
+        assert memory_saver.get_metrics()["evicted_threads"] == 0
+
+    def test_concurrent_saves_from_threads(self):
+        memory_saver = MemorySaverInMemory(max_history=None, max_states=None)
+
+        def work(thread_id):
+            for _ in range(100):
+                asyncio.run(memory_saver.save(thread_id, State(thread_id)))
+
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(work, [f"user{i % 4}" for i in range(8)]))
+
+        assert memory_saver.get_metrics() == {
+            "threads": 4,
+            "states": 800,
+            "expired_threads": 0,
+            "evicted_threads": 0,
+            "dropped_states": 0,
+        }
@@ -0,0 +1,179 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import BulkWriteError
+from app.bot.memory.codec import decode_state, encode_state
+from app.bot.memory.delta import HistoryEncoder
+from app.bot.memory.memory_saver_mongo import MemorySaverMongo
+from tests.helpers import make_state
+
+
+@pytest.fixture
+def memory_saver():
+    collections = {
+        "state": AsyncMock(),
+        "latest_state": AsyncMock(),
+        "state_archive": AsyncMock(),
+        "thread_summary": AsyncMock(),
+    }
+    client = MagicMock()
+    client.get_database.return_value.get_collection.side_effect = (
+        lambda name: collections[name]
+    )
+    return MemorySaverMongo(client)
+
+
+class TestMemorySaverMongo:
+    @pytest.mark.asyncio
+    async def test_save_appends_history_and_upserts_latest(self, memory_saver):
+        await memory_saver.save("user1", make_state("user1"))
+
+        memory_saver.collection.insert_one.assert_called_once()
+        filter, document = memory_saver.latest_collection.replace_one.call_args.args
+        assert filter == {"thread_id": "user1"}
+        assert decode_state(document["state"]).thread_id == "user1"
+        assert memory_saver.latest_collection.replace_one.call_args.kwargs == {
+            "upsert": True
+        }
+
+    @pytest.mark.asyncio
+    async def test_save_many_upserts_last_state_per_thread(self, memory_saver):
+        await memory_saver.save_many(
+            [
+                make_state("user1", turn=1),
+                make_state("user2", turn=1),
+                make_state("user1", turn=2),
+            ]
+        )
+
+        requests = memory_saver.latest_collection.bulk_write.call_args.args[0]
+        latest = {
+            r._filter["thread_id"]: decode_state(r._doc["state"]).context
+            for r in requests
+        }
+        assert latest == {"user1": {"turn": 2}, "user2": {"turn": 1}}
+
+    @pytest.mark.asyncio
+    async def test_get_reads_latest_state(self, memory_saver):
+        memory_saver.latest_collection.find_one.return_value = {
+            "state": encode_state(make_state("user1", name="bob"))
+        }
+
+        state = await memory_saver.get("user1")
+
+        assert state.context == {"name": "bob"}
+        memory_saver.collection.find_one.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_falls_back_to_history(self, memory_saver):
+        memory_saver.latest_collection.find_one.return_value = None
+        encoder = HistoryEncoder()
+        history = [
+            encoder.encode(make_state("user1", turn=turn)) for turn in range(3)
+        ]
+        memory_saver.collection.find = MagicMock()
+        memory_saver.collection.find.return_value.to_list = AsyncMock(
+            return_value=history[::-1]
+        )
+
+        state = await memory_saver.get("user1")
+
+        assert state.context == {"turn": 2}
+
+    @pytest.mark.asyncio
+    async def test_history_is_delta_encoded(self, memory_saver):
+        await memory_saver.save("user1", make_state("user1", name="bob"))
+        await memory_saver.save("user1", make_state("user1", name="bob", turn=2))
+
+        first, second = [
+            call.args[0] for call in memory_saver.collection.insert_one.call_args_list
+        ]
+        assert first["context"] == {"name": "bob"}
+        assert "context" not in second
+        assert second["delta"] == {"context": {"set": {"turn": 2}}}
+
+    @pytest.mark.asyncio
+    async def test_save_updates_thread_summary(self, memory_saver):
+        state = make_state("user1")
+        state.intent = {"id": "fallback"}
+
+        await memory_saver.save("user1", state)
+
+        (document,) = memory_saver.collection.insert_one.call_args.args
+        (request,) = memory_saver.summary_collection.bulk_write.call_args.args[0]
+        assert request._filter == {
+            "thread_id": "user1",
+            "last_id": {"$ne": document["_id"]},
+        }
+        assert request._doc["$inc"] == {"turn_count": 1, "fallback_count": 1}
+        assert request._doc["$set"] == {
+            "last_intent": "fallback",
+            "last_id": document["_id"],
+            "archived": False,
+        }
+
+    @pytest.mark.asyncio
+    async def test_save_many_updates_summary_once_per_thread(self, memory_saver):
+        states = [make_state("user1"), make_state("user2"), make_state("user1")]
+        states[2].intent = {"id": "order_pizza"}
+
+        await memory_saver.save_many(states)
+
+        documents = memory_saver.collection.insert_many.call_args.args[0]
+        requests = memory_saver.summary_collection.bulk_write.call_args.args[0]
+        updates = {r._filter["thread_id"]: r._doc for r in requests}
+        assert updates["user1"]["$inc"]["turn_count"] == 2
+        assert updates["user1"]["$set"] == {
+            "last_intent": "order_pizza",
+            "last_id": documents[2]["_id"],
+            "archived": False,
+        }
+        assert updates["user1"]["$min"] == {"first_date": states[0].date}
+        assert updates["user2"]["$inc"]["turn_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_batch_retries_write_the_same_documents(self, memory_saver):
+        states = [make_state("user1", turn=1), make_state("user1", turn=2)]
+        history, _, _ = memory_saver.batch_writes(states)
+        duplicate = BulkWriteError(
+            {"writeErrors": [{"code": 11000, "index": 0}], "writeConcernErrors": []}
+        )
+        memory_saver.collection.insert_many.side_effect = duplicate
+
+        await history()
+        await history()
+
+        first, second = memory_saver.collection.insert_many.call_args_list
+        assert first.args[0] is second.args[0]
+        assert second.args[0][1]["delta"] == {"context": {"set": {"turn": 2}}}
+        # the encoder still knows the thread, the next turn is a delta
+        assert "user1" in memory_saver.history_encoder.threads
+
+    @pytest.mark.asyncio
+    async def test_duplicate_summary_upsert_is_applied_as_update(self, memory_saver):
+        # another process created the summary of user2 at the same time
+        memory_saver.summary_collection.bulk_write.side_effect = [
+            BulkWriteError(
+                {"writeErrors": [{"code": 11000, "index": 1}], "writeConcernErrors": []}
+            ),
+            None,
+        ]
+
+        await memory_saver.save_many([make_state("user1"), make_state("user2")])
+
+        retry = memory_saver.summary_collection.bulk_write.call_args.args[0]
+        (request,) = retry
+        assert request._filter["thread_id"] == "user2"
+        assert request._upsert is False
+        assert request._doc["$inc"]["turn_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_history_insert_is_raised(self, memory_saver):
+        memory_saver.collection.insert_many.side_effect = BulkWriteError(
+            {"writeErrors": [{"code": 121, "index": 0}], "writeConcernErrors": []}
+        )
+
+        with pytest.raises(BulkWriteError):
+            await memory_saver.save_many([make_state("user1")])
+
+        assert "user1" not in memory_saver.history_encoder.threads
+        memory_saver.latest_collection.bulk_write.assert_not_called()
@@ -0,0 +1,56 @@
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock
+from app.database_postgres import _encode_json
+from app.bot.memory.codec import decode_state, encode_state
+from app.bot.memory.memory_saver_postgres import MemorySaverPostgreSQL
+from tests.helpers import make_state
+
+
+@pytest.fixture
+def memory_saver():
+    memory_saver = MemorySaverPostgreSQL()
+    memory_saver.db = AsyncMock()
+    return memory_saver
+
+
+class TestMemorySaverPostgreSQL:
+    def test_json_encoder(self):
+        assert _encode_json('{"a": 1}') == '{"a": 1}'
+        assert _encode_json({"date": datetime(2024, 1, 1)}) == (
+            '{"date":"2024-01-01T00:00:00"}'
+        )
+
+    @pytest.mark.asyncio
+    async def test_save_appends_history_and_upserts_latest(self, memory_saver):
+        await memory_saver.save("user1", make_state("user1"))
+
+        query, thread_id, state_data, state_bytes = (
+            memory_saver.db.execute.call_args.args
+        )
+        assert "ON CONFLICT (thread_id)" in query
+        assert thread_id == "user1"
+        assert state_data["thread_id"] == "user1"
+        assert decode_state(state_bytes).thread_id == "user1"
+
+    @pytest.mark.asyncio
+    async def test_get_decodes_latest_state(self, memory_saver):
+        memory_saver.db.fetchval.return_value = encode_state(
+            make_state("user1", name="bob")
+        )
+
+        state = await memory_saver.get("user1")
+
+        assert state.context == {"name": "bob"}
+        assert memory_saver.db.fetchval.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_get_falls_back_to_history(self, memory_saver):
+        memory_saver.db.fetchval.return_value = None
+        memory_saver.db.fetch.return_value = [
+            {"state_data": make_state("user1", name="bob").to_dict()}
+        ]
+
+        state = await memory_saver.get("user1")
+
+        assert state.context == {"name": "bob"}
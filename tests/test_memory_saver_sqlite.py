@@ -0,0 +1,77 @@
+import asyncio
+import sqlite3
+import pytest
+import pytest_asyncio
+from app.bot.memory.memory_saver_sqlite import MemorySaverSQLite
+from tests.helpers import make_state
+
+
+@pytest_asyncio.fixture
+async def memory_saver(tmp_path):
+    memory_saver = MemorySaverSQLite(str(tmp_path / "state.db"))
+    yield memory_saver
+    await memory_saver.close()
+
+
+class TestMemorySaverSQLite:
+    @pytest.mark.asyncio
+    async def test_save_and_get(self, memory_saver):
+        await memory_saver.save("user1", make_state("user1", turn=1))
+        await memory_saver.save("user1", make_state("user1", turn=2))
+
+        assert (await memory_saver.get("user1")).context == {"turn": 2}
+        assert [s.context["turn"] for s in await memory_saver.get_all("user1")] == [
+            2,
+            1,
+        ]
+        assert await memory_saver.get("user2") is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_saves_share_commits(self, memory_saver):
+        await asyncio.gather(
+            *[
+                memory_saver.save(f"user{i % 10}", make_state(f"user{i % 10}", turn=i))
+                for i in range(200)
+            ]
+        )
+
+        metrics = memory_saver.get_metrics()
+        assert metrics["writes"] == 200
+        assert metrics["commits"] < 200
+        assert len(await memory_saver.get_all("user3")) == 20
+
+    @pytest.mark.asyncio
+    async def test_bad_row_does_not_fail_other_saves(self, memory_saver):
+        connection = sqlite3.connect(memory_saver.path)
+        connection.execute(
+            "CREATE TRIGGER reject_bad BEFORE INSERT ON state_history"
+            " WHEN NEW.thread_id = 'bad' BEGIN SELECT RAISE(ABORT, 'bad row'); END"
+        )
+        connection.commit()
+        connection.close()
+
+        results = await asyncio.gather(
+            *[
+                memory_saver.save(thread_id, make_state(thread_id, turn=1))
+                for thread_id in ["user1", "bad", "user2"] * 10
+            ],
+            return_exceptions=True,
+        )
+
+        assert [isinstance(result, sqlite3.Error) for result in results] == [
+            False,
+            True,
+            False,
+        ] * 10
+        assert len(await memory_saver.get_all("user1")) == 10
+        assert len(await memory_saver.get_all("user2")) == 10
+        assert await memory_saver.get("bad") is None
+
+    @pytest.mark.asyncio
+    async def test_state_survives_reopen(self, memory_saver):
+        await memory_saver.save("user1", make_state("user1", name="bob"))
+        await memory_saver.close()
+
+        reopened = MemorySaverSQLite(memory_saver.path)
+        assert (await reopened.get("user1")).context == {"name": "bob"}
+        await reopened.close()
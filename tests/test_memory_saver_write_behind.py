@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from app.bot.memory import MemorySaverInMemory
+from app.bot.memory.memory_saver_write_behind import WriteBehindMemorySaver
+from tests.helpers import make_state
+
+
+@pytest.fixture
+def backend():
+    backend = MemorySaverInMemory()
+    backend.save_many = AsyncMock(wraps=backend.save_many)
+    return backend
+
+
+class TestWriteBehindMemorySaver:
+    @pytest.mark.asyncio
+    async def test_states_are_written_in_batches(self, backend):
+        saver = WriteBehindMemorySaver(backend, flush_size=3, flush_interval=10)
+
+        for i in range(3):
+            await saver.save("user1", make_state("user1", turn=i))
+        await saver.flush()
+
+        backend.save_many.assert_called_once()
+        assert [s.context["turn"] for s in await backend.get_all("user1")] == [
+            0,
+            1,
+            2,
+        ]
+        await saver.close()
+
+    @pytest.mark.asyncio
+    async def test_partial_batch_is_flushed_after_interval(self, backend):
+        saver = WriteBehindMemorySaver(backend, flush_size=100, flush_interval=0.01)
+
+        await saver.save("user1", make_state("user1"))
+        await asyncio.sleep(0.05)
+
+        assert len(await backend.get_all("user1")) == 1
+        assert saver.pending == {}
+        await saver.close()
+
+    @pytest.mark.asyncio
+    async def test_pending_state_is_readable(self, backend):
+        saver = WriteBehindMemorySaver(backend, flush_size=100, flush_interval=10)
+
+        await saver.save("user1", make_state("user1", name="bob"))
+
+        assert await backend.get("user1") is None
+        assert (await saver.get("user1")).context == {"name": "bob"}
+        await saver.close()
+
+    @pytest.mark.asyncio
+    async def test_close_drains_queue(self, backend):
+        saver = WriteBehindMemorySaver(backend, flush_size=2, flush_interval=10)
+
+        for i in range(5):
+            await saver.save(f"user{i}", make_state(f"user{i}"))
+        await saver.close()
+
+        assert backend.get_metrics()["threads"] == 5
+        assert saver.get_metrics()["flushed"] == 5
+
+    @pytest.mark.asyncio
+    async def test_save_waits_when_queue_is_full(self, backend):
+        release = asyncio.Event()
+
+        async def slow_save_many(states):
+            await release.wait()
+
+        backend.save_many = AsyncMock(side_effect=slow_save_many)
+        saver = WriteBehindMemorySaver(
+            backend, flush_size=1, flush_interval=0, max_queue_size=1
+        )
+
+        await saver.save("user1", make_state("user1"))
+        await asyncio.sleep(0)  # writer takes the first state
+        await saver.save("user2", make_state("user2"))
+        blocked = asyncio.create_task(saver.save("user3", make_state("user3")))
+        await asyncio.sleep(0.01)
+
+        assert not blocked.done()
+        release.set()
+        await blocked
+        await saver.close()
+
+    @pytest.mark.asyncio
+    async def test_retry_only_redoes_failed_step(self, backend):
+        history, latest = AsyncMock(), AsyncMock(side_effect=[OSError, None])
+        backend.batch_writes = lambda states: [history, latest]
+        saver = WriteBehindMemorySaver(backend, flush_size=1, flush_interval=0)
+
+        await saver.save("user1", make_state("user1"))
+        await saver.flush()
+
+        assert history.await_count == 1
+        assert latest.await_count == 2
+        assert saver.get_metrics()["flushed"] == 1
+        await saver.close()
+
+    @pytest.mark.asyncio
+    async def test_dropped_state_stays_readable(self, backend):
+        saver = WriteBehindMemorySaver(
+            backend, flush_size=1, flush_interval=0, max_retries=1
+        )
+        backend.save_many.side_effect = OSError
+
+        await saver.save("user1", make_state("user1", turn=1))
+        await saver.flush()
+
+        assert saver.get_metrics()["dropped"] == 1
+        assert (await saver.get("user1")).context == {"turn": 1}
+
+        backend.save_many.side_effect = None
+        await saver.save("user1", make_state("user1", turn=2))
+        await saver.flush()
+
+        assert saver.pending == {}
+        assert (await saver.get("user1")).context == {"turn": 2}
+        await saver.close()
+
+    @pytest.mark.asyncio
+    async def test_get_all_includes_pending_states(self, backend):
+        saver = WriteBehindMemorySaver(backend, flush_size=2, flush_interval=10)
+
+        for turn in range(3):
+            await saver.save("user1", make_state("user1", turn=turn))
+        await asyncio.sleep(0)
+
+        states = await saver.get_all("user1")
+
+        assert [state.context["turn"] for state in states] == [2, 1, 0]
+        await saver.close()
@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from app.bot.dialogue_manager.response_cache import APIResponseCache
+
+
+class TestAPIResponseCache:
+    @pytest.mark.asyncio
+    async def test_fresh_entries_are_served_from_cache(self, clock):
+        cache = APIResponseCache(ttl=60, clock=clock)
+        fetch = AsyncMock(return_value={"status": "shipped"})
+
+        await cache.get_or_fetch("order/1", fetch)
+        clock.now = 30
+        result = await cache.get_or_fetch("order/1", fetch)
+
+        assert result == {"status": "shipped"}
+        assert fetch.await_count == 1
+        assert cache.get_metrics()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_fetched_again(self, clock):
+        cache = APIResponseCache(ttl=60, clock=clock)
+        fetch = AsyncMock(side_effect=[{"status": "packed"}, {"status": "shipped"}])
+
+        await cache.get_or_fetch("order/1", fetch)
+        clock.now = 61
+        result = await cache.get_or_fetch("order/1", fetch)
+
+        assert result == {"status": "shipped"}
+        assert fetch.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_stale_entries_are_revalidated_in_background(self, clock):
+        cache = APIResponseCache(ttl=60, stale_ttl=60, clock=clock)
+        fetch = AsyncMock(side_effect=[{"status": "packed"}, {"status": "shipped"}])
+
+        await cache.get_or_fetch("order/1", fetch)
+        clock.now = 90
+        stale = await cache.get_or_fetch("order/1", fetch)
+        await asyncio.sleep(0)
+
+        assert stale == {"status": "packed"}
+        assert fetch.await_count == 2
+        assert await cache.get_or_fetch("order/1", fetch) == {"status": "shipped"}
+
+    @pytest.mark.asyncio
+    async def test_size_cap_evicts_least_recently_used(self, clock):
+        cache = APIResponseCache(ttl=60, max_size=2, clock=clock)
+
+        for key in ["a", "b", "c"]:
+            await cache.get_or_fetch(key, AsyncMock(return_value=key))
+
+        assert list(cache.entries) == ["b", "c"]
@@ -0,0 +1,80 @@
+import pytest
+from jinja2 import TemplateSyntaxError
+from app.bot.dialogue_manager.dialogue_manager import DialogueManager
+from app.bot.dialogue_manager.models import IntentModel
+from jinja2 import Environment, FunctionLoader
+from app.bot.dialogue_manager import utils
+from app.bot.dialogue_manager.utils import (
+    BoundedBytecodeCache,
+    ResponseTemplate,
+    compile_template,
+)
+
+
+class TestResponseTemplate:
+    @pytest.mark.asyncio
+    async def test_text_without_markup_is_not_compiled(self):
+        template = ResponseTemplate("Hello!###How are you?")
+
+        assert template.template is None
+        assert await template.render(name="bob") == "Hello!###How are you?"
+        assert await template.render_sentences() == ["Hello!", "How are you?"]
+
+    @pytest.mark.asyncio
+    async def test_renders_markup(self):
+        template = ResponseTemplate("Hello {{ context.name }}###Bye")
+
+        sentences = await template.render_sentences(context={"name": "bob"})
+
+        assert sentences == ["Hello bob", "Bye"]
+
+    @pytest.mark.asyncio
+    async def test_undefined_values_are_silent(self):
+        template = ResponseTemplate("Hello {{ context.name }}")
+
+        assert await template.render(context={}) == "Hello "
+
+    def test_identical_sources_share_compiled_template(self):
+        assert compile_template("{{ a }} b") is compile_template("{{ a }} b")
+
+    def test_sources_are_not_kept_after_compiling(self):
+        compile_template("{{ edited }} response")
+
+        assert utils._template_sources == {}
+
+    def test_bytecode_cache_is_bounded(self, tmp_path):
+        sources = {f"t{i}": f"{{{{ a }}}} {i}" for i in range(3)}
+        env = Environment(
+            loader=FunctionLoader(sources.get),
+            bytecode_cache=BoundedBytecodeCache(max_files=2, directory=str(tmp_path)),
+        )
+
+        for name in sources:
+            env.get_template(name)
+
+        assert len(list(tmp_path.iterdir())) == 2
+
+    @pytest.mark.asyncio
+    async def test_syntax_error_raises_on_render(self):
+        template = ResponseTemplate("Hello {{ name ")
+
+        assert template.error is not None
+        with pytest.raises(TemplateSyntaxError):
+            await template.render_sentences(name="bob")
+
+    def test_invalid_template_only_fails_its_intent(self):
+        intents = [
+            IntentModel(name="Broken", intent_id="broken", speech_response="{{ x "),
+            IntentModel(name="Greet", intent_id="greet", speech_response="Hi"),
+        ]
+
+        dialogue_manager = DialogueManager(
+            memory_saver=None,
+            intents=intents,
+            nlu_pipeline=None,
+            fallback_intent_id="greet",
+            intent_confidence_threshold=0.9,
+        )
+
+        assert dialogue_manager.templates["broken"]["speech_response"].error
+        assert dialogue_manager.templates["greet"]["speech_response"].error is None
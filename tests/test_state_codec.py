@@ -0,0 +1,79 @@
+import orjson
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from app.bot.memory.codec import (
+    CODEC_VERSION,
+    FLAG_ZSTD,
+    StateCodecException,
+    decode_state,
+    encode_state,
+)
+from app.bot.memory.models import State
+
+
+@pytest.fixture
+def state():
+    state = State(
+        thread_id="user1",
+        context={"name": "bob"},
+        intent={"id": "order_pizza"},
+        parameters=[{"name": "size", "type": "pizza_size", "required": True}],
+        extracted_parameters={"size": "large"},
+        missing_parameters=["toppings"],
+        current_node="toppings",
+    )
+    state.turn_id = "abc"
+    return state
+
+
+class TestStateCodec:
+    def test_round_trip(self, state):
+        decoded = decode_state(encode_state(state))
+
+        for field in [
+            "thread_id",
+            "context",
+            "intent",
+            "parameters",
+            "extracted_parameters",
+            "missing_parameters",
+            "complete",
+            "current_node",
+            "date",
+            "turn_id",
+        ]:
+            assert getattr(decoded, field) == getattr(state, field)
+
+    def test_large_states_are_compressed(self, state):
+        state.context["history"] = "lorem ipsum " * 200
+
+        data = encode_state(state)
+
+        assert data[0] == CODEC_VERSION | FLAG_ZSTD
+        assert len(data) < len(encode_state(state, compress=False))
+        assert decode_state(data).context == state.context
+
+    def test_small_states_are_not_compressed(self, state):
+        assert encode_state(state)[0] == CODEC_VERSION
+
+    def test_unknown_version(self, state):
+        data = bytes([CODEC_VERSION + 1]) + encode_state(state)[1:]
+
+        with pytest.raises(StateCodecException):
+            decode_state(data)
+
+    def test_payload_without_turn_id(self, state):
+        values = orjson.loads(encode_state(state)[1:])[:-1]
+
+        decoded = decode_state(bytes([CODEC_VERSION]) + orjson.dumps(values))
+
+        assert decoded.turn_id is None
+        assert decoded.current_node == "toppings"
+
+    @pytest.mark.parametrize("value", [Decimal("1.5"), datetime(2024, 1, 1), {1}])
+    def test_non_json_values_are_rejected(self, state, value):
+        state.context["value"] = value
+
+        with pytest.raises(StateCodecException):
+            encode_state(state)
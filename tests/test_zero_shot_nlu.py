@@ -0,0 +1,136 @@
+import pytest
+from unittest.mock import Mock
+from app.bot.nlu.llm import ZeroShotNLUOpenAI
+from app.bot.nlu.llm.intent_retriever import IntentRetriever
+
+
+def partial_outputs():
+    yield {"intent": "gre"}
+    yield {"intent": "greet"}
+    yield {"intent": "greet", "entities": {}}
+    raise AssertionError("stream should have been stopped")
+
+
+@pytest.fixture
+def zero_shot_nlu():
+    return ZeroShotNLUOpenAI(
+        intents=["greet", "order_pizza"],
+        entities=["size"],
+        intent_entities={"greet": [], "order_pizza": ["size"]},
+        streaming=True,
+        api_key="test",
+    )
+
+
+class TestZeroShotNLUOpenAI:
+    def test_streaming_stops_when_intent_has_no_entities(self, zero_shot_nlu):
+        zero_shot_nlu.chain = Mock()
+        zero_shot_nlu.chain.stream.return_value = partial_outputs()
+
+        message = zero_shot_nlu.process({"text": "hello"})
+
+        assert message["intent"] == {"intent": "greet", "confidence": 1.0}
+        assert message["entities"] == {}
+
+    def test_streaming_waits_for_entities(self, zero_shot_nlu):
+        zero_shot_nlu.chain = Mock()
+        zero_shot_nlu.chain.stream.return_value = (
+            partial
+            for partial in [
+                {"intent": "order_pizza"},
+                {"intent": "order_pizza", "entities": {}},
+                {"intent": "order_pizza", "entities": {"size": "lar"}},
+                {"intent": "order_pizza", "entities": {"size": "large"}},
+            ]
+        )
+
+        message = zero_shot_nlu.process({"text": "a large pizza"})
+
+        assert message["intent"]["intent"] == "order_pizza"
+        assert message["entities"] == {"size": "large"}
+
+    def test_streaming_waits_for_intent_after_entities(self, zero_shot_nlu):
+        zero_shot_nlu.chain = Mock()
+        zero_shot_nlu.chain.stream.return_value = iter(
+            [
+                {"entities": {}},
+                {"entities": {"size": "large"}},
+                {"entities": {"size": "large"}, "intent": "order"},
+                {"entities": {"size": "large"}, "intent": "order_pizza"},
+            ]
+        )
+
+        message = zero_shot_nlu.process({"text": "large pizza"})
+
+        assert message["intent"] == {"intent": "order_pizza", "confidence": 1.0}
+        assert message["entities"] == {"size": "large"}
+
+    def test_process_batch(self, zero_shot_nlu):
+        batch_chain = Mock()
+        batch_chain.invoke.return_value = [
+            {"id": 0, "intent": "greet", "entities": {}},
+            {"id": 1, "intent": "order_pizza", "entities": {"size": "large"}},
+        ]
+        zero_shot_nlu._build_chain = Mock(return_value=batch_chain)
+
+        messages = zero_shot_nlu.process_batch(
+            [{"text": "hello"}, {"text": "a large pizza"}]
+        )
+
+        batch_chain.invoke.assert_called_once()
+        assert messages[0]["intent"]["intent"] == "greet"
+        assert messages[1]["intent"]["intent"] == "order_pizza"
+        assert messages[1]["entities"] == {"size": "large"}
+
+    def test_process_batch_falls_back_to_single_calls(self, zero_shot_nlu):
+        batch_chain = Mock()
+        batch_chain.invoke.return_value = [
+            {"id": 0, "intent": "greet", "entities": {}},
+        ]
+        zero_shot_nlu._build_chain = Mock(return_value=batch_chain)
+        zero_shot_nlu.streaming = False
+        zero_shot_nlu.chain = Mock()
+        zero_shot_nlu.chain.invoke.return_value = {
+            "intent": "order_pizza",
+            "entities": {"size": "large"},
+        }
+
+        messages = zero_shot_nlu.process_batch(
+            [{"text": "hello"}, {"text": "a large pizza"}]
+        )
+
+        zero_shot_nlu.chain.invoke.assert_called_once_with({"text": "a large pizza"})
+        assert messages[0]["intent"]["intent"] == "greet"
+        assert messages[1]["intent"]["intent"] == "order_pizza"
+
+    def test_llm_client_is_shared_across_reloads(self, zero_shot_nlu):
+        reloaded = ZeroShotNLUOpenAI(
+            intents=["greet"],
+            entities=[],
+            api_key="test",
+        )
+
+        assert reloaded.llm is zero_shot_nlu.llm
+        assert reloaded.template is zero_shot_nlu.template
+
+    def test_retrieved_candidates_include_default_intents(self):
+        nlu = ZeroShotNLUOpenAI(
+            intents=["greet", "order_pizza", "cancel", "fallback"],
+            intent_entities={"order_pizza": ["size"]},
+            retriever=IntentRetriever(
+                {
+                    "greet": ["hello there"],
+                    "order_pizza": ["i want a large pizza"],
+                    "cancel": ["cancel my order"],
+                    "fallback": ["fallback"],
+                }
+            ),
+            retrieval_top_k=1,
+            default_intents=["fallback", "init_conversation"],
+            api_key="test",
+        )
+
+        intents, entities = nlu._get_candidates(["a large pizza please"])
+
+        assert intents == ["order_pizza", "fallback"]
+        assert entities == ["size"]